@@ -11,6 +11,7 @@ from langchain.llms.base import LLM
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import SupabaseVectorStore
 from supabase import create_client
+from inventory.search import trigram_search
 
 # Track last medicine and shown stores
 last_medicine_asked = None
@@ -78,15 +79,8 @@ def fuzzy_search_medicine(query: str):
     query_lower = query.lower()
     ask_for_places = any(kw in query_lower for kw in ["where", "location", "available", "which pharmacy", "contain", "have", "stock"])
 
-    matches = Medicine.objects.annotate(
-        sim_brand=TrigramSimilarity('brand_name', query),
-        sim_generic=TrigramSimilarity('generic_name', query),
-        sim_chemical=TrigramSimilarity('chemical_name', query),
-    ).filter(
-        Q(sim_brand__gt=0.3) |
-        Q(sim_generic__gt=0.3) |
-        Q(sim_chemical__gt=0.3)
-    ).order_by('-sim_brand', '-sim_generic', '-sim_chemical')
+    # Uses the `%` operator so the trigram GIN indexes on the drug catalog are used
+    matches = trigram_search(Medicine.objects.select_related('store', 'catalog_item'), query)
 
     if not matches.exists():
         return None
@@ -108,8 +102,8 @@ def fuzzy_search_medicine(query: str):
 
         brand = (med.brand_name or "").strip()
         generic = (med.generic_name or "").strip()
-        chemical = (med.chemical_name or "").strip()
-        description = (med.description or "No description available").strip()
+        chemical = (med.catalog_item.chemical_name or "").strip()
+        description = (med.catalog_item.description or "No description available").strip()
 
         last_medicine_asked = brand.lower()
 
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import Cart
+from inventory.archive import medicines_by_id, parse_medicine_id
 from inventory.models import Medicine
+from inventory.reservations import hold_items, release_items, shortage_message
 from rest_framework.exceptions import ValidationError
 from medical_stores.models import MedicalStore
 from decimal import Decimal
@@ -42,22 +44,24 @@ class CartSerializer(serializers.ModelSerializer):
         # Handle store conflict
         if cart and cart.items:
             existing_store_id = None
+            # archived medicines still tell the cart's store
+            cart_medicines = medicines_by_id(item.get('product') for item in cart.items)
             for item in cart.items:
-                try:
-                    med = Medicine.objects.get(id=item.get('product'))
-                    if existing_store_id is None:
-                        existing_store_id = med.store_id
-                    elif med.store_id != existing_store_id:
-                        existing_store_id = None
-                        break
-                except Medicine.DoesNotExist:
+                med = cart_medicines.get(parse_medicine_id(item.get('product')))
+                if med is None:
                     continue
+                if existing_store_id is None:
+                    existing_store_id = med.store_id
+                elif med.store_id != existing_store_id:
+                    existing_store_id = None
+                    break
             if existing_store_id is not None and existing_store_id != store_id:
                 if not force_clear:
                     raise ValidationError({
                         'error': 'Cart contains products from another store. Do you want to clear the cart and add this product?',
                         'requires_confirmation': True
                     })
+                release_items(user.pk, [item.get('product') for item in cart.items])
                 cart.items = []
                 cart.total_price = Decimal('0.00')
                 cart.save()
@@ -68,7 +72,7 @@ class CartSerializer(serializers.ModelSerializer):
             product_id = new_item.get('product')
             quantity = new_item.get('quantity', 1)
             try:
-                medicine = Medicine.objects.get(id=product_id)
+                medicine = Medicine.objects.get(id=parse_medicine_id(product_id))
             except Medicine.DoesNotExist:
                 raise ValidationError({'error': f'Product {product_id} does not exist.'})
 
@@ -97,27 +101,32 @@ class CartSerializer(serializers.ModelSerializer):
         # Calculate subtotal and prepare checked items
         subtotal = Decimal('0.00')
         checked_items = []
+        # an archived item is found here and reported short by hold_items() below
+        medicines = medicines_by_id(item.get('product') for item in updated_items)
         for item in updated_items:
             product_id = item.get('product')
             quantity = item.get('quantity', 1)
-            try:
-                medicine = Medicine.objects.get(id=product_id)
-            except Medicine.DoesNotExist:
+            medicine = medicines.get(parse_medicine_id(product_id))
+            if medicine is None:
                 raise ValidationError({'error': f'Medicine {product_id} not found.'})
-            if quantity > medicine.stock:
-                raise ValidationError({
-                    'error': f'Not enough stock for product {product_id}. Available: {medicine.stock}, requested: {quantity}'
-                })
+            image = medicine.catalog_item.image
             item_subtotal = Decimal(str(medicine.price)) * Decimal(str(quantity))
             subtotal += item_subtotal
             checked_items.append({
                 'product': product_id,
                 'name': medicine.brand_name,
-                'image': request.build_absolute_uri(medicine.image.url) if medicine.image and request else None,
+                'image': request.build_absolute_uri(image.url) if image and request else None,
                 'quantity': quantity,
                 'price': float(medicine.price),
             })
 
+        # Hold the cart's quantities, other carts only see the stock that is not held
+        quantities = {int(item['product']): item['quantity'] for item in checked_items}
+        short = hold_items(user.pk, quantities)
+        if short:
+            product_id, available = next(iter(short.items()))
+            raise ValidationError({'error': shortage_message(product_id, available, quantities[product_id])})
+
         # Set validated_data with calculated fields
         validated_data['items'] = checked_items
         validated_data['total_price'] = subtotal + Decimal(str(validated_data.get('shipping_cost', '0.00'))) + Decimal(str(validated_data.get('tax', '0.00')))
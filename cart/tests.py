@@ -1,3 +1,54 @@
 from django.test import TestCase
+from inventory.cache import redis_conn
+from inventory.models import CatalogMedicine, Medicine
+from inventory.reservations import HOLD_EXPIRY_KEY, HOLD_KEY
+from medical_stores.models import MedicalStore
+from users.models import Pharmacist, User
+from .models import Cart
 
-# Create your tests here.
+
+class CartItemTests(TestCase):
+    """Carts whose stored items name no product, or not a number, are read like before."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='cart-buyer@example.com', name='buyer', role='client')
+        cls.first, cls.second = [cls.create_medicine(name) for name in ('Cartol', 'Cartex')]
+
+    @classmethod
+    def create_medicine(cls, name):
+        owner = User.objects.create(email=f'{name.lower()}@example.com', name=name, role='pharmacist')
+        store = MedicalStore.objects.create(
+            owner=Pharmacist.objects.create(user=owner, license_status='approved'), store_name=name, store_type='pharmacy',
+        )
+        item = CatalogMedicine.objects.create(
+            brand_name=name, generic_name='Cartamol', chemical_name='cartamol', atc_code='N02BE01', cas_number='1-2-3',
+        )
+        return Medicine.objects.create(store=store, catalog_item=item, brand_name=name, generic_name='Cartamol', price=4, stock=5)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.cart = Cart.objects.create(user=self.user, total_price=0, items=[
+            {'quantity': 1}, {'product': 'abc', 'quantity': 1}, {'product': self.first.pk, 'quantity': 1},
+        ])
+        self.addCleanup(self._drop_holds)
+
+    def _drop_holds(self):
+        for medicine in (self.first, self.second):
+            redis_conn.delete(HOLD_KEY.format(medicine.pk))
+        redis_conn.delete(HOLD_EXPIRY_KEY)
+
+    def test_store_conflict_skips_bad_items(self):
+        response = self.client.post('/cart/cart/', {'items': [{'product': self.second.pk, 'quantity': 1}]}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()['requires_confirmation'])
+
+    def test_update_items_skips_bad_items(self):
+        response = self.client.patch(
+            f'/cart/cart/{self.cart.pk}/update-items/', {'items': [{'product': self.first.pk, 'quantity': 1}]},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.cart.refresh_from_db()
+        self.assertEqual([item.get('product') for item in self.cart.items], [None, 'abc', self.first.pk])
+        self.assertEqual(self.cart.items[2]['quantity'], 2)
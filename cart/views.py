@@ -4,7 +4,8 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from .models import Cart
 from .serializers import CartSerializer
-from inventory.models import Medicine
+from inventory.archive import medicines_by_id, parse_medicine_id
+from inventory.reservations import hold_items, release_items, shortage_message
 from decimal import Decimal
 
 class CartViewSet(viewsets.ModelViewSet):
@@ -45,11 +46,13 @@ class CartViewSet(viewsets.ModelViewSet):
         subtotal = 0
         checked_items = []
         store_id = None
+        # archived medicines keep their price and store, hold_items() reports them short
+        medicines = medicines_by_id(item.get("product") for item in updated_items)
         for item in updated_items:
             product_id = item.get("product")
             quantity = item.get("quantity", 1)
-            try:
-                medicine = Medicine.objects.get(id=product_id)
+            medicine = medicines.get(parse_medicine_id(product_id))
+            if medicine is not None:
                 price = float(medicine.price)
                 if store_id is None:
                     store_id = medicine.store_id
@@ -58,14 +61,20 @@ class CartViewSet(viewsets.ModelViewSet):
     'error': 'Cart contains products from another store. Do you want to clear the cart and add this product?',
     'requires_confirmation': True
 }, status=status.HTTP_400_BAD_REQUEST)
-                if quantity > medicine.stock:
-                    return Response({
-                        'error': f'Not enough stock for product {product_id}. Available: {medicine.stock}, requested: {quantity}'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            except Medicine.DoesNotExist:
+            else:
                 price = 0
             subtotal += price * quantity
             checked_items.append({**item, "price": price})
+        # Hold the new quantities (0 releases the removed products), all or nothing
+        quantities = {parse_medicine_id(item.get("product")): 0 for item in cart.items or []}
+        quantities.update({parse_medicine_id(item.get("product")): item.get("quantity", 1) for item in checked_items})
+        quantities.pop(None, None)
+        short = hold_items(request.user.pk, quantities)
+        if short:
+            product_id, available = next(iter(short.items()))
+            return Response({
+                'error': shortage_message(product_id, available, quantities[product_id])
+            }, status=status.HTTP_400_BAD_REQUEST)
         cart.items = checked_items
         cart.total_price = Decimal(str(subtotal)) + cart.shipping_cost + cart.tax
         cart.save()
@@ -92,6 +101,10 @@ class CartViewSet(viewsets.ModelViewSet):
                 # If no quantity provided, remove the item completely
                 continue
             updated_items.append(item)
+        # Shrink or drop the hold on the product
+        if len(updated_items) != len(cart.items) or any(item.get('product') == product_id for item in updated_items):
+            remaining = sum(item.get('quantity', 1) for item in updated_items if item.get('product') == product_id)
+            hold_items(request.user.pk, {product_id: remaining})
         # Recalculate subtotal
         subtotal = sum(Decimal(str(item['price'])) * item.get('quantity', 1) for item in updated_items)
         cart.items = updated_items
@@ -101,5 +114,6 @@ class CartViewSet(viewsets.ModelViewSet):
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
+        release_items(request.user.pk, [item.get('product') for item in instance.items or []])
         self.perform_destroy(instance)
         return Response({'message': 'cart deleted'}, status=status.HTTP_200_OK)
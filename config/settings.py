@@ -64,6 +64,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 MIDDLEWARE = [
@@ -210,6 +211,14 @@ SALES_TAX_RATE = 0.05  # 8% sales tax
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# medicine name autocomplete snapshot (inventory.autocomplete), memory-mapped by every worker
+MEDICINE_AUTOCOMPLETE_INDEX = os.getenv(
+    'MEDICINE_AUTOCOMPLETE_INDEX', os.path.join(BASE_DIR, 'var', 'medicine-autocomplete.idx')
+)
+
+# wall clock of the store opening hours (medical_stores.hours), open_now is evaluated in it
+STORE_TIME_ZONE = os.getenv('STORE_TIME_ZONE', 'Africa/Cairo')
+
 
 # [SENU]: FOR AUTH
 AUTH_USER_MODEL = 'users.User'
@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import MedicalDevice, Medicine
+from .models import CatalogMedicine, MedicalDevice, Medicine
 
 # Register your models here.
 admin.site.register(MedicalDevice)
 admin.site.register(Medicine)
+admin.site.register(CatalogMedicine)
@@ -0,0 +1,54 @@
+# inventory/alternatives.py
+from django.db.models import Case, IntegerField, Q, Value, When
+from .models import CatalogMedicine, Medicine
+
+# length of an ATC level 4 code (chemical subgroup), e.g. N02BE in N02BE01
+ATC_GROUP_LENGTH = 5
+
+# how a substitute relates to the medicine, best first
+MATCH_SAME_GENERIC = 0
+MATCH_LINKED = 1
+MATCH_SAME_ATC_GROUP = 2
+
+
+def alternatives_for(medicine, queryset=None):
+    """
+    In-stock substitutes for `medicine` from approved stores: same normalized generic
+    name, same ATC chemical subgroup, or listed in `alternative_medicines`.
+
+    The matching drugs are looked up in the catalog (catalog_generic_key_idx /
+    catalog_atc_group_idx), then their offers come from one query on the partial
+    medicine_live_catalog_idx index.
+    """
+    if queryset is None:
+        queryset = Medicine.objects.select_related('store', 'catalog_item')
+    catalog_item = medicine.catalog_item
+    # a literal id list keeps the OR indexable (a correlated IN subquery would not be),
+    # the through table lookup is a tiny index scan on from_medicine_id
+    linked_ids = list(Medicine.alternative_medicines.through.objects.filter(
+        from_medicine_id=medicine.pk,
+    ).values_list('to_medicine_id', flat=True))
+
+    condition = Q(generic_key=catalog_item.generic_key)
+    # a blank or truncated ATC code would match every other blank one
+    if len(catalog_item.atc_group or '') == ATC_GROUP_LENGTH:
+        condition |= Q(atc_group=catalog_item.atc_group)
+    related = CatalogMedicine.objects.filter(condition).values_list('generic_key', 'atc_group', 'id')
+
+    generic_ids, group_ids = [], []
+    for generic_key, atc_group, pk in related:
+        (generic_ids if generic_key == catalog_item.generic_key else group_ids).append(pk)
+
+    return queryset.filter(
+        Q(catalog_item__in=generic_ids + group_ids) | Q(pk__in=linked_ids),
+        is_deleted=False,
+        stock__gt=0,
+        store__owner__license_status='approved',
+    ).exclude(pk=medicine.pk).annotate(
+        match=Case(
+            When(catalog_item__in=generic_ids, then=Value(MATCH_SAME_GENERIC)),
+            When(pk__in=linked_ids, then=Value(MATCH_LINKED)),
+            When(catalog_item__in=group_ids, then=Value(MATCH_SAME_ATC_GROUP)),
+            output_field=IntegerField(),
+        ),
+    ).order_by('match', 'price', 'id')
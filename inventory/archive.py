@@ -0,0 +1,169 @@
+# inventory/archive.py
+from datetime import timedelta
+from django.db import connection, transaction
+from django.db.models import BooleanField, OuterRef, Subquery, Value
+from django.db.models.functions import Lower
+from django.utils import timezone
+from .cache import bump_generations_on_commit
+from .models import ArchivedMedicine, Medicine
+
+# Medicines soft-deleted for longer than ARCHIVE_AFTER are moved to the archive table
+# (ArchivedMedicine) by the archive_deleted_medicines command, so the hot table and its
+# indexes only carry the rows the listings can return. The deleted listings read both.
+ARCHIVE_AFTER = timedelta(days=30)
+ARCHIVE_BATCH_SIZE = 1000
+
+# copied as they are, alternative_medicines becomes alternative_ids
+ARCHIVED_COLUMNS = [
+    'id', 'stock', 'timestamp', 'is_deleted', 'deleted_at', 'catalog_item_id',
+    'generic_name', 'brand_name', 'price', 'store_id',
+]
+
+
+# MOVER ===========
+def _archive_batch_sql():
+    links = Medicine.alternative_medicines.through
+    from_column = links._meta.get_field('from_medicine').column
+    to_column = links._meta.get_field('to_medicine').column
+    columns = ', '.join(ARCHIVED_COLUMNS)
+    # one statement: pick a batch (rows a request is writing are left for the next run),
+    # drop its links both ways, delete the rows and insert them into the archive
+    return f"""
+        WITH batch AS (
+            SELECT id FROM {Medicine._meta.db_table}
+            WHERE is_deleted AND deleted_at < %s
+            ORDER BY id LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        ), links AS (
+            DELETE FROM {links._meta.db_table} l USING batch
+            WHERE l.{from_column} = batch.id OR l.{to_column} = batch.id
+            RETURNING l.{from_column} AS medicine_id, l.{to_column} AS alternative_id
+        ), moved AS (
+            DELETE FROM {Medicine._meta.db_table} m USING batch
+            WHERE m.id = batch.id
+            RETURNING m.*
+        )
+        INSERT INTO {ArchivedMedicine._meta.db_table} ({columns}, archived_at, alternative_ids)
+        SELECT {columns}, now(), COALESCE(
+            (SELECT array_agg(links.alternative_id ORDER BY links.alternative_id)
+             FROM links WHERE links.medicine_id = moved.id), '{{}}'
+        )
+        FROM moved
+        RETURNING store_id
+    """
+
+
+def archive_deleted_medicines(older_than=ARCHIVE_AFTER, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move the medicines deleted more than `older_than` ago to the archive, one
+    transaction per `batch_size` rows. Returns how many were moved.
+    """
+    cutoff = timezone.now() - older_than
+    sql = _archive_batch_sql()
+    moved = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, [cutoff, batch_size])
+            store_ids = [store_id for store_id, in cursor.fetchall()]
+            count = len(store_ids)
+            # deleted rows are not in the client listings, but the pharmacist ETags
+            # cover the store's whole inventory
+            bump_generations_on_commit(set(store_ids) - {None})
+        moved += count
+        if count < batch_size:
+            return moved
+
+
+def restore_medicines(store, medicine_ids):
+    """
+    Move the archived medicines `medicine_ids` of `store` back to the hot table,
+    still soft-deleted (updating their stock brings them back to the listings), with
+    their ids and alternative links. A drug the store lists again meanwhile stays
+    archived (one row per drug and store). Returns the restored ids.
+    """
+    with transaction.atomic():
+        archived, catalog_items = [], set()
+        listed = Medicine.objects.filter(store=store).values('catalog_item')
+        for row in (
+            ArchivedMedicine.objects.select_for_update()
+            .filter(store=store, pk__in=medicine_ids).exclude(catalog_item__in=listed).order_by('pk')
+        ):
+            if row.catalog_item_id not in catalog_items:
+                catalog_items.add(row.catalog_item_id)
+                archived.append(row)
+        if not archived:
+            return []
+        Medicine.objects.bulk_create([
+            Medicine(**{field: getattr(row, field) for field in ARCHIVED_COLUMNS})
+            for row in archived
+        ])
+        restored_ids = [row.pk for row in archived]
+        # timestamp is auto_now_add, bulk_create stamped the rows with now()
+        Medicine.objects.filter(pk__in=restored_ids).update(
+            timestamp=Subquery(ArchivedMedicine.objects.filter(pk=OuterRef('pk')).values('timestamp')),
+        )
+
+        # an alternative that is still archived gets the link back when it is restored
+        wanted = {(row.pk, alternative) for row in archived for alternative in row.alternative_ids}
+        live = set(Medicine.objects.filter(pk__in={alternative for _, alternative in wanted}).values_list('pk', flat=True))
+        links = Medicine.alternative_medicines.through
+        # symmetrical: one row each way, as alternative_medicines.add() would write
+        pairs = {pair for pk, alternative in wanted if alternative in live for pair in ((pk, alternative), (alternative, pk))}
+        links.objects.bulk_create(
+            [links(from_medicine_id=a, to_medicine_id=b) for a, b in sorted(pairs)],
+            ignore_conflicts=True,
+        )
+        ArchivedMedicine.objects.filter(pk__in=restored_ids).delete()
+        bump_generations_on_commit([store.pk])
+    return restored_ids
+
+
+# READING ===========
+def parse_medicine_id(value):
+    """The medicine id an order or cart item names, None when it is missing or not a number."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def medicines_by_id(ids):
+    """
+    {id: Medicine} of `ids` (catalog_item selected), the ArchivedMedicine for the ids
+    no longer in the hot table: orders and carts keep naming medicines by id. Ids that
+    are not numbers are skipped.
+    """
+    ids = {parse_medicine_id(pk) for pk in ids} - {None}
+    medicines = Medicine.objects.select_related('catalog_item').in_bulk(ids)
+    missing = ids - medicines.keys()
+    if missing:
+        medicines.update(ArchivedMedicine.objects.select_related('catalog_item').in_bulk(missing))
+    return medicines
+
+
+def with_archive(hot, archived, ordering=('id',)):
+    """
+    The soft-deleted rows of `hot` (Medicine) and the rows of `archived`
+    (ArchivedMedicine) as one ordered queryset of {'id', 'archived', ...} dicts, for the
+    paginator. `ordering` may use 'sort_name' (lower-cased brand name); load_rows()
+    turns a page back into instances.
+    """
+    def keys(queryset, archived_flag):
+        return queryset.order_by().values('id').annotate(
+            archived=Value(archived_flag, output_field=BooleanField()),
+            sort_name=Lower('brand_name'),
+        )
+    return keys(hot, False).union(keys(archived, True), all=True).order_by(*ordering)
+
+
+def load_rows(rows):
+    """The Medicine and ArchivedMedicine instances of with_archive() `rows`, in order."""
+    rows = list(rows)
+    instances = {
+        flag: model.objects.select_related('store', 'catalog_item').in_bulk(
+            [row['id'] for row in rows if row['archived'] == flag]
+        )
+        for flag, model in ((False, Medicine), (True, ArchivedMedicine))
+    }
+    # a row restored or archived since the page was counted is skipped
+    return [instances[row['archived']][row['id']] for row in rows if row['id'] in instances[row['archived']]]
@@ -0,0 +1,307 @@
+# inventory/autocomplete.py
+import heapq
+import logging
+import mmap
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from cachetools import LRUCache
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Min
+from django.db.models.functions import Lower, Trim
+from .models import CatalogMedicine
+
+try:
+    import fcntl
+except ImportError:  # Windows dev servers run a single process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Prefix index of the brand, generic and chemical names of the medicines clients can
+# see, weighted by how many store listings carry the name. It lives in a snapshot file
+# that every worker memory-maps, so the lookups never touch the database:
+#   header | record offsets (uint32) | record ids by weight desc (uint32) | records
+# a record is weight, key length, name length, key, name; records are sorted by key
+# (lower-cased UTF-8, compared as bytes). The file is host local, native byte order.
+NAME_FIELDS = ['brand_name', 'generic_name', 'catalog_item__chemical_name']
+# the catalog key each name is counted by, all indexed: the catalog_medicine_natural_key
+# unique index (brand first), catalog_generic_key_idx and catalog_chemical_key_idx
+NAME_KEYS = {
+    'brand_name': Lower(Trim('brand_name')),
+    'generic_name': F('generic_key'),
+    'chemical_name': Lower(Trim('chemical_name')),
+}
+HEADER = struct.Struct('=4sI')
+RECORD = struct.Struct('=IHH')
+MAGIC = b'MAC1'
+MAX_SUGGESTIONS = 50
+
+# suggestions of the current snapshot, the short prefixes are asked for over and over
+_results = LRUCache(maxsize=2048)
+_results_lock = threading.Lock()
+_snapshot_lock = threading.Lock()
+_snapshot = None
+
+# changes are folded into the snapshot by one background worker, names coalesce
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='autocomplete')
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def index_path():
+    return settings.MEDICINE_AUTOCOMPLETE_INDEX
+
+
+def normalize(name):
+    return (name or '').strip().lower()
+
+
+# SNAPSHOT FILE ===========
+class Snapshot:
+    """A memory-mapped snapshot file. Replaced, never modified, so it is read without locks."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an autocomplete snapshot")
+        view = memoryview(self._map)
+        start = HEADER.size
+        self.offsets = view[start:start + 4 * self.count].cast('I')
+        start += 4 * self.count
+        self.by_weight = view[start:start + 4 * self.count].cast('I')
+
+    def key(self, i):
+        offset = self.offsets[i]
+        _, key_length, _ = RECORD.unpack_from(self._map, offset)
+        start = offset + RECORD.size
+        return self._map[start:start + key_length]
+
+    def weight(self, i):
+        return RECORD.unpack_from(self._map, self.offsets[i])[0]
+
+    def entry(self, i):
+        offset = self.offsets[i]
+        weight, key_length, name_length = RECORD.unpack_from(self._map, offset)
+        start = offset + RECORD.size + key_length
+        return self._map[start:start + name_length].decode('utf-8'), weight
+
+    def entries(self):
+        """{key: (name, weight)} of the whole snapshot, to merge changes into."""
+        return {self.key(i).decode('utf-8'): self.entry(i) for i in range(self.count)}
+
+    def suggest(self, prefix, limit):
+        prefix = prefix.encode('utf-8')
+        lo = bisect_left(range(self.count), prefix, key=self.key)
+        # 0xff never occurs in UTF-8, so it sorts after every key with this prefix
+        hi = bisect_left(range(lo, self.count), prefix + b'\xff', key=self.key) + lo
+        matches = hi - lo
+        if not matches:
+            return []
+        if matches * matches > limit * self.count:
+            # a short prefix matches a large part of the index: walk the ids by weight
+            # instead, about limit * count / matches of them until the list is full
+            ids = []
+            for i in self.by_weight:
+                if lo <= i < hi:
+                    ids.append(i)
+                    if len(ids) == limit:
+                        break
+        else:
+            ids = heapq.nlargest(limit, range(lo, hi), key=lambda i: (self.weight(i), -i))
+        return [self.entry(i) for i in ids]
+
+
+def write_snapshot(entries, path=None):
+    """Write {key: (name, weight)} to a new snapshot file and swap it in atomically."""
+    path = path or index_path()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    items = sorted((key.encode('utf-8'), name.encode('utf-8'), weight) for key, (name, weight) in entries.items())
+
+    offsets, records = array('I'), bytearray()
+    start = HEADER.size + 8 * len(items)
+    for key, name, weight in items:
+        offsets.append(start + len(records))
+        records += RECORD.pack(min(weight, 0xFFFFFFFF), len(key), len(name)) + key + name
+    # heaviest first, ties in key order, the same order as Snapshot.suggest's nlargest
+    by_weight = array('I', sorted(range(len(items)), key=lambda i: (-items[i][2], i)))
+
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(items)))
+        f.write(offsets.tobytes())
+        f.write(by_weight.tobytes())
+        f.write(records)
+    os.replace(tmp, path)
+
+
+def current_snapshot():
+    """The latest snapshot of this process, re-mapped when another worker replaced the file."""
+    global _snapshot
+    path = index_path()
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        # not built on this host yet (build_autocomplete_index runs on deploy): no
+        # suggestions until the background rebuild is done, the request does not wait
+        _submit_rebuild()
+        return None
+    identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    snapshot = _snapshot
+    if snapshot is None or snapshot.identity != identity:
+        with _snapshot_lock:
+            if _snapshot is None or _snapshot.identity != identity:
+                # readers still on the old mapping keep it alive until they finish
+                _snapshot = Snapshot(path)
+                with _results_lock:
+                    _results.clear()
+            snapshot = _snapshot
+    return snapshot
+
+
+def suggest(prefix, limit=10):
+    """[(name, weight)] of the heaviest names starting with `prefix`."""
+    prefix = normalize(prefix)
+    if not prefix:
+        return []
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return []
+    key = (snapshot.identity, prefix, limit)
+    with _results_lock:
+        results = _results.get(key)
+    if results is None:
+        results = snapshot.suggest(prefix, limit)
+        with _results_lock:
+            _results[key] = results
+    return results
+
+
+# BUILDING ===========
+def medicine_names(queryset):
+    """The brand, generic and chemical names of the Medicine rows in `queryset`."""
+    names = set()
+    for row in queryset.values_list(*NAME_FIELDS).distinct():
+        names.update(row)
+    return names
+
+
+def count_names(keys=None):
+    """
+    {key: (name, weight)} of the visible medicine names, for all of them or just
+    `keys`. A name's weight is the number of live store listings that carry it.
+    """
+    counts = {}
+    for field, key in NAME_KEYS.items():
+        # the keys pick catalog records through an index, their listings through the
+        # catalog_item foreign key: an update never reads the whole Medicine table
+        rows = CatalogMedicine.objects.annotate(key=key)
+        if keys is not None:
+            rows = rows.filter(key__in=keys)
+        rows = rows.filter(store_items__is_deleted=False, store_items__store__owner__license_status='approved')
+        rows = rows.exclude(key='').values('key').annotate(weight=Count('store_items'), name=Min(Trim(field)))
+        for row in rows.order_by():
+            name, weight = counts.get(row['key'], (row['name'], 0))
+            counts[row['key']] = (min(name, row['name']), weight + row['weight'])
+    return counts
+
+
+@contextmanager
+def _writer_lock():
+    # one writer at a time across the workers, each merges into the latest file
+    path = index_path()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(f'{path}.lock', 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def rebuild_index():
+    """Rebuild the whole snapshot from the database."""
+    entries = count_names()
+    with _writer_lock():
+        write_snapshot(entries)
+    return len(entries)
+
+
+def update_index(keys):
+    """Recount `keys` and merge them into the current snapshot."""
+    counts = count_names(keys)
+    with _writer_lock():
+        try:
+            entries = Snapshot(index_path()).entries()
+        except FileNotFoundError:
+            entries = count_names()
+        for key in keys:
+            entries.pop(key, None)
+        entries.update(counts)
+        write_snapshot(entries)
+
+
+def _flush_pending():
+    with _pending_lock:
+        keys = set(_pending)
+        _pending.clear()
+    try:
+        if keys:
+            update_index(keys)
+    except Exception:
+        logger.exception(f"Autocomplete index update failed for {len(keys)} names")
+    finally:
+        # worker threads get their own connection, do not leave it open
+        connection.close()
+
+
+_rebuild_queued = False
+
+
+def _rebuild_missing():
+    global _rebuild_queued
+    try:
+        if not os.path.exists(index_path()):
+            rebuild_index()
+    except Exception:
+        logger.exception("Autocomplete index rebuild failed")
+    finally:
+        with _pending_lock:
+            _rebuild_queued = False
+        connection.close()
+
+
+def _submit_rebuild():
+    global _rebuild_queued
+    with _pending_lock:
+        if _rebuild_queued:
+            return
+        _rebuild_queued = True
+    _executor.submit(_rebuild_missing)
+
+
+def _submit(keys):
+    with _pending_lock:
+        # a flush is already queued when there were pending names, it takes these too
+        queued = bool(_pending)
+        _pending.update(keys)
+    if not queued:
+        _executor.submit(_flush_pending)
+
+
+def schedule_index_update(names):
+    """Recount `names` in the snapshot in the background once the transaction commits."""
+    keys = {normalize(name) for name in names} - {''}
+    if keys:
+        transaction.on_commit(lambda: _submit(keys))
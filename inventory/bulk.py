@@ -0,0 +1,241 @@
+# inventory/bulk.py
+import csv
+import io
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from rest_framework.exceptions import ValidationError
+from .autocomplete import medicine_names, schedule_index_update
+from .cache import bump_generations_on_commit
+from .catalog import CATALOG_DETAIL_FIELDS, natural_key, resolve_catalog_items
+from .models import Medicine
+from .serializers import MedicineImportSerializer
+
+IMPORT_CHUNK_SIZE = 500
+# rows fetched per round trip of the server-side cursor, and written per streamed chunk
+EXPORT_CHUNK_SIZE = 2000
+
+# imported fields that are stored on the per-store row, the rest go to the catalog
+STORE_ROW_FIELDS = [
+    field for field in MedicineImportSerializer.Meta.fields if field not in CATALOG_DETAIL_FIELDS
+]
+
+
+# UPLOAD PARSING ===========
+def _decode_lines(upload, undecodable):
+    # line by line, so one bad line fails its row and not the whole upload
+    for number, line in enumerate(upload, start=1):
+        try:
+            yield line.decode('utf-8-sig' if number == 1 else 'utf-8')
+        except UnicodeDecodeError:
+            undecodable.append(number)
+            yield line.decode('utf-8', errors='replace')
+
+
+def iter_upload_rows(upload, file_format):
+    """
+    Yield (row_number, row) from a CSV (with header) or NDJSON upload, one line at a
+    time, so the whole file is never held in memory. A row that cannot be read is
+    yielded as the error message instead of a dict.
+    """
+    undecodable = []
+    lines = _decode_lines(upload, undecodable)
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        number = 0
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as exc:
+                row = f'Malformed CSV row: {exc}.'
+            number += 1
+            # the reader has consumed exactly the lines of this row (and the header)
+            if undecodable:
+                undecodable.clear()
+                row = 'Row is not valid UTF-8.'
+            yield number, row
+
+    for number, line in enumerate(lines, start=1):
+        if undecodable:
+            undecodable.clear()
+            yield number, 'Row is not valid UTF-8.'
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else 'Row is not a JSON object.'
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# IMPORT ===========
+def _flatten(data):
+    # the serializer nests the shared catalog fields under catalog_item
+    return {**data.pop('catalog_item', {}), **data}
+
+
+def _upsert_chunk(store, valid_rows):
+    """
+    Create or update one chunk of validated (row_number, row) pairs: one lookup per
+    table, then one INSERT ... ON CONFLICT (store, catalog_item) DO UPDATE, so concurrent
+    imports cannot list a drug twice. Returns (created, updated, per-row errors).
+    """
+    by_key, numbers = {}, {}
+    for number, data in valid_rows:
+        data = _flatten(data)
+        key = natural_key(data['brand_name'], data['generic_name'])
+        by_key[key] = data  # later rows in the file win
+        numbers[key] = number
+
+    with transaction.atomic():
+        catalog_items, conflicts = resolve_catalog_items(by_key.values())
+        # a row that would rewrite a shared record's details is reported, not imported
+        errors = [{'row': numbers[key], 'errors': field_errors} for key, field_errors in conflicts.items()]
+        rows = {}
+        for key, data in by_key.items():
+            if key in conflicts:
+                continue
+            item = catalog_items[key]
+            # an upsert cannot touch a row twice
+            rows[item.pk] = Medicine(
+                store=store, catalog_item=item,
+                **{field: value for field, value in data.items() if field not in CATALOG_DETAIL_FIELDS},
+            )
+        # only counts the created rows, the upsert below decides
+        existing = set(
+            Medicine.objects.filter(store=store, catalog_item__in=rows).values_list('catalog_item_id', flat=True)
+        )
+        Medicine.objects.bulk_create(
+            rows.values(), update_conflicts=True, unique_fields=['store', 'catalog_item'],
+            update_fields=STORE_ROW_FIELDS + ['is_deleted'],
+        )
+    updated = len(existing)
+    return len(rows) - updated, updated, sorted(errors, key=lambda error: error['row'])
+
+
+def import_medicines(store, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Validate (row_number, row) pairs against the MedicineSerializer rules and upsert
+    them into `store` chunk by chunk. The caller checks store ownership once.
+    Returns a summary with per-row errors.
+    """
+    serializer = MedicineImportSerializer()
+    created = updated = 0
+    errors = []
+    imported_names = set()
+
+    for chunk in chunked(rows, chunk_size):
+        valid_rows = []
+        for number, row in chunk:
+            if not isinstance(row, dict):
+                errors.append({'row': number, 'errors': {'non_field_errors': [row]}})
+                continue
+            try:
+                valid_rows.append((number, serializer.run_validation(row)))
+            except ValidationError as exc:
+                errors.append({'row': number, 'errors': exc.detail})
+        if valid_rows:
+            imported_names.update(
+                name for _, data in valid_rows for name in (data['brand_name'], data['generic_name'],
+                                                         data.get('catalog_item', {}).get('chemical_name'))
+            )
+            chunk_created, chunk_updated, chunk_errors = _upsert_chunk(store, valid_rows)
+            created += chunk_created
+            updated += chunk_updated
+            errors.extend(chunk_errors)
+
+    # bulk_create/bulk_update send no model signals
+    if created or updated:
+        bump_generations_on_commit([store.id])
+        schedule_index_update(imported_names)
+    return {'created': created, 'updated': updated, 'failed': len(errors), 'errors': errors}
+
+
+# EXPORT ===========
+def iter_export_chunks(queryset, fields, file_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield the rows of `queryset` as CSV (with header) or NDJSON text, a chunk of rows at
+    a time. `fields` maps the column names to queryset lookups. Rows come from a
+    server-side cursor, so memory stays flat whatever the size of the store.
+    """
+    columns = list(fields)
+    rows = queryset.order_by('pk').values_list(*fields.values()).iterator(chunk_size=chunk_size)
+
+    if file_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # the header goes out before the first query returns
+        writer.writerow(columns)
+        yield buffer.getvalue()
+        for chunk in chunked(rows, chunk_size):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+        return
+
+    for chunk in chunked(rows, chunk_size):
+        yield ''.join(json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n' for row in chunk)
+
+
+# STOCK ADJUSTMENT ===========
+def bulk_adjust_stock(store, adjustments):
+    """
+    Apply [{id, delta} | {id, absolute}] to `store` with one UPDATE ... CASE statement.
+    is_deleted is recomputed in the same statement (the same stock <= 0 rule as
+    MedicineSerializer.validate). A delta taking a stock below zero rejects the whole
+    batch (an oversold item must be reconciled, not lost).
+    Returns the new stock levels and the ids that are not in the store.
+    """
+    stock_cases, deleted_cases, deltas = [], [], {}
+    for item in adjustments:
+        pk = item['id']
+        if 'absolute' in item:
+            stock_cases.append(When(pk=pk, then=Value(item['absolute'])))
+            deleted_cases.append(When(pk=pk, then=Value(item['absolute'] <= 0)))
+        else:
+            delta = deltas[pk] = item['delta']
+            stock_cases.append(When(pk=pk, then=F('stock') + delta))
+            # the CASE sees the old stock, so "new stock <= 0" is "stock <= -delta"
+            deleted_cases.append(When(pk=pk, stock__lte=-delta, then=Value(True)))
+
+    ids = [item['id'] for item in adjustments]
+    with transaction.atomic():
+        queryset = Medicine.objects.filter(store=store, pk__in=ids)
+        # the rows are locked until the UPDATE, no other write can change the check
+        oversold = [
+            f'Medicine {pk} has {stock} in stock, a delta of {deltas[pk]} would take it below zero.'
+            for pk, stock in queryset.filter(pk__in=deltas).select_for_update().order_by('pk').values_list('pk', 'stock')
+            if stock + deltas[pk] < 0
+        ]
+        if oversold:
+            raise ValidationError({'items': oversold})
+        queryset.update(
+            stock=Case(*stock_cases, default=F('stock'), output_field=PositiveIntegerField()),
+            is_deleted=Case(*deleted_cases, default=Value(False)),
+        )
+        items = list(queryset.order_by('pk').values('id', 'stock', 'is_deleted'))
+        # queryset.update() sends no model signals
+        bump_generations_on_commit([store.id])
+        # stock reaching zero hides a listing, stock coming back shows it
+        schedule_index_update(medicine_names(queryset))
+
+    found = {item['id'] for item in items}
+    return {'updated': len(items), 'items': items, 'missing': [pk for pk in ids if pk not in found]}
+
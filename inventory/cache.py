@@ -0,0 +1,206 @@
+# inventory/cache.py
+import hashlib
+import json
+import logging
+import threading
+import time
+import redis
+from cachetools import LRUCache
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+redis_conn = redis.Redis.from_url(settings.REDIS_URL)
+
+# Generation counters: every inventory write bumps the global counter and the one of
+# the store it touched, and records when it happened. Cached listings and ETags embed
+# the counter, so a write makes them stale without scanning or deleting keys.
+GLOBAL_GENERATION_KEY = 'inventory:gen:global'
+STORE_GENERATION_KEY = 'inventory:gen:store:{}'
+LISTING_KEY = 'inventory:list:{namespace}:{generation}:{digest}'
+LISTING_TTL = 300  # seconds, only a safety net, invalidation is done by the counters
+
+# in-process tier in front of Redis, keyed by the same versioned key
+_local_cache = LRUCache(maxsize=512)
+_local_lock = threading.Lock()
+
+
+# GENERATIONS ===========
+def _store_ids(store_ids):
+    return {store_id for store_id in store_ids if store_id is not None}
+
+
+def _generation_key(store_id=None):
+    return STORE_GENERATION_KEY.format(store_id) if store_id is not None else GLOBAL_GENERATION_KEY
+
+
+def bump_generations(store_ids):
+    """Invalidate the cached listings of these stores (and every unscoped listing)."""
+    store_ids = _store_ids(store_ids)
+    now = int(time.time())
+    try:
+        pipe = redis_conn.pipeline(transaction=False)
+        for key in [GLOBAL_GENERATION_KEY, *(_generation_key(store_id) for store_id in store_ids)]:
+            pipe.hincrby(key, 'gen', 1)
+            pipe.hset(key, 'mtime', now)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.error(f"Redis generation bump error: {e}")
+
+
+def bump_generations_on_commit(store_ids):
+    """Bump after the surrounding transaction commits, so no reader can cache the old rows under the new generation."""
+    store_ids = _store_ids(store_ids)
+    transaction.on_commit(lambda: bump_generations(store_ids))
+
+
+def get_generation(store_id=None):
+    """(generation, last modified unix time or None) of a store, or of the whole inventory."""
+    generation, mtime = redis_conn.hmget(_generation_key(store_id), ['gen', 'mtime'])
+    return int(generation or 0), int(mtime) if mtime else None
+
+
+def _scope(store_id):
+    return f's{store_id}' if store_id is not None else 'all'
+
+
+def _normalized_params(request):
+    params = sorted((key, sorted(request.query_params.getlist(key))) for key in request.query_params)
+    # pagination links are absolute, so the host is part of the content
+    return repr((request.get_host(), request.path, params)).encode('utf-8')
+
+
+# LISTING CACHE ===========
+def cached_listing(request, namespace, build_response, store_id=None):
+    """
+    Return the listing for `request` from the cache, or build it with `build_response()`
+    and cache its data. Only for responses that are the same for every caller.
+    """
+    try:
+        generation, _ = get_generation(store_id)
+    except redis.RedisError as e:
+        logger.error(f"Redis generation read error: {e}")
+        return build_response()
+
+    digest = hashlib.sha1(_normalized_params(request)).hexdigest()
+    key = LISTING_KEY.format(namespace=namespace, generation=f'{_scope(store_id)}-{generation}', digest=digest)
+
+    with _local_lock:
+        data = _local_cache.get(key)
+    if data is not None:
+        return Response(data)
+
+    try:
+        payload = redis_conn.get(key)
+    except redis.RedisError as e:
+        logger.error(f"Redis listing read error: {e}")
+        payload = None
+    if payload is not None:
+        data = json.loads(payload)
+        with _local_lock:
+            _local_cache[key] = data
+        return Response(data)
+
+    response = build_response()
+    if response.status_code == 200:
+        payload = json.dumps(response.data, cls=JSONEncoder)
+        # keep plain lists/dicts locally, not the ReturnList tied to its serializer
+        data = json.loads(payload)
+        try:
+            redis_conn.set(key, payload, ex=LISTING_TTL)
+        except redis.RedisError as e:
+            logger.error(f"Redis listing write error: {e}")
+        with _local_lock:
+            _local_cache[key] = data
+    return response
+
+
+# VIEWSET MIXINS ===========
+class ListingStoreScopeMixin:
+    # query param that narrows a listing to one store, its store counter is then enough
+    listing_store_param = None
+
+    def get_listing_store_id(self, request):
+        if not self.listing_store_param:
+            return None
+        try:
+            return int(request.query_params[self.listing_store_param])
+        except (KeyError, ValueError):
+            return None
+
+
+class CachedClientListingMixin(ListingStoreScopeMixin):
+    """Serve `list` to clients from the versioned cache, the listing is the same for every client."""
+    listing_cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        user = request.user
+        if getattr(user, 'role', None) != 'client' or user.is_staff or user.is_superuser:
+            return super().list(request, *args, **kwargs)
+        return cached_listing(
+            request, self.listing_cache_namespace,
+            lambda: super(CachedClientListingMixin, self).list(request, *args, **kwargs),
+            store_id=self.get_listing_store_id(request),
+        )
+
+
+class ConditionalGetMixin(ListingStoreScopeMixin):
+    """
+    ETag / Last-Modified for `list` and `retrieve`, taken from the generation counters,
+    so a 304 Not Modified is answered without touching the database or the serializer.
+    """
+    # query params whose result also changes with the clock (?open_now=), no validators then
+    conditional_skip_params = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+            store_id=self.get_listing_store_id(request),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+        )
+
+    def conditional_response(self, request, build_response, store_id=None):
+        if any(param in request.query_params for param in self.conditional_skip_params):
+            return build_response()
+        try:
+            generation, mtime = get_generation(store_id)
+        except redis.RedisError as e:
+            logger.error(f"Redis generation read error: {e}")
+            return build_response()
+
+        # querysets are scoped by role and owner, so the tag is per user
+        user = request.user
+        raw = b'%s:%s:%s:%s' % (
+            _scope(store_id).encode(), str(generation).encode(), str(user.pk).encode(), _normalized_params(request),
+        )
+        etag = quote_etag(hashlib.sha1(raw).hexdigest())
+
+        # mtime has one-second resolution: a date naming the current second could still miss a
+        # later write in that same second, so only a second that has fully passed is a validator
+        now = int(time.time())
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            not_modified = etag in parse_etags(if_none_match) or if_none_match.strip() == '*'
+        else:
+            if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+            not_modified = bool(mtime and if_modified_since and mtime <= if_modified_since < now)
+
+        response = Response(status=status.HTTP_304_NOT_MODIFIED) if not_modified else build_response()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if mtime and mtime < now:
+                response['Last-Modified'] = http_date(mtime)
+            # clients keep the body but must revalidate, and it is never shared between users
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+        return response
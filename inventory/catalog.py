@@ -0,0 +1,132 @@
+# inventory/catalog.py
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower, Trim
+from rest_framework.exceptions import ValidationError
+from .cache import bump_generations_on_commit
+from .models import CatalogMedicine, Medicine
+
+# fields that live on the shared catalog record instead of the per-store row
+CATALOG_DETAIL_FIELDS = ['chemical_name', 'description', 'atc_code', 'cas_number', 'image']
+
+
+def natural_key(brand_name, generic_name):
+    # a drug is one (brand, generic) pair, compared trimmed and case-insensitively
+    return brand_name.strip().lower(), generic_name.strip().lower()
+
+
+def _catalog_lookup(brand_keys, generic_keys):
+    return CatalogMedicine.objects.alias(
+        brand_key=Lower(Trim('brand_name')),
+    ).filter(brand_key__in=brand_keys, generic_key__in=generic_keys)
+
+
+def locked_fields(item, details):
+    """
+    {field: error} for the `details` that would rewrite a field the shared record
+    already has. Stores only complete a record, so such a write is refused, not dropped.
+    """
+    errors = {}
+    for field, value in details.items():
+        current = getattr(item, field)
+        if value in (None, '') or not current or current == value:
+            continue
+        shown = current.name if field == 'image' else current
+        errors[field] = [f"Already set on the shared catalog record ({shown}), only an admin can change it."]
+    return errors
+
+
+def _apply_details(item, details, overwrite):
+    """Copy `details` onto a catalog record, return the names of the changed fields."""
+    changed = []
+    for field, value in details.items():
+        current = getattr(item, field)
+        # a shared record is only completed by store writes, not rewritten (unless overwrite)
+        if value in (None, '') or (current and not overwrite) or current == value:
+            continue
+        setattr(item, field, value)
+        changed.append(field)
+    return changed
+
+
+def resolve_catalog_item(brand_name, generic_name, details, overwrite=False, defaults=None):
+    """
+    Catalog record for (brand_name, generic_name), created from `details` when it does
+    not exist yet. Blank fields of an existing record are filled from `details`; set
+    fields are only replaced when `overwrite` is true (admins), otherwise a differing
+    value raises a ValidationError naming the fields. `defaults` (the details a renamed
+    row carries over) only ever fill blanks.
+    """
+    defaults = {field: value for field, value in (defaults or {}).items() if field not in details}
+    brand_key, generic_key = natural_key(brand_name, generic_name)
+    item = _catalog_lookup([brand_key], [generic_key]).first()
+    if item is None:
+        try:
+            with transaction.atomic():
+                return CatalogMedicine.objects.create(
+                    brand_name=brand_name.strip(), generic_name=generic_name.strip(), **defaults, **details,
+                )
+        except IntegrityError:
+            # created concurrently by another store
+            item = _catalog_lookup([brand_key], [generic_key]).get()
+
+    if not overwrite:
+        errors = locked_fields(item, details)
+        if errors:
+            raise ValidationError(errors)
+    changed = _apply_details(item, details, overwrite) + _apply_details(item, defaults, overwrite=False)
+    if changed:
+        item.save(update_fields=changed)
+    return item
+
+
+def resolve_catalog_items(rows):
+    """
+    Bulk resolve_catalog_item for validated import rows (brand_name, generic_name and
+    detail fields). Returns ({natural key: catalog record}, {natural key: locked_fields()
+    errors}) with three queries at most; the rows with errors change nothing.
+    """
+    by_key = {}
+    for data in rows:
+        by_key[natural_key(data['brand_name'], data['generic_name'])] = data
+
+    def existing():
+        items = {}
+        for item in _catalog_lookup({brand for brand, _ in by_key}, {generic for _, generic in by_key}):
+            key = natural_key(item.brand_name, item.generic_name)
+            if key in by_key:
+                items[key] = item
+        return items
+
+    items = existing()
+    missing = [key for key in by_key if key not in items]
+    if missing:
+        CatalogMedicine.objects.bulk_create([
+            CatalogMedicine(
+                brand_name=by_key[key]['brand_name'].strip(),
+                generic_name=by_key[key]['generic_name'].strip(),
+                **{field: by_key[key][field] for field in CATALOG_DETAIL_FIELDS if field in by_key[key]},
+            )
+            for key in missing
+        ], ignore_conflicts=True)
+        # ids are not returned with ignore_conflicts
+        items = existing()
+
+    to_update, changed_fields, conflicts = [], set(), {}
+    for key, item in items.items():
+        details = {field: by_key[key][field] for field in CATALOG_DETAIL_FIELDS if field in by_key[key]}
+        errors = locked_fields(item, details)
+        if errors:
+            conflicts[key] = errors
+            continue
+        changed = _apply_details(item, details, overwrite=False)
+        if changed:
+            to_update.append(item)
+            changed_fields.update(changed)
+    if to_update:
+        CatalogMedicine.objects.bulk_update(to_update, sorted(changed_fields))
+        # bulk_update sends no signals (bump_catalog_stores_generation): every store
+        # listing the records shows the new details, not only the importing one
+        bump_generations_on_commit(
+            Medicine.objects.filter(catalog_item__in=to_update).values_list('store_id', flat=True).distinct()
+        )
+    return {key: item for key, item in items.items() if key not in conflicts}, conflicts
@@ -0,0 +1,106 @@
+# inventory/changes.py
+import base64
+import json
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import ValidationError
+from .models import InventoryChange, MedicalDevice, Medicine
+from .pagination import RowGreaterThan
+
+# The change feed: GET /inventory/changes/?since=<cursor> returns what changed after
+# the cursor and the cursor to ask with next time, so a client syncs in O(changes).
+# Rows are read in (txid, id) order and only once every older transaction has ended
+# (txid < xmin of the current snapshot): a transaction that commits late has a txid
+# above every cursor handed out before it, none of its changes is skipped.
+CHANGES_PAGE_SIZE = 500
+MAX_CHANGES_PAGE_SIZE = 5000
+COMPACT_BATCH_SIZE = 5000
+SNAPSHOT_XMIN = 'pg_snapshot_xmin(pg_current_snapshot())::text::bigint'
+
+
+def encode_cursor(txid, pk):
+    return base64.urlsafe_b64encode(json.dumps([txid, pk]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(encoded):
+    try:
+        txid, pk = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        return int(txid), int(pk)
+    except (TypeError, ValueError):
+        raise ValidationError({'since': 'Invalid cursor.'})
+
+
+def read_changes(changes, since=None, limit=CHANGES_PAGE_SIZE):
+    """
+    The rows of `changes` (an InventoryChange queryset) after the `since` cursor,
+    compacted to the last change of each object: ([row dicts], next cursor, has more).
+    """
+    changes = changes.filter(txid__lt=RawSQL(SNAPSHOT_XMIN, []))
+    if since:
+        txid, pk = decode_cursor(since)
+        changes = changes.filter(RowGreaterThan([F('txid'), F('pk')], [Value(txid), Value(pk)]))
+    rows = list(
+        changes.order_by('txid', 'pk').values('pk', 'txid', 'kind', 'object_id', 'store_id', 'deleted')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return [], since, False
+
+    latest = {}
+    for row in rows:
+        # dicts keep the first insertion's place, move the object to its last change
+        key = (row['kind'], row['object_id'], row['store_id'])
+        latest.pop(key, None)
+        latest[key] = row
+    return list(latest.values()), encode_cursor(rows[-1]['txid'], rows[-1]['pk']), has_more
+
+
+def load_objects(rows):
+    """{(kind, id): instance} of the changed rows that still exist."""
+    ids = {'medicine': set(), 'device': set()}
+    for row in rows:
+        if not row['deleted']:
+            ids[row['kind']].add(row['object_id'])
+    medicines = (
+        Medicine.objects.select_related('store', 'catalog_item').prefetch_related('alternative_medicines')
+        .in_bulk(ids['medicine'])
+    )
+    devices = MedicalDevice.objects.select_related('store').in_bulk(ids['device'])
+    objects = {('medicine', pk): medicine for pk, medicine in medicines.items()}
+    objects.update({('device', pk): device for pk, device in devices.items()})
+    return objects
+
+
+# COMPACTION ===========
+def _compact_sql():
+    table = InventoryChange._meta.db_table
+    # a row is dropped once a newer, readable row of the same object and store exists;
+    # every cursor before it still reads the newer one, so no client misses anything
+    return f"""
+        DELETE FROM {table} WHERE id IN (
+            SELECT old.id FROM {table} old
+            WHERE old.txid < {SNAPSHOT_XMIN} AND EXISTS (
+                SELECT 1 FROM {table} new
+                WHERE new.kind = old.kind AND new.object_id = old.object_id
+                  AND new.store_id IS NOT DISTINCT FROM old.store_id
+                  AND (new.txid, new.id) > (old.txid, old.id)
+                  AND new.txid < {SNAPSHOT_XMIN}
+            )
+            LIMIT %s
+        )
+    """
+
+
+def compact_changes(batch_size=COMPACT_BATCH_SIZE):
+    """Drop the superseded change rows in batches, returns how many were dropped."""
+    sql = _compact_sql()
+    dropped = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, [batch_size])
+            count = cursor.rowcount
+        dropped += count
+        if count < batch_size:
+            return dropped
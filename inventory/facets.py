@@ -0,0 +1,27 @@
+# inventory/facets.py
+from string import ascii_uppercase
+
+# the letter bar, same buckets as inventory_brand_letter() in migration 0016
+FACET_LETTERS = [*ascii_uppercase, '#']
+
+
+def letter_facets(counts):
+    """
+    Sum MedicineLetterCount rows (one query) into the letter bar: live medicines per
+    first letter of the brand name and per store, each with how many are in stock.
+    """
+    letters = {letter: {'letter': letter, 'total': 0, 'in_stock': 0} for letter in FACET_LETTERS}
+    stores = {}
+    for store_id, letter, total, in_stock in counts.filter(total__gt=0).values_list(
+        'store_id', 'letter', 'total', 'in_stock'
+    ):
+        for bucket in (letters[letter], stores.setdefault(store_id, {'store_id': store_id, 'total': 0, 'in_stock': 0})):
+            bucket['total'] += total
+            bucket['in_stock'] += in_stock
+
+    return {
+        'total': sum(bucket['total'] for bucket in letters.values()),
+        'in_stock': sum(bucket['in_stock'] for bucket in letters.values()),
+        'letters': list(letters.values()),
+        'stores': [stores[store_id] for store_id in sorted(stores)],
+    }
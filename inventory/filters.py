@@ -1,5 +1,9 @@
 # inventory/filters.py
 import django_filters
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F
+from django.db.models.functions import Lower
+from rest_framework.filters import BaseFilterBackend
 from .models import Medicine
 
 class MedicineFilter(django_filters.FilterSet):
@@ -10,4 +14,28 @@ class MedicineFilter(django_filters.FilterSet):
 
     class Meta:
         model = Medicine
-        fields = ['store_id', 'brand_startswith']
\ No newline at end of file
+        fields = ['store_id', 'brand_startswith']
+
+
+# Full-text search over the maintained CatalogMedicine.search_vector column: ?q=pain relief
+class MedicineFullTextFilter(BaseFilterBackend):
+    search_param = 'q'
+    config = 'english'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return queryset
+
+        query = SearchQuery(terms, search_type='websearch', config=self.config)
+        queryset = queryset.filter(catalog_item__search_vector=query).annotate(
+            rank=SearchRank(F('catalog_item__search_vector'), query),
+            headline=SearchHeadline(
+                'catalog_item__description', query, config=self.config,
+                start_sel='<mark>', stop_sel='</mark>', max_fragments=2,
+            ),
+        )
+        # Rank by relevance unless the client asked for an explicit ?ordering=
+        if not request.query_params.get('ordering'):
+            queryset = queryset.order_by('-rank', Lower('brand_name'), 'id')
+        return queryset
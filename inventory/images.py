@@ -0,0 +1,121 @@
+# inventory/images.py
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps, features
+from .cache import bump_generations_on_commit
+from .models import CatalogMedicine
+
+logger = logging.getLogger(__name__)
+
+# name: bounding box, the image is scaled to fit it (never upscaled)
+IMAGE_VARIANT_SIZES = {
+    'thumb': (160, 160),
+    'medium': (480, 480),
+}
+# AVIF needs a Pillow built with libavif, WebP is always there
+IMAGE_VARIANT_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    **({'avif': {'format': 'AVIF', 'quality': 60}} if features.check('avif') else {}),
+}
+
+# uploads are resized off the request thread, a couple of workers are plenty
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-variants')
+
+
+def variant_name(image_name, size, extension):
+    directory, filename = os.path.split(image_name)
+    stem, _ = os.path.splitext(filename)
+    return os.path.join(directory, 'variants', f'{stem}_{size}.{extension}')
+
+
+def needs_variants(instance):
+    # image_variants remembers which upload it was made from
+    return (instance.image.name or '') != instance.image_variants.get('source', '')
+
+
+def build_variants(image_name):
+    """Write every size/format of `image_name` to storage, return {size: {format: name}}."""
+    with default_storage.open(image_name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    # keep transparency, drop palettes and CMYK the encoders do not take
+    image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    variants = {'source': image_name}
+    for size, box in IMAGE_VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail(box, Image.Resampling.LANCZOS)
+        variants[size] = {}
+        for extension, options in IMAGE_VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, **options)
+            name = variant_name(image_name, size, extension)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            variants[size][extension] = default_storage.save(name, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def generate_variants(model, pk):
+    """
+    (Re)build the variants of one row and store them in image_variants. Uses update()
+    guarded by the image name, so a newer upload is never overwritten with stale variants.
+    """
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not needs_variants(instance):
+        return
+    image_name = instance.image.name or ''
+    variants = build_variants(image_name) if image_name else {}
+    with transaction.atomic():
+        updated = model.objects.filter(pk=pk, image=image_name).update(image_variants=variants)
+        # update() sends no signals, the cached listings embed the variant URLs
+        if updated and model is CatalogMedicine:
+            bump_generations_on_commit(instance.store_items.values_list('store_id', flat=True).distinct())
+        elif updated:
+            bump_generations_on_commit([instance.store_id])
+    if not updated:
+        return
+
+    # variants of the previous upload
+    current = {name for size, formats in variants.items() if size != 'source' for name in formats.values()}
+    for size, formats in instance.image_variants.items():
+        if size == 'source':
+            continue
+        for name in formats.values():
+            if name not in current:
+                default_storage.delete(name)
+
+
+def _generate_in_background(model, pk):
+    try:
+        generate_variants(model, pk)
+    except Exception:
+        logger.exception(f"Image variants failed for {model.__name__} {pk}")
+    finally:
+        # worker threads get their own connection, do not leave it open
+        connection.close()
+
+
+def schedule_variants(instance):
+    """Generate the variants of `instance` in a worker thread once the transaction commits."""
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: _executor.submit(_generate_in_background, model, pk))
+
+
+def variant_urls(variants, request=None):
+    """{size: {format: url}} for a serializer, empty until the variants exist."""
+    urls = {}
+    for size, formats in variants.items():
+        if size == 'source':
+            continue
+        urls[size] = {}
+        for extension, name in formats.items():
+            url = default_storage.url(name)
+            urls[size][extension] = request.build_absolute_uri(url) if request else url
+    return urls
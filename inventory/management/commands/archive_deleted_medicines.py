@@ -0,0 +1,19 @@
+# inventory/management/commands/archive_deleted_medicines.py
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from inventory.archive import ARCHIVE_AFTER, ARCHIVE_BATCH_SIZE, archive_deleted_medicines
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the medicines soft-deleted for longer than --days to the archive table "
+        "(run it from cron, e.g. nightly)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER.days)
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        moved = archive_deleted_medicines(timedelta(days=options['days']), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{moved} deleted medicines archived."))
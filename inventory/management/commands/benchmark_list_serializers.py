@@ -0,0 +1,109 @@
+# inventory/management/commands/benchmark_list_serializers.py
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from inventory.models import CatalogMedicine, MedicalDevice, Medicine
+from inventory.readers import ValuesListReader
+from inventory.serializers import MedicalDeviceSerializer, MedicineSerializer
+from medical_stores.models import MedicalStore
+from users.models import Pharmacist, User
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-row cost of the ModelSerializer list output with the values() "
+        "fast path (inventory.readers), and fail if their JSON differs"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        random.seed(3)
+        try:
+            with transaction.atomic():
+                store = self._seed(options['rows'])
+                request = Request(APIRequestFactory().get('/inventory/medicines/'))
+                cases = [
+                    ('medicine', MedicineSerializer,
+                     Medicine.objects.select_related('store', 'catalog_item').filter(store=store).order_by('id')),
+                    ('device', MedicalDeviceSerializer,
+                     MedicalDevice.objects.select_related('store').filter(store=store).order_by('id')),
+                ]
+                for label, serializer_class, queryset in cases:
+                    self._compare(label, serializer_class, queryset, request, options['page_size'], options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    # SEEDING ===========
+    def _seed(self, rows):
+        user = User.objects.create_user(email='benchmark-lists@example.com', name='benchmark', role='pharmacist')
+        pharmacist = Pharmacist.objects.create(user=user, license_status='approved')
+        store = MedicalStore.objects.create(owner=pharmacist, store_name='Benchmark store', store_type='both')
+
+        items = CatalogMedicine.objects.bulk_create([
+            CatalogMedicine(
+                brand_name=f'Brand {i}', generic_name=f'Generic {i}', chemical_name=f'Chemical {i}',
+                description=f'Description {i}' if i % 3 else None, atc_code='N02BE01', cas_number='103-90-2',
+                image=f'medicine/images/brand-{i}.webp' if i % 2 else '',
+                image_variants={} if i % 4 else {'source': f'medicine/images/brand-{i}.webp',
+                                                 'thumb': {'webp': f'medicine/images/variants/brand-{i}_thumb.webp'}},
+            )
+            for i in range(rows)
+        ])
+        Medicine.objects.bulk_create([
+            Medicine(store=store, catalog_item=item, brand_name=item.brand_name, generic_name=item.generic_name,
+                     stock=random.randint(0, 100), price=f'{random.uniform(1, 500):.2f}')
+            for item in items
+        ])
+        MedicalDevice.objects.bulk_create([
+            MedicalDevice(store=store, stock=random.randint(0, 100), price=f'{random.uniform(1, 500):.2f}',
+                          manufacturer=f'Maker {i}', model_number=f'M{i}', serial_number=f'S{i}',
+                          image=f'medicaldevice/images/device-{i}.jpg' if i % 2 else '')
+            for i in range(rows)
+        ])
+        self.stdout.write(f"Seeded {rows} medicines and {rows} devices.")
+        return store
+
+    # COMPARISON ===========
+    def _pages(self, queryset, page_size):
+        total = queryset.count()
+        for start in range(0, total, page_size):
+            yield start, start + page_size
+
+    def _compare(self, label, serializer_class, queryset, request, page_size, repeat):
+        context = {'request': request}
+        renderer = JSONRenderer()
+        rows = queryset.count()
+
+        def serializer_pages():
+            return [serializer_class(queryset[start:end], many=True, context=context).data
+                    for start, end in self._pages(queryset, page_size)]
+
+        def reader_pages():
+            reader = ValuesListReader(serializer_class(context=context), queryset)
+            values = reader.values(queryset)
+            return [reader.to_representation(values[start:end]) for start, end in self._pages(queryset, page_size)]
+
+        if renderer.render(serializer_pages()) != renderer.render(reader_pages()):
+            raise CommandError(f"{label}: the values() fast path does not produce the same JSON")
+
+        for name, func in (('ModelSerializer', serializer_pages), ('values() reader', reader_pages)):
+            best = min(self._time(func) for _ in range(repeat))
+            self.stdout.write(f"{label:<10} {name:<16} {best * 1e6 / rows:8.2f} us/row")
+
+    def _time(self, func):
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
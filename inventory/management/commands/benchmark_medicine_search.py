@@ -0,0 +1,112 @@
+# inventory/management/commands/benchmark_medicine_search.py
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from inventory.models import CatalogMedicine, Medicine
+from inventory.search import DEFAULT_SIMILARITY_THRESHOLD, similarity_threshold, trigram_search
+from medical_stores.models import MedicalStore
+from users.models import Pharmacist, User
+
+SYLLABLES = ['pa', 'na', 'dol', 'ce', 'ta', 'mol', 'ami', 'xi', 'cil', 'lin', 'vo', 'ti',
+             'ren', 'flu', 'con', 'zol', 'met', 'for', 'min', 'ator', 'va', 'sta', 'tin', 'pro']
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Seed medicines and compare the prefix SearchFilter query with the trigram search"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200_000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--page-size', type=int, default=12)
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded rows instead of rolling back")
+
+    def handle(self, *args, **options):
+        random.seed(42)
+        try:
+            with transaction.atomic():
+                names = self._seed(options['rows'])
+                self._run(names, options['queries'], options['page_size'])
+                if not options['keep']:
+                    raise _Rollback
+        except _Rollback:
+            self.stdout.write("Seeded rows rolled back.")
+
+    # SEEDING ===========
+    def _name(self):
+        return ''.join(random.choice(SYLLABLES) for _ in range(random.randint(2, 4))).capitalize()
+
+    def _seed(self, rows):
+        user = User.objects.create_user(email='benchmark-search@example.com', name='benchmark', role='pharmacist')
+        pharmacist = Pharmacist.objects.create(user=user, license_status='approved')
+        store = MedicalStore.objects.create(owner=pharmacist, store_name='Benchmark store', store_type='pharmacy')
+
+        names = [self._name() for _ in range(rows)]
+        for start in range(0, rows, 5000):
+            items = CatalogMedicine.objects.bulk_create([
+                CatalogMedicine(
+                    brand_name=name, generic_name=f'{self._name()} {start + i}', chemical_name=self._name(),
+                    atc_code='N02BE01', cas_number='103-90-2',
+                )
+                for i, name in enumerate(names[start:start + 5000])
+            ])
+            Medicine.objects.bulk_create([
+                Medicine(
+                    store=store, catalog_item=item, brand_name=item.brand_name, generic_name=item.generic_name,
+                    stock=random.randint(0, 100), price=random.randint(1, 500),
+                )
+                for item in items
+            ])
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE inventory_catalogmedicine')
+            cursor.execute('ANALYZE inventory_medicine')
+        self.stdout.write(f"Seeded {rows} medicines.")
+        return names
+
+    # QUERIES ===========
+    def _typo(self, word):
+        # drop one character and swap two neighbours, like a hurried user would
+        chars = list(word.lower())
+        if len(chars) > 4:
+            chars.pop(random.randrange(1, len(chars)))
+            i = random.randrange(1, len(chars) - 1)
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        return ''.join(chars)
+
+    def _prefix_page(self, query, page_size):
+        # What SearchFilter with ^brand_name/^generic_name/^catalog_item__chemical_name + PageNumberPagination runs
+        queryset = Medicine.objects.filter(is_deleted=False).filter(
+            Q(brand_name__istartswith=query) | Q(generic_name__istartswith=query) | Q(catalog_item__chemical_name__istartswith=query)
+        ).order_by(Lower('brand_name'))
+        return queryset.count(), list(queryset[:page_size])
+
+    def _trigram_page(self, query, page_size):
+        with similarity_threshold(DEFAULT_SIMILARITY_THRESHOLD):
+            queryset = trigram_search(Medicine.objects.filter(is_deleted=False), query)
+            return queryset.count(), list(queryset[:page_size])
+
+    def _time(self, label, func, queries, page_size):
+        started = time.perf_counter()
+        hits = 0
+        for query in queries:
+            count, _ = func(query, page_size)
+            hits += bool(count)
+        elapsed = (time.perf_counter() - started) * 1000 / len(queries)
+        self.stdout.write(f"{label:<24} {elapsed:8.2f} ms/query   {hits}/{len(queries)} queries found a match")
+
+    def _run(self, names, query_count, page_size):
+        exact = random.sample(names, query_count)
+        typos = [self._typo(name) for name in exact]
+        prefixes = [name[:4] for name in exact]
+
+        self._time('prefix (exact prefix)', self._prefix_page, prefixes, page_size)
+        self._time('prefix (typo)', self._prefix_page, typos, page_size)
+        self._time('trigram (typo)', self._trigram_page, typos, page_size)
+        self._time('trigram (exact name)', self._trigram_page, [name.lower() for name in exact], page_size)
@@ -0,0 +1,17 @@
+# inventory/management/commands/compact_inventory_changes.py
+from django.core.management.base import BaseCommand
+from inventory.changes import COMPACT_BATCH_SIZE, compact_changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Drop the change feed rows superseded by a newer change of the same object, so "
+        "the log holds about one row per medicine or device (run it from cron, e.g. hourly)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=COMPACT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        dropped = compact_changes(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{dropped} superseded changes dropped."))
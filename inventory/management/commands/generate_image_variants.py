@@ -0,0 +1,29 @@
+# inventory/management/commands/generate_image_variants.py
+from django.core.management.base import BaseCommand
+from inventory.images import generate_variants, needs_variants
+from inventory.models import CatalogMedicine, MedicalDevice
+
+
+class Command(BaseCommand):
+    help = "Backfill the resized WebP/AVIF variants of existing medicine and device images"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Rebuild variants that are already up to date")
+
+    def handle(self, *args, **options):
+        for model in (CatalogMedicine, MedicalDevice):
+            done = failed = 0
+            queryset = model.objects.exclude(image='').exclude(image__isnull=True).only('pk', 'image', 'image_variants')
+            for instance in queryset.iterator(chunk_size=500):
+                if options['force']:
+                    model.objects.filter(pk=instance.pk).update(image_variants={})
+                elif not needs_variants(instance):
+                    continue
+                try:
+                    generate_variants(model, instance.pk)
+                    done += 1
+                except (OSError, ValueError) as e:
+                    # missing file or not an image, keep going
+                    failed += 1
+                    self.stderr.write(f"{model.__name__} {instance.pk} ({instance.image.name}): {e}")
+            self.stdout.write(self.style.SUCCESS(f"{model.__name__}: {done} images processed, {failed} failed."))
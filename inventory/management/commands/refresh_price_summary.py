@@ -0,0 +1,20 @@
+# inventory/management/commands/refresh_price_summary.py
+import time
+from django.core.management.base import BaseCommand
+from inventory.prices import refresh_price_summary
+
+
+class Command(BaseCommand):
+    help = "Refresh the cross-store medicine price comparison view (run it from cron, e.g. every 10 minutes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--blocking', action='store_true',
+            help="Plain REFRESH (locks out readers), needed if the view was created WITH NO DATA",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        refresh_price_summary(concurrently=not options['blocking'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Price summary refreshed in {elapsed:.2f}s."))
@@ -0,0 +1,14 @@
+# inventory/management/commands/sweep_reservations.py
+from django.core.management.base import BaseCommand
+from inventory.reservations import SWEEP_BATCH_SIZE, sweep_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Remove the expired cart stock holds in batches (run it from cron, e.g. every minute)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        swept = sweep_expired_holds(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{swept} expired holds swept."))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:12
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_medicine_is_deleted_and_more'),
+        ('medical_stores', '0008_medicalstore_phone'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['brand_name'], name='medicine_brand_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['generic_name'], name='medicine_generic_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['chemical_name'], name='medicine_chemical_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:15
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_medicine_search_vector'),
+        ('medical_stores', '0008_medicalstore_phone'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicaldevice',
+            index=models.Index(django.db.models.functions.text.Lower('manufacturer'), models.F('id'), name='device_manuf_lower_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicaldevice',
+            index=models.Index(fields=['price', 'id'], name='device_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicaldevice',
+            index=models.Index(fields=['stock', 'id'], name='device_stock_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(django.db.models.functions.text.Lower('brand_name'), models.F('id'), name='medicine_brand_lower_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(django.db.models.functions.text.Lower('generic_name'), models.F('id'), name='medicine_generic_lower_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['price', 'id'], name='medicine_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['stock', 'id'], name='medicine_stock_id_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:15
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_keyset_pagination_indexes'),
+        ('medical_stores', '0008_medicalstore_phone'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='medicine',
+            name='medicine_brand_lower_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='medicine',
+            name='medicine_generic_lower_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='medicine',
+            name='medicine_price_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='medicine',
+            name='medicine_stock_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(django.db.models.functions.text.Lower('brand_name'), models.F('id'), condition=models.Q(('is_deleted', False)), name='medicine_brand_lower_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(django.db.models.functions.text.Lower('generic_name'), models.F('id'), condition=models.Q(('is_deleted', False)), name='medicine_generic_lower_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['price', 'id'], name='medicine_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['stock', 'id'], name='medicine_stock_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(models.F('store'), django.db.models.functions.text.Lower('brand_name'), models.F('id'), condition=models.Q(('is_deleted', False)), name='medicine_live_store_brand_idx'),
+        ),
+    ]
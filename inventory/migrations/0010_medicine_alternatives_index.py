@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:22
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_role_scoped_listing_indexes'),
+        ('medical_stores', '0008_medicalstore_phone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicine',
+            name='atc_group',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Substr('atc_code', 1, 5), output_field=models.CharField(max_length=5)),
+        ),
+        migrations.AddField(
+            model_name='medicine',
+            name='generic_key',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower(django.db.models.functions.text.Trim('generic_name')), output_field=models.CharField(max_length=255)),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('stock__gt', 0)), fields=['generic_key', 'price'], name='medicine_alt_generic_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('stock__gt', 0)), fields=['atc_group', 'price'], name='medicine_alt_atc_idx'),
+        ),
+    ]
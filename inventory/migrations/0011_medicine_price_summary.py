@@ -0,0 +1,62 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:25
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+# Cheapest offer per (generic, store) from live, in-stock medicines of approved stores,
+# then min/median/max over the stores. The unique index lets the view be refreshed
+# CONCURRENTLY, so readers are never blocked while it is rebuilt.
+CREATE_PRICE_SUMMARY = """
+CREATE MATERIALIZED VIEW inventory_medicine_price_summary AS
+WITH offers AS (
+    SELECT m.generic_key, m.store_id, MIN(m.price) AS price
+    FROM inventory_medicine m
+    JOIN medical_stores_medicalstore s ON s.id = m.store_id
+    JOIN users_pharmacist p ON p.user_id = s.owner_id
+    WHERE NOT m.is_deleted AND m.stock > 0 AND p.license_status = 'approved'
+    GROUP BY m.generic_key, m.store_id
+)
+SELECT
+    generic_key,
+    MIN(price) AS min_price,
+    (percentile_cont(0.5) WITHIN GROUP (ORDER BY price))::numeric(10, 2) AS median_price,
+    MAX(price) AS max_price,
+    COUNT(*) AS store_count,
+    (array_agg(store_id ORDER BY price, store_id))[1:5] AS cheapest_store_ids,
+    now() AS refreshed_at
+FROM offers
+GROUP BY generic_key;
+
+CREATE UNIQUE INDEX inventory_price_summary_key_idx ON inventory_medicine_price_summary (generic_key);
+"""
+
+DROP_PRICE_SUMMARY = "DROP MATERIALIZED VIEW IF EXISTS inventory_medicine_price_summary;"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_medicine_alternatives_index'),
+        ('medical_stores', '0008_medicalstore_phone'),
+        ('users', '0016_role_scoped_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_PRICE_SUMMARY, DROP_PRICE_SUMMARY),
+        migrations.CreateModel(
+            name='MedicinePriceSummary',
+            fields=[
+                ('generic_key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('median_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('store_count', models.PositiveIntegerField()),
+                ('cheapest_store_ids', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=None)),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'inventory_medicine_price_summary',
+                'managed': False,
+            },
+        ),
+    ]
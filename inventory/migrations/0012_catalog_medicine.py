@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:26
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_medicine_price_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogMedicine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('brand_name', models.CharField(max_length=255)),
+                ('generic_name', models.CharField(max_length=255)),
+                ('chemical_name', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('atc_code', models.CharField(max_length=20)),
+                ('cas_number', models.CharField(max_length=20)),
+                ('image', models.ImageField(blank=True, null=True, upload_to='medicine/images/')),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('search_vector', models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('brand_name', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector('generic_name', config='english', weight='A'), django.contrib.postgres.search.SearchConfig('english')), '||', django.contrib.postgres.search.SearchVector('chemical_name', config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), '||', django.contrib.postgres.search.SearchVector('atc_code', 'cas_number', config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), '||', django.contrib.postgres.search.SearchVector('description', config='english', weight='C'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField())),
+                ('generic_key', models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower(django.db.models.functions.text.Trim('generic_name')), output_field=models.CharField(max_length=255))),
+                ('atc_group', models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Substr('atc_code', 1, 5), output_field=models.CharField(max_length=5))),
+            ],
+            options={
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['brand_name'], name='catalog_brand_trgm_idx', opclasses=['gin_trgm_ops']), django.contrib.postgres.indexes.GinIndex(fields=['generic_name'], name='catalog_generic_trgm_idx', opclasses=['gin_trgm_ops']), django.contrib.postgres.indexes.GinIndex(fields=['chemical_name'], name='catalog_chemical_trgm_idx', opclasses=['gin_trgm_ops']), django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='catalog_search_vector_idx'), models.Index(fields=['generic_key'], name='catalog_generic_key_idx'), models.Index(fields=['atc_group'], name='catalog_atc_group_idx')],
+                'constraints': [models.UniqueConstraint(django.db.models.functions.text.Lower(django.db.models.functions.text.Trim('brand_name')), django.db.models.functions.text.Lower(django.db.models.functions.text.Trim('generic_name')), name='catalog_medicine_natural_key')],
+            },
+        ),
+        migrations.AddField(
+            model_name='medicine',
+            name='catalog_item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='store_items', to='inventory.catalogmedicine'),
+        ),
+    ]
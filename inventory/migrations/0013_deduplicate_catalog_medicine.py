@@ -0,0 +1,49 @@
+from django.db import migrations
+
+# One catalog record per (brand, generic), compared trimmed and case-insensitively.
+# When stores disagree, keep the most complete copy (has a description, has an image),
+# then the most recent one. Every per-store row then points at its catalog record.
+DEDUPLICATE = """
+INSERT INTO inventory_catalogmedicine
+    (brand_name, generic_name, chemical_name, description, atc_code, cas_number, image, timestamp)
+SELECT DISTINCT ON (lower(trim(brand_name)), lower(trim(generic_name)))
+    trim(brand_name), trim(generic_name), chemical_name, description, atc_code, cas_number, image, timestamp
+FROM inventory_medicine
+ORDER BY
+    lower(trim(brand_name)), lower(trim(generic_name)),
+    (coalesce(description, '') <> '') DESC,
+    (coalesce(image, '') <> '') DESC,
+    timestamp DESC;
+
+UPDATE inventory_medicine m
+SET catalog_item_id = c.id
+FROM inventory_catalogmedicine c
+WHERE lower(trim(c.brand_name)) = lower(trim(m.brand_name))
+  AND lower(trim(c.generic_name)) = lower(trim(m.generic_name));
+"""
+
+# copy the shared fields back onto every per-store row (their columns are back by now)
+RESTORE = """
+UPDATE inventory_medicine m
+SET chemical_name = c.chemical_name,
+    description = c.description,
+    atc_code = c.atc_code,
+    cas_number = c.cas_number,
+    image = c.image
+FROM inventory_catalogmedicine c
+WHERE c.id = m.catalog_item_id;
+
+UPDATE inventory_medicine SET catalog_item_id = NULL;
+DELETE FROM inventory_catalogmedicine;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_catalog_medicine'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DEDUPLICATE, RESTORE),
+    ]
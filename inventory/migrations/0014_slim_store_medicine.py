@@ -0,0 +1,134 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:27
+
+import importlib
+import django.db.models.deletion
+from django.db import migrations, models
+
+price_summary_0011 = importlib.import_module('inventory.migrations.0011_medicine_price_summary')
+
+# The price summary now reads the generic key from the catalog (the view depends on the
+# medicine.generic_key column, so it is dropped first and rebuilt at the end)
+CREATE_PRICE_SUMMARY = """
+CREATE MATERIALIZED VIEW inventory_medicine_price_summary AS
+WITH offers AS (
+    SELECT c.generic_key, m.store_id, MIN(m.price) AS price
+    FROM inventory_medicine m
+    JOIN inventory_catalogmedicine c ON c.id = m.catalog_item_id
+    JOIN medical_stores_medicalstore s ON s.id = m.store_id
+    JOIN users_pharmacist p ON p.user_id = s.owner_id
+    WHERE NOT m.is_deleted AND m.stock > 0 AND p.license_status = 'approved'
+    GROUP BY c.generic_key, m.store_id
+)
+SELECT
+    generic_key,
+    MIN(price) AS min_price,
+    (percentile_cont(0.5) WITHIN GROUP (ORDER BY price))::numeric(10, 2) AS median_price,
+    MAX(price) AS max_price,
+    COUNT(*) AS store_count,
+    (array_agg(store_id ORDER BY price, store_id))[1:5] AS cheapest_store_ids,
+    now() AS refreshed_at
+FROM offers
+GROUP BY generic_key;
+
+CREATE UNIQUE INDEX inventory_price_summary_key_idx ON inventory_medicine_price_summary (generic_key);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_deduplicate_catalog_medicine'),
+        ('medical_stores', '0008_medicalstore_phone'),
+    ]
+
+    operations = [
+        migrations.RunSQL(price_summary_0011.DROP_PRICE_SUMMARY, price_summary_0011.CREATE_PRICE_SUMMARY),
+        # defaults only so that unapplying can add the NOT NULL columns back to existing rows
+        # (0013 then copies the values back from the catalog)
+        migrations.AlterField(
+            model_name='medicine',
+            name='chemical_name',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='medicine',
+            name='atc_code',
+            field=models.CharField(default='', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='medicine',
+            name='cas_number',
+            field=models.CharField(default='', max_length=20),
+        ),
+        migrations.RemoveIndex(
+            model_name='medicine',
+            name='inventory_m_chemica_694422_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='medicine',
+            name='medicine_brand_trgm_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='medicine',
+            name='medicine_generic_trgm_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='medicine',
+            name='medicine_chemical_trgm_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='medicine',
+            name='medicine_search_vector_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='medicine',
+            name='medicine_alt_generic_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='medicine',
+            name='medicine_alt_atc_idx',
+        ),
+        # generated columns first, dropping their source columns would cascade to them
+        migrations.RemoveField(
+            model_name='medicine',
+            name='atc_group',
+        ),
+        migrations.RemoveField(
+            model_name='medicine',
+            name='generic_key',
+        ),
+        migrations.RemoveField(
+            model_name='medicine',
+            name='search_vector',
+        ),
+        migrations.RemoveField(
+            model_name='medicine',
+            name='atc_code',
+        ),
+        migrations.RemoveField(
+            model_name='medicine',
+            name='cas_number',
+        ),
+        migrations.RemoveField(
+            model_name='medicine',
+            name='chemical_name',
+        ),
+        migrations.RemoveField(
+            model_name='medicine',
+            name='description',
+        ),
+        migrations.RemoveField(
+            model_name='medicine',
+            name='image',
+        ),
+        migrations.AlterField(
+            model_name='medicine',
+            name='catalog_item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='store_items', to='inventory.catalogmedicine'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('stock__gt', 0)), fields=['catalog_item', 'price'], name='medicine_live_catalog_idx'),
+        ),
+        migrations.RunSQL(CREATE_PRICE_SUMMARY, price_summary_0011.DROP_PRICE_SUMMARY),
+    ]
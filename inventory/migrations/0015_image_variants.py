@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_slim_store_medicine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogmedicine',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='medicaldevice',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
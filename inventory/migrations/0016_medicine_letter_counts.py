@@ -0,0 +1,87 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The A-Z counts are kept by triggers, so bulk_create, bulk_update and queryset.update()
+# (imports, stock adjustments) count too. A row is added to its (store, letter) when it
+# is live and taken out when it stops being live, moves, or is renamed to another letter.
+# Taking out is a plain UPDATE: when a store is deleted, its counts may already be gone.
+CREATE_LETTER_COUNT_TRIGGERS = """
+CREATE FUNCTION inventory_brand_letter(name text) RETURNS text
+IMMUTABLE LANGUAGE sql AS $$
+    SELECT CASE WHEN upper(left(name, 1)) ~ '^[A-Z]$' THEN upper(left(name, 1)) ELSE '#' END
+$$;
+
+CREATE FUNCTION inventory_medicine_letter_count() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' AND NOT OLD.is_deleted AND OLD.store_id IS NOT NULL THEN
+        UPDATE inventory_medicinelettercount
+        SET total = total - 1, in_stock = in_stock - (OLD.stock > 0)::int
+        WHERE store_id = OLD.store_id AND letter = inventory_brand_letter(OLD.brand_name);
+    END IF;
+    IF TG_OP <> 'DELETE' AND NOT NEW.is_deleted AND NEW.store_id IS NOT NULL THEN
+        INSERT INTO inventory_medicinelettercount (store_id, letter, total, in_stock)
+        VALUES (NEW.store_id, inventory_brand_letter(NEW.brand_name), 1, (NEW.stock > 0)::int)
+        ON CONFLICT (store_id, letter) DO UPDATE
+        SET total = inventory_medicinelettercount.total + 1,
+            in_stock = inventory_medicinelettercount.in_stock + EXCLUDED.in_stock;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER inventory_medicine_letter_count_insert_delete
+AFTER INSERT OR DELETE ON inventory_medicine
+FOR EACH ROW EXECUTE FUNCTION inventory_medicine_letter_count();
+
+-- price and description edits leave the counts alone
+CREATE TRIGGER inventory_medicine_letter_count_update
+AFTER UPDATE OF store_id, brand_name, stock, is_deleted ON inventory_medicine
+FOR EACH ROW WHEN (
+    OLD.store_id IS DISTINCT FROM NEW.store_id
+    OR OLD.is_deleted IS DISTINCT FROM NEW.is_deleted
+    OR (OLD.stock > 0) IS DISTINCT FROM (NEW.stock > 0)
+    OR inventory_brand_letter(OLD.brand_name) IS DISTINCT FROM inventory_brand_letter(NEW.brand_name)
+) EXECUTE FUNCTION inventory_medicine_letter_count();
+
+INSERT INTO inventory_medicinelettercount (store_id, letter, total, in_stock)
+SELECT store_id, inventory_brand_letter(brand_name), COUNT(*), COUNT(*) FILTER (WHERE stock > 0)
+FROM inventory_medicine
+WHERE NOT is_deleted AND store_id IS NOT NULL
+GROUP BY 1, 2;
+"""
+
+DROP_LETTER_COUNT_TRIGGERS = """
+DROP TRIGGER IF EXISTS inventory_medicine_letter_count_update ON inventory_medicine;
+DROP TRIGGER IF EXISTS inventory_medicine_letter_count_insert_delete ON inventory_medicine;
+DROP FUNCTION IF EXISTS inventory_medicine_letter_count();
+DROP FUNCTION IF EXISTS inventory_brand_letter(text);
+"""
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_image_variants'),
+        ('medical_stores', '0008_medicalstore_phone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MedicineLetterCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('letter', models.CharField(max_length=1)),
+                ('total', models.IntegerField(default=0)),
+                ('in_stock', models.IntegerField(default=0)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='medicine_letter_counts', to='medical_stores.medicalstore')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('store', 'letter'), name='medicine_letter_count_store_letter')],
+            },
+        ),
+        migrations.RunSQL(CREATE_LETTER_COUNT_TRIGGERS, DROP_LETTER_COUNT_TRIGGERS),
+    ]
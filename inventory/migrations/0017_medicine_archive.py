@@ -0,0 +1,87 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:52
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# deleted_at follows is_deleted on every write path (save(), bulk_update, the
+# bulk_adjust_stock CASE update), a row that stays deleted keeps its first deletion
+# time whatever the instance that saved it held. Rows already deleted start their
+# clock at the migration, not at their creation.
+CREATE_DELETED_AT_TRIGGER = """
+CREATE FUNCTION inventory_medicine_deleted_at() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF NOT NEW.is_deleted THEN
+        NEW.deleted_at = NULL;
+    ELSIF TG_OP = 'INSERT' OR NOT OLD.is_deleted THEN
+        NEW.deleted_at = now();
+    ELSE
+        NEW.deleted_at = OLD.deleted_at;
+    END IF;
+    RETURN NEW;
+END
+$$;
+
+CREATE TRIGGER inventory_medicine_deleted_at
+BEFORE INSERT OR UPDATE ON inventory_medicine
+FOR EACH ROW EXECUTE FUNCTION inventory_medicine_deleted_at();
+
+UPDATE inventory_medicine SET deleted_at = now() WHERE is_deleted;
+"""
+
+DROP_DELETED_AT_TRIGGER = """
+DROP TRIGGER IF EXISTS inventory_medicine_deleted_at ON inventory_medicine;
+DROP FUNCTION IF EXISTS inventory_medicine_deleted_at();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0016_medicine_letter_counts'),
+        ('medical_stores', '0008_medicalstore_phone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMedicine',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('stock', models.PositiveIntegerField()),
+                ('timestamp', models.DateTimeField()),
+                ('is_deleted', models.BooleanField(default=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField()),
+                ('generic_name', models.CharField(max_length=255)),
+                ('brand_name', models.CharField(max_length=255)),
+                ('alternative_ids', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, size=None)),
+                ('price', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='medicine',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='medicine_deleted_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedmedicine',
+            name='catalog_item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_items', to='inventory.catalogmedicine'),
+        ),
+        migrations.AddField(
+            model_name='archivedmedicine',
+            name='store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_medicines', to='medical_stores.medicalstore'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedmedicine',
+            index=models.Index(models.F('store'), django.db.models.functions.text.Lower('brand_name'), models.F('id'), name='archived_store_brand_idx'),
+        ),
+        migrations.RunSQL(CREATE_DELETED_AT_TRIGGER, DROP_DELETED_AT_TRIGGER),
+    ]
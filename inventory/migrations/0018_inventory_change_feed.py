@@ -0,0 +1,98 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+# Statement level triggers with transition tables: a bulk update (stock adjustments,
+# imports, order checkout) logs its rows with one INSERT ... SELECT, and a save() that
+# changes nothing logs nothing. A row moved to another store is also logged as deleted
+# from the old one. The rows already there are logged once, for the first full sync.
+CHANGE_TABLES = [('inventory_medicine', 'medicine'), ('inventory_medicaldevice', 'device')]
+
+CREATE_CHANGE_FUNCTION = """
+CREATE FUNCTION inventory_record_changes() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO inventory_inventorychange (txid, kind, object_id, store_id, deleted, changed_at)
+        SELECT pg_current_xact_id()::text::bigint, TG_ARGV[0], n.id, n.store_id, false, now()
+        FROM new_rows n ORDER BY n.id;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO inventory_inventorychange (txid, kind, object_id, store_id, deleted, changed_at)
+        SELECT pg_current_xact_id()::text::bigint, TG_ARGV[0], o.id, o.store_id, true, now()
+        FROM old_rows o ORDER BY o.id;
+    ELSE
+        INSERT INTO inventory_inventorychange (txid, kind, object_id, store_id, deleted, changed_at)
+        SELECT pg_current_xact_id()::text::bigint, TG_ARGV[0], id, store_id, deleted, now()
+        FROM (
+            SELECT n.id, o.store_id, true AS deleted
+            FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE o.store_id IS DISTINCT FROM n.store_id
+            UNION ALL
+            SELECT n.id, n.store_id, false
+            FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE o IS DISTINCT FROM n
+        ) changed
+        ORDER BY id, deleted DESC;
+    END IF;
+    RETURN NULL;
+END
+$$;
+"""
+
+CREATE_CHANGE_TRIGGERS = """
+CREATE TRIGGER {table}_changes_insert AFTER INSERT ON {table}
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION inventory_record_changes('{kind}');
+
+CREATE TRIGGER {table}_changes_update AFTER UPDATE ON {table}
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION inventory_record_changes('{kind}');
+
+CREATE TRIGGER {table}_changes_delete AFTER DELETE ON {table}
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION inventory_record_changes('{kind}');
+
+INSERT INTO inventory_inventorychange (txid, kind, object_id, store_id, deleted, changed_at)
+SELECT pg_current_xact_id()::text::bigint, '{kind}', id, store_id, false, now()
+FROM {table} ORDER BY id;
+"""
+
+DROP_CHANGE_TRIGGERS = """
+DROP TRIGGER IF EXISTS {table}_changes_insert ON {table};
+DROP TRIGGER IF EXISTS {table}_changes_update ON {table};
+DROP TRIGGER IF EXISTS {table}_changes_delete ON {table};
+"""
+
+DROP_CHANGE_FUNCTION = "DROP FUNCTION IF EXISTS inventory_record_changes();"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0017_medicine_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('txid', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('medicine', 'Medicine'), ('device', 'Medical device')], max_length=8)),
+                ('object_id', models.BigIntegerField()),
+                ('store_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['txid', 'id'], name='inventory_change_txid_idx'), models.Index(fields=['store_id', 'txid', 'id'], name='inventory_change_store_idx'), models.Index(fields=['kind', 'object_id', 'store_id'], name='inventory_change_object_idx')],
+            },
+        ),
+        migrations.RunSQL(CREATE_CHANGE_FUNCTION, DROP_CHANGE_FUNCTION),
+    ] + [
+        migrations.RunSQL(
+            CREATE_CHANGE_TRIGGERS.format(table=table, kind=kind),
+            DROP_CHANGE_TRIGGERS.format(table=table),
+        )
+        for table, kind in CHANGE_TABLES
+    ]
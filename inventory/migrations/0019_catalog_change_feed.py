@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:10
+
+from django.db import migrations
+
+# The medicine payload of the change feed carries the shared catalog fields, but an
+# edit of a CatalogMedicine changes none of the store rows. Log every store row of the
+# changed records as a medicine change. Only updates: a new record has no store rows
+# yet, and one that has them cannot be deleted (PROTECT).
+CREATE_CATALOG_CHANGES = """
+CREATE FUNCTION inventory_record_catalog_changes() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO inventory_inventorychange (txid, kind, object_id, store_id, deleted, changed_at)
+    SELECT pg_current_xact_id()::text::bigint, 'medicine', m.id, m.store_id, false, now()
+    FROM new_rows n JOIN old_rows o ON o.id = n.id
+    JOIN inventory_medicine m ON m.catalog_item_id = n.id
+    WHERE o IS DISTINCT FROM n
+    ORDER BY m.id;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER inventory_catalogmedicine_changes_update AFTER UPDATE ON inventory_catalogmedicine
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION inventory_record_catalog_changes();
+"""
+
+DROP_CATALOG_CHANGES = """
+DROP TRIGGER IF EXISTS inventory_catalogmedicine_changes_update ON inventory_catalogmedicine;
+DROP FUNCTION IF EXISTS inventory_record_catalog_changes();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0018_inventory_change_feed'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_CATALOG_CHANGES, DROP_CATALOG_CHANGES),
+    ]
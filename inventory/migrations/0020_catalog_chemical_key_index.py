@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:19
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0019_catalog_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='catalogmedicine',
+            index=models.Index(django.db.models.functions.text.Lower(django.db.models.functions.text.Trim('chemical_name')), name='catalog_chemical_key_idx'),
+        ),
+    ]
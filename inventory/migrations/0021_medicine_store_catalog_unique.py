@@ -0,0 +1,60 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+# Stores could list the same catalog drug twice. Keep one row per (store, drug), a live
+# one first, add the live stock of the others to it and move the others to the archive:
+# orders and carts name medicines by id, and inventory.archive.medicines_by_id still
+# resolves archived ones.
+MERGE_DUPLICATES = """
+SET CONSTRAINTS ALL IMMEDIATE;
+
+CREATE TEMPORARY TABLE medicine_duplicates ON COMMIT DROP AS
+SELECT id, keeper_id FROM (
+    SELECT id, first_value(id) OVER (PARTITION BY store_id, catalog_item_id ORDER BY is_deleted, id) AS keeper_id
+    FROM inventory_medicine
+    WHERE store_id IS NOT NULL
+) ranked
+WHERE id <> keeper_id;
+
+UPDATE inventory_medicine k
+SET stock = k.stock + extra.stock
+FROM (
+    SELECT d.keeper_id, sum(m.stock) AS stock
+    FROM medicine_duplicates d JOIN inventory_medicine m ON m.id = d.id
+    WHERE NOT m.is_deleted
+    GROUP BY d.keeper_id
+) extra
+WHERE k.id = extra.keeper_id;
+
+INSERT INTO inventory_archivedmedicine
+    (id, stock, timestamp, is_deleted, deleted_at, catalog_item_id, generic_name, brand_name, price, store_id,
+     archived_at, alternative_ids)
+SELECT m.id, 0, m.timestamp, true, coalesce(m.deleted_at, now()), m.catalog_item_id, m.generic_name, m.brand_name,
+    m.price, m.store_id, now(), coalesce(
+        (SELECT array_agg(l.to_medicine_id ORDER BY l.to_medicine_id)
+         FROM inventory_medicine_alternative_medicines l WHERE l.from_medicine_id = m.id), '{}'
+    )
+FROM inventory_medicine m JOIN medicine_duplicates d ON d.id = m.id;
+
+DELETE FROM inventory_medicine_alternative_medicines l USING medicine_duplicates d
+WHERE l.from_medicine_id = d.id OR l.to_medicine_id = d.id;
+
+DELETE FROM inventory_medicine m USING medicine_duplicates d WHERE m.id = d.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0020_catalog_chemical_key_index'),
+    ]
+
+    operations = [
+        # merged rows stay in the archive, restore_medicines() skips them
+        migrations.RunSQL(MERGE_DUPLICATES, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='medicine',
+            constraint=models.UniqueConstraint(fields=('store', 'catalog_item'), name='medicine_store_catalog_item_uniq'),
+        ),
+    ]
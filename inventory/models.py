@@ -1,22 +1,90 @@
 # inventory/models.py
 from django.db import models
+from django.db.models.functions import Lower, Substr, Trim
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from medical_stores.models import MedicalStore
 
+# CATALOG MODEL===========
+# [one shared record per drug (brand + generic), the per-store Medicine rows point at it,
+#  so descriptions, images and the search indexes no longer grow with the number of stores]
+class CatalogMedicine(models.Model):
+    brand_name = models.CharField(max_length=255)
+    generic_name = models.CharField(max_length=255)
+    chemical_name = models.CharField(max_length=255)
+    description = models.TextField(null=True, blank=True)
+    atc_code = models.CharField(max_length=20)
+    cas_number = models.CharField(max_length=20)
+    image = models.ImageField(upload_to='medicine/images/', null=True, blank=True)
+    # resized WebP/AVIF copies of image, written by inventory.images after each upload
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    timestamp = models.DateTimeField(auto_now_add=True)
+
+    # Weighted full-text document, kept up to date by Postgres on every insert/update (bulk ones too)
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('brand_name', weight='A', config='english')
+            + SearchVector('generic_name', weight='A', config='english')
+            + SearchVector('chemical_name', weight='B', config='english')
+            + SearchVector('atc_code', 'cas_number', weight='B', config='english')
+            + SearchVector('description', weight='C', config='english')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    # Alternatives index keys: the normalized generic name and the ATC chemical
+    # subgroup (level 4, e.g. N02BE)
+    generic_key = models.GeneratedField(
+        expression=Lower(Trim('generic_name')),
+        output_field=models.CharField(max_length=255),
+        db_persist=True,
+    )
+    atc_group = models.GeneratedField(
+        expression=Substr('atc_code', 1, 5),
+        output_field=models.CharField(max_length=5),
+        db_persist=True,
+    )
+
+    class Meta:
+        constraints = [
+            # same natural key as the bulk import: brand + generic, case-insensitive
+            models.UniqueConstraint(Lower(Trim('brand_name')), Lower(Trim('generic_name')), name='catalog_medicine_natural_key'),
+        ]
+        indexes = [
+            # Trigram indexes so fuzzy (typo tolerant) search can use `%` instead of a seq scan
+            GinIndex(fields=['brand_name'], name='catalog_brand_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['generic_name'], name='catalog_generic_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['chemical_name'], name='catalog_chemical_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['search_vector'], name='catalog_search_vector_idx'),
+            models.Index(fields=['generic_key'], name='catalog_generic_key_idx'),
+            # autocomplete recounts of chemical names (inventory.autocomplete.count_names)
+            models.Index(Lower(Trim('chemical_name')), name='catalog_chemical_key_idx'),
+            models.Index(fields=['atc_group'], name='catalog_atc_group_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.brand_name} - {self.generic_name}"
+
 # MEDICINE MODEL===========
+# [one row per store: the store's price and stock of a catalog drug]
 class Medicine(models.Model):
     # mandatory
     stock = models.PositiveIntegerField()
     timestamp = models.DateTimeField(auto_now_add=True)
     # [SENU]: Added for soft delete functionality
     is_deleted = models.BooleanField(default=False)
+    # when is_deleted was last turned on, kept by a database trigger (every write path
+    # sets is_deleted, bulk ones included); inventory.archive moves the old ones out
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # shared drug record: chemical name, description, ATC/CAS codes, image, search indexes
+    catalog_item = models.ForeignKey(CatalogMedicine, on_delete=models.PROTECT, related_name='store_items')
 
-    # info for the page
+    # copies of the catalog names, the keys the per-store listings sort and paginate on
     generic_name = models.CharField(max_length=255)
     brand_name = models.CharField(max_length=255)
-    chemical_name = models.CharField(max_length=255)
-    description = models.TextField(null=True, blank=True)
-    atc_code = models.CharField(max_length=20)
-    cas_number = models.CharField(max_length=20)
 
     # alternatives for the medicines
     alternative_medicines = models.ManyToManyField('self', blank=True)
@@ -25,23 +93,64 @@ class Medicine(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     store = models.ForeignKey(MedicalStore, on_delete=models.CASCADE, null=True, blank=True)
 
-    # [SARA]: Added image field for medicine
-    image = models.ImageField(upload_to='medicine/images/', null=True, blank=True)
-
     # TO FAST THE SORTING
     # ====================
     class Meta:
         indexes = [
             models.Index(fields=['brand_name']),
             models.Index(fields=['generic_name']),
-            models.Index(fields=['chemical_name']),
             # [SENU]: Added index for faster filtering of soft-deleted records
             models.Index(fields=['is_deleted']),
+            # (sort key, id) pairs for the listings and keyset pagination. Every listing
+            # filters is_deleted=False, so they are partial and skip the archived rows
+            models.Index(Lower('brand_name'), 'id', name='medicine_brand_lower_id_idx', condition=models.Q(is_deleted=False)),
+            models.Index(Lower('generic_name'), 'id', name='medicine_generic_lower_id_idx', condition=models.Q(is_deleted=False)),
+            models.Index(fields=['price', 'id'], name='medicine_price_id_idx', condition=models.Q(is_deleted=False)),
+            models.Index(fields=['stock', 'id'], name='medicine_stock_id_idx', condition=models.Q(is_deleted=False)),
+            # pharmacist listing: own store, A-Z
+            models.Index('store', Lower('brand_name'), 'id', name='medicine_live_store_brand_idx', condition=models.Q(is_deleted=False)),
+            # offers of a catalog drug that can actually be sold (alternatives, price comparison)
+            models.Index(fields=['catalog_item', 'price'], name='medicine_live_catalog_idx', condition=models.Q(is_deleted=False, stock__gt=0)),
+            # the archive mover's scan for rows deleted long ago
+            models.Index(fields=['deleted_at'], name='medicine_deleted_at_idx', condition=models.Q(is_deleted=True)),
+        ]
+        constraints = [
+            # one row per drug and store, the bulk import upserts on it
+            models.UniqueConstraint(fields=['store', 'catalog_item'], name='medicine_store_catalog_item_uniq'),
         ]
     # [AMS]: Add STR method to present the Medicine in a human-readable format
     def __str__(self):
         return f"{self.brand_name} - {self.generic_name}"
 
+# ARCHIVED MEDICINE MODEL===========
+# [cold tier: soft-deleted rows moved out of inventory_medicine by inventory.archive.
+#  The id is kept, orders and carts name medicines by id, and a restore puts it back]
+class ArchivedMedicine(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    stock = models.PositiveIntegerField()
+    timestamp = models.DateTimeField()
+    is_deleted = models.BooleanField(default=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField()
+
+    catalog_item = models.ForeignKey(CatalogMedicine, on_delete=models.PROTECT, related_name='archived_items')
+    generic_name = models.CharField(max_length=255)
+    brand_name = models.CharField(max_length=255)
+    # the alternative_medicines links, they are dropped from the hot table on the move
+    alternative_ids = ArrayField(models.BigIntegerField(), default=list, blank=True)
+
+    price = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
+    store = models.ForeignKey(MedicalStore, on_delete=models.CASCADE, null=True, blank=True, related_name='archived_medicines')
+
+    class Meta:
+        indexes = [
+            # deleted_by_store: a store's archive, A-Z
+            models.Index('store', Lower('brand_name'), 'id', name='archived_store_brand_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.brand_name} - {self.generic_name} (archived)"
+
 # MEDICAL DEVICES================
 class MedicalDevice(models.Model):
     stock = models.PositiveIntegerField()
@@ -57,7 +166,86 @@ class MedicalDevice(models.Model):
 
     # [SARA]: Added image field for medical device
     image = models.ImageField(upload_to='medicaldevice/images/', null=True, blank=True)
+    # resized WebP/AVIF copies of image, written by inventory.images after each upload
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # (sort key, id) pairs for the keyset pagination
+            models.Index(Lower('manufacturer'), 'id', name='device_manuf_lower_id_idx'),
+            models.Index(fields=['price', 'id'], name='device_price_id_idx'),
+            models.Index(fields=['stock', 'id'], name='device_stock_id_idx'),
+        ]
     
     # [AMS]: Add STR method to present the device in a human-readable format
     def __str__(self):
-        return f"{self.model_number} - {self.serial_number}"
\ No newline at end of file
+        return f"{self.model_number} - {self.serial_number}"
+
+# PRICE COMPARISON================
+# [read only: a Postgres materialized view created in migration 0011 (rebuilt on the catalog in 0014), refreshed with
+#  `manage.py refresh_price_summary`]
+class MedicinePriceSummary(models.Model):
+    # CatalogMedicine.generic_key, the normalized generic name
+    generic_key = models.CharField(max_length=255, primary_key=True)
+    # prices are per store (its cheapest live, in-stock offer) from approved stores only
+    min_price = models.DecimalField(max_digits=10, decimal_places=2)
+    median_price = models.DecimalField(max_digits=10, decimal_places=2)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2)
+    store_count = models.PositiveIntegerField()
+    # cheapest first, at most 5 of them
+    cheapest_store_ids = ArrayField(models.IntegerField())
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'inventory_medicine_price_summary'
+
+    def __str__(self):
+        return f"{self.generic_key}: {self.min_price} - {self.max_price} ({self.store_count} stores)"
+
+# A-Z FACETS================
+# [one row per (store, first letter of brand_name) of the live medicines, kept up to date by
+#  the inventory_medicine triggers of migration 0016, so every write path (bulk ones too) counts]
+class MedicineLetterCount(models.Model):
+    store = models.ForeignKey(MedicalStore, on_delete=models.CASCADE, related_name='medicine_letter_counts')
+    # upper-cased A-Z, '#' for names starting with anything else
+    letter = models.CharField(max_length=1)
+    # not soft-deleted / and with stock > 0
+    total = models.IntegerField(default=0)
+    in_stock = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['store', 'letter'], name='medicine_letter_count_store_letter'),
+        ]
+
+    def __str__(self):
+        return f"{self.store_id} {self.letter}: {self.total} ({self.in_stock} in stock)"
+
+# CHANGE FEED================
+# [append-only log of the medicine and device rows written, one row per row and
+#  statement, filled by the triggers of migration 0018 in the writing transaction.
+#  Read in (txid, id) order by /inventory/changes/, see inventory.changes]
+class InventoryChange(models.Model):
+    KIND_CHOICES = [('medicine', 'Medicine'), ('device', 'Medical device')]
+
+    # the writing transaction (pg_current_xact_id()), the feed's order
+    txid = models.BigIntegerField()
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    # no foreign key: the rows of a deleted store report their deletes after it is gone
+    store_id = models.BigIntegerField(null=True, blank=True)
+    # the row was deleted (or moved to another store), else it was inserted or updated
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['txid', 'id'], name='inventory_change_txid_idx'),
+            models.Index(fields=['store_id', 'txid', 'id'], name='inventory_change_store_idx'),
+            # compaction: the older rows of the same object
+            models.Index(fields=['kind', 'object_id', 'store_id'], name='inventory_change_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} {'deleted' if self.deleted else 'changed'} in {self.txid}"
@@ -0,0 +1,162 @@
+# inventory/pagination.py
+import base64
+import json
+from decimal import Decimal
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import BooleanField, F, FloatField, Func, Value
+from django.db.models.functions import Cast
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class RowGreaterThan(Func):
+    """
+    `(a, b) > (c, d)` (or `<` when descending). Postgres answers a row comparison
+    straight from a composite (a, b) index, unlike the equivalent OR of conditions.
+    """
+    output_field = BooleanField()
+
+    def __init__(self, lhs, rhs, descending=False):
+        self.width = len(lhs)
+        self.descending = descending
+        super().__init__(*lhs, *rhs)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sqls, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            sqls.append(sql)
+            params.extend(expression_params)
+        op = '<' if self.descending else '>'
+        lhs, rhs = ', '.join(sqls[:self.width]), ', '.join(sqls[self.width:])
+        return f'({lhs}) {op} ({rhs})', params
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination ordered by (sort key, id), e.g. (Lower(brand_name), id).
+
+    Every page is an index range scan starting right after the previous page's last
+    row, so there is no COUNT(*) and no OFFSET and deep pages cost the same as the
+    first one. The view lists the allowed sort keys in `keyset_orderings`
+    ({ordering name: expression}) and picks the default with `keyset_default_ordering`;
+    the client chooses one with the usual ?ordering=price / ?ordering=-price.
+
+    A queryset ranked by relevance (?q= full-text `rank`, /search/ trigram `similarity`)
+    keeps that order: it pages on (relevance, id), best first.
+    """
+    cursor_query_param = 'cursor'
+    ordering_param = 'ordering'
+    invalid_cursor_message = 'Invalid cursor'
+    relevance_annotations = ('rank', 'similarity')
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    def get_ordering(self, request, view):
+        orderings = view.keyset_orderings
+        requested = request.query_params.get(self.ordering_param, '').split(',')[0].strip()
+        name = requested.lstrip('-')
+        if name in orderings:
+            return name, orderings[name], requested.startswith('-')
+        return view.keyset_default_ordering, orderings[view.keyset_default_ordering], False
+
+    def get_relevance(self, queryset):
+        # the relevance annotation the queryset is ordered by (descending), if any
+        ordering = queryset.query.order_by
+        first = ordering[0] if ordering else None
+        if isinstance(first, str) and first.startswith('-'):
+            name = first[1:]
+            if name in self.relevance_annotations and name in queryset.query.annotations:
+                return name
+        return None
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != 2:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def clean_position(self, position, queryset):
+        # a tampered value must not reach the database as the wrong type
+        value, pk = position
+        key_field = queryset.query.annotations['_keyset_value'].output_field
+        try:
+            if value is not None:
+                value = key_field.to_python(value)
+            return value, queryset.model._meta.pk.to_python(pk)
+        except (DjangoValidationError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, value, pk):
+        if isinstance(value, Decimal):
+            value = str(value)
+        raw = json.dumps([value, pk]).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        relevance = self.get_relevance(queryset)
+        if relevance:
+            # rank and similarity are `real`, a double survives the trip through the cursor
+            key, descending = Cast(relevance, FloatField()), True
+        else:
+            _, key, descending = self.get_ordering(request, view)
+
+        queryset = queryset.annotate(_keyset_value=key)
+        position = self.decode_cursor(request)
+        if position is not None:
+            value, pk = self.clean_position(position, queryset)
+            queryset = queryset.filter(
+                RowGreaterThan([F('_keyset_value'), F('pk')], [Value(value), Value(pk)], descending=descending)
+            )
+
+        if descending:
+            queryset = queryset.order_by(F('_keyset_value').desc(), '-pk')
+        else:
+            queryset = queryset.order_by('_keyset_value', 'pk')
+
+        # one extra row tells us whether there is a next page without counting
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.has_next:
+            last = rows[-1]
+            # model instances, or dicts when the view paginates a values() queryset
+            if isinstance(last, dict):
+                self.next_position = (last['_keyset_value'], last['pk'])
+            else:
+                self.next_position = (last._keyset_value, last.pk)
+        else:
+            self.next_position = None
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(*self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,13 @@
+# inventory/prices.py
+from django.db import connection
+from .models import MedicinePriceSummary
+
+
+def refresh_price_summary(concurrently=True):
+    """
+    Rebuild the price comparison materialized view. CONCURRENTLY keeps it readable
+    during the rebuild (it needs the unique generic_key index and a populated view).
+    """
+    mode = 'CONCURRENTLY ' if concurrently else ''
+    with connection.cursor() as cursor:
+        cursor.execute(f'REFRESH MATERIALIZED VIEW {mode}{MedicinePriceSummary._meta.db_table}')
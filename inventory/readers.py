@@ -0,0 +1,143 @@
+# inventory/readers.py
+from collections import defaultdict
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+class ValuesListReader:
+    """
+    Read-only fast path for a ModelSerializer's list output.
+
+    The serializer's readable fields are compiled once into (lookup, converter) pairs;
+    the rows are then read with queryset.values() and turned into dicts directly,
+    without building model instances or calling get_attribute() per field. The
+    converters are the serializer fields' own to_representation(), so the JSON is
+    the same as serializer(page, many=True).data.
+
+    SerializerMethodFields need the serializer to say where their value comes from:
+    `values_method_fields = {name: lookup}` and a `from_values_<name>(value)` method.
+    """
+
+    def __init__(self, serializer, queryset):
+        self.serializer = serializer
+        self.model = serializer.Meta.model
+        self.request = serializer.context.get('request')
+        annotations = set(queryset.query.annotations)
+        self.columns = []    # (output name, values() lookup, converter, convert None too)
+        self.many = []       # (output name, related manager descriptor field)
+
+        for field in serializer._readable_fields:
+            name = field.field_name
+            if isinstance(field, serializers.SerializerMethodField):
+                lookup = serializer.values_method_fields[name]
+                # like get_<name>(obj), called for every row
+                self.columns.append((name, lookup, getattr(serializer, f'from_values_{name}'), True))
+                continue
+            if isinstance(field, ManyRelatedField):
+                self.many.append((name, self.model._meta.get_field(field.source)))
+                self.columns.append((name, None, None, False))
+                continue
+
+            lookup = '__'.join(field.source_attrs)
+            if field.source_attrs[0] not in annotations and not self._is_model_path(field.source_attrs):
+                # read-only extras (rank, headline, ...) the serializer skips when not annotated
+                continue
+            if isinstance(field, RelatedField):
+                # values() already gives the primary key
+                self.columns.append((name, lookup, None, False))
+            elif isinstance(field, serializers.FileField):
+                self.columns.append((name, lookup, self._file_converter(field), False))
+            else:
+                self.columns.append((name, lookup, field.to_representation, False))
+
+    def _is_model_path(self, source_attrs):
+        model = self.model
+        for attr in source_attrs:
+            if model is None:
+                return False
+            try:
+                model = model._meta.get_field(attr).related_model
+            except FieldDoesNotExist:
+                return False
+        return True
+
+    def _model_field(self, source_attrs):
+        model = self.model
+        for attr in source_attrs[:-1]:
+            model = model._meta.get_field(attr).related_model
+        return model._meta.get_field(source_attrs[-1])
+
+    def _file_converter(self, field):
+        # same as FileField.to_representation, from the stored name instead of a FieldFile
+        storage = self._model_field(field.source_attrs).storage
+        use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+
+        def convert(name):
+            if not name:
+                return None
+            if not use_url:
+                return name
+            url = storage.url(name)
+            return self.request.build_absolute_uri(url) if self.request is not None else url
+        return convert
+
+    def values(self, queryset):
+        """The queryset to paginate: dicts with just the lookups the fields need."""
+        lookups = {lookup for _, lookup, _, _ in self.columns if lookup}
+        return queryset.values('pk', *sorted(lookups))
+
+    def _many_values(self, rows):
+        related = {}
+        pks = [row['pk'] for row in rows]
+        for name, model_field in self.many:
+            through = model_field.remote_field.through
+            source, target = model_field.m2m_field_name(), model_field.m2m_reverse_name()
+            linked = defaultdict(list)
+            pairs = through.objects.filter(**{f'{source}__in': pks}).order_by('pk').values_list(source, target)
+            for pk, related_pk in pairs:
+                linked[pk].append(related_pk)
+            related[name] = linked
+        return related
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        related = self._many_values(rows) if self.many else {}
+        data = []
+        for row in rows:
+            item = {}
+            for name, lookup, convert, convert_none in self.columns:
+                if lookup is None:
+                    item[name] = related[name].get(row['pk'], [])
+                    continue
+                value = row[lookup]
+                # Serializer.to_representation skips the field's converter for None
+                if value is None and not convert_none:
+                    item[name] = None
+                else:
+                    item[name] = convert(value) if convert else value
+            data.append(item)
+        return data
+
+
+class ValuesListMixin:
+    """
+    `list` through ValuesListReader. The page is fetched as values() dicts, so it works
+    with every paginator that only slices the queryset (and with KeysetPagination).
+    """
+    values_list_enabled = True
+
+    def list(self, request, *args, **kwargs):
+        if not self.values_list_enabled:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        reader = ValuesListReader(self.get_serializer(), queryset)
+        rows = reader.values(queryset)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.to_representation(page))
+        return Response(reader.to_representation(rows))
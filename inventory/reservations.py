@@ -0,0 +1,220 @@
+# inventory/reservations.py
+import logging
+import time
+import redis
+from django.db import transaction
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+from .archive import parse_medicine_id
+from .cache import bump_generations_on_commit, redis_conn
+from .models import ArchivedMedicine, Medicine
+
+logger = logging.getLogger(__name__)
+
+# Stock held for carts. A cart holds its quantities for RESERVATION_TTL seconds (every
+# change to the cart renews it), other carts and orders only see stock minus the holds.
+# Per medicine a hash {holder: "quantity:expires_at_ms"}, plus one sorted set of
+# "medicine_id:holder" by expiry for the sweeper. Holders are user ids (one cart each).
+RESERVATION_TTL = 15 * 60
+HOLD_KEY = 'inventory:hold:{}'
+HOLD_EXPIRY_KEY = 'inventory:hold:expiry'
+SWEEP_BATCH_SIZE = 500
+
+# Checks every medicine first and only then writes, so a cart gets all its holds or none.
+# KEYS: the hold hash of each medicine, then the expiry index
+# ARGV: holder, now, expires_at, then (medicine id, quantity, stock) per medicine
+# Returns (position, available) of the medicines that are short, empty when held.
+_HOLD_SCRIPT = redis_conn.register_script("""
+local holder, now, expires = ARGV[1], tonumber(ARGV[2]), ARGV[3]
+local index = KEYS[#KEYS]
+local short = {}
+for i = 1, #KEYS - 1 do
+    local quantity, stock = tonumber(ARGV[3 + 3 * i - 1]), tonumber(ARGV[3 + 3 * i])
+    local held = 0
+    local holds = redis.call('HGETALL', KEYS[i])
+    for j = 1, #holds, 2 do
+        local other, amount, expiry = holds[j], string.match(holds[j + 1], '(%d+):(%d+)')
+        if tonumber(expiry) <= now then
+            redis.call('HDEL', KEYS[i], other)
+            redis.call('ZREM', index, ARGV[3 + 3 * i - 2] .. ':' .. other)
+        elseif other ~= holder then
+            held = held + tonumber(amount)
+        end
+    end
+    if quantity > stock - held then
+        table.insert(short, i)
+        table.insert(short, math.max(stock - held, 0))
+    end
+end
+if #short > 0 then
+    return short
+end
+for i = 1, #KEYS - 1 do
+    local medicine, quantity = ARGV[3 + 3 * i - 2], tonumber(ARGV[3 + 3 * i - 1])
+    if quantity > 0 then
+        redis.call('HSET', KEYS[i], holder, quantity .. ':' .. expires)
+        redis.call('ZADD', index, expires, medicine .. ':' .. holder)
+        redis.call('PEXPIREAT', KEYS[i], expires)
+    else
+        redis.call('HDEL', KEYS[i], holder)
+        redis.call('ZREM', index, medicine .. ':' .. holder)
+    end
+end
+return short
+""")
+
+# KEYS: the expiry index. ARGV: now, batch size. Takes the expired "medicine_id:holder"
+# members out of the index and returns them, the holds are dropped by _DROP_HOLD_SCRIPT.
+_SWEEP_SCRIPT = redis_conn.register_script("""
+local members = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #members > 0 then
+    redis.call('ZREM', KEYS[1], unpack(members))
+end
+return members
+""")
+
+# KEYS: the hold hash of a medicine. ARGV: holder, now. A hold renewed since it was swept
+# from the index (renewing adds it back) is kept.
+_DROP_HOLD_SCRIPT = redis_conn.register_script("""
+local value = redis.call('HGET', KEYS[1], ARGV[1])
+if value and tonumber(string.match(value, ':(%d+)')) <= tonumber(ARGV[2]) then
+    return redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 0
+""")
+
+
+def shortage_message(medicine_id, available, requested):
+    return f"Not enough stock for product {medicine_id}. Available: {available}, requested: {requested}"
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _stocks(medicine_ids):
+    stocks = dict(Medicine.objects.filter(pk__in=medicine_ids).values_list('pk', 'stock'))
+    missing = set(medicine_ids) - stocks.keys()
+    if missing:
+        # an archived medicine can still be in a cart, there is nothing of it to hold
+        stocks.update(dict.fromkeys(ArchivedMedicine.objects.filter(pk__in=missing).values_list('pk', flat=True), 0))
+    return stocks
+
+
+def hold_items(holder, quantities):
+    """
+    Hold {medicine id: quantity} for `holder` (replacing its previous holds on these
+    medicines, 0 releases one) and renew them for RESERVATION_TTL. Returns
+    {medicine id: available} of the medicines without enough free stock, in which case
+    nothing was held. Unknown medicines are left to the caller's validation.
+    """
+    quantities = {parse_medicine_id(pk): int(quantity) for pk, quantity in quantities.items()}
+    quantities.pop(None, None)
+    stocks = _stocks(quantities)
+    ids = sorted(medicine_id for medicine_id in quantities if medicine_id in stocks)
+    if not ids:
+        return {}
+    now = _now_ms()
+    args = [holder, now, now + RESERVATION_TTL * 1000]
+    for medicine_id in ids:
+        args += [medicine_id, quantities[medicine_id], stocks[medicine_id]]
+    try:
+        short = _HOLD_SCRIPT(keys=[HOLD_KEY.format(pk) for pk in ids] + [HOLD_EXPIRY_KEY], args=args)
+    except redis.RedisError as e:
+        # without Redis carts work like before: checked against the stock only
+        logger.error(f"Redis reservation error: {e}")
+        return {pk: stocks[pk] for pk in ids if quantities[pk] > stocks[pk]}
+    return {ids[position - 1]: available for position, available in zip(short[::2], short[1::2])}
+
+
+def release_items(holder, medicine_ids):
+    """Drop the holds of `holder` on `medicine_ids`."""
+    medicine_ids = list(medicine_ids)
+    if not medicine_ids:
+        return
+    try:
+        with redis_conn.pipeline() as pipe:
+            for medicine_id in medicine_ids:
+                pipe.hdel(HOLD_KEY.format(medicine_id), holder)
+                pipe.zrem(HOLD_EXPIRY_KEY, f'{medicine_id}:{holder}')
+            pipe.execute()
+    except redis.RedisError as e:
+        # they expire on their own
+        logger.error(f"Redis reservation release error: {e}")
+
+
+def release_items_on_commit(holder, medicine_ids):
+    medicine_ids = list(medicine_ids)
+    transaction.on_commit(lambda: release_items(holder, medicine_ids))
+
+
+def available_stock(stocks, holder=None):
+    """{medicine id: stock minus the live holds of everyone but `holder`} for {medicine id: stock}."""
+    ids = list(stocks)
+    now = _now_ms()
+    try:
+        with redis_conn.pipeline(transaction=False) as pipe:
+            for medicine_id in ids:
+                pipe.hgetall(HOLD_KEY.format(medicine_id))
+            all_holds = pipe.execute()
+    except redis.RedisError as e:
+        logger.error(f"Redis reservation read error: {e}")
+        return dict(stocks)
+
+    available = {}
+    for medicine_id, holds in zip(ids, all_holds):
+        held = 0
+        for other, value in holds.items():
+            amount, until = value.split(b':')
+            if int(until) > now and other.decode() != str(holder):
+                held += int(amount)
+        available[medicine_id] = max(stocks[medicine_id] - held, 0)
+    return available
+
+
+def convert_holds(holder, quantities):
+    """
+    Checkout: take {medicine id: quantity} out of stock for `holder` and drop its holds
+    once the order commits. Holds the quantities first (so other carts' holds are
+    respected), then decrements with one guarded UPDATE per medicine, no row locks
+    are taken before. Raises ValidationError (and the caller's transaction rolls back)
+    when a medicine is short.
+    """
+    quantities = {int(pk): int(quantity) for pk, quantity in quantities.items()}
+    short = hold_items(holder, quantities)
+    if short:
+        raise ValidationError({
+            'error': [shortage_message(pk, available, quantities[pk]) for pk, available in short.items()]
+        })
+
+    with transaction.atomic():
+        # same order in every checkout, concurrent ones cannot deadlock on the rows
+        for medicine_id in sorted(quantities):
+            updated = Medicine.objects.filter(pk=medicine_id, stock__gte=quantities[medicine_id]).update(
+                stock=F('stock') - quantities[medicine_id],
+            )
+            if not updated:
+                # changed by the store since it was held
+                raise ValidationError({'error': f"Not enough stock for product {medicine_id}."})
+        # queryset.update() sends no model signals
+        bump_generations_on_commit(
+            Medicine.objects.filter(pk__in=list(quantities)).values_list('store_id', flat=True).distinct()
+        )
+        release_items_on_commit(holder, quantities)
+
+
+def sweep_expired_holds(batch_size=SWEEP_BATCH_SIZE):
+    """Remove the expired holds in batches of `batch_size`, returns how many were swept."""
+    swept = 0
+    while True:
+        now = _now_ms()
+        members = _SWEEP_SCRIPT(keys=[HOLD_EXPIRY_KEY], args=[now, batch_size])
+        if members:
+            with redis_conn.pipeline(transaction=False) as pipe:
+                for member in members:
+                    medicine_id, holder = member.decode().split(':', 1)
+                    _DROP_HOLD_SCRIPT(keys=[HOLD_KEY.format(medicine_id)], args=[holder, now], client=pipe)
+                pipe.execute()
+        swept += len(members)
+        if len(members) < batch_size:
+            return swept
@@ -0,0 +1,43 @@
+# inventory/search.py
+from contextlib import contextmanager
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.functions import Greatest, Lower
+
+# pg_trgm default for the `%` operator, same cut-off the AI chat used before
+DEFAULT_SIMILARITY_THRESHOLD = 0.3
+
+# names on the shared catalog record, which carries the trigram indexes
+TRIGRAM_SEARCH_FIELDS = ['catalog_item__brand_name', 'catalog_item__generic_name', 'catalog_item__chemical_name']
+
+
+@contextmanager
+def similarity_threshold(threshold=DEFAULT_SIMILARITY_THRESHOLD):
+    """
+    Run the block in a transaction with `pg_trgm.similarity_threshold` set locally,
+    so the `%` operator (and therefore the GIN trigram indexes) filter with it.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.similarity_threshold', %s, true)",
+                [str(threshold)],
+            )
+        yield
+
+
+def trigram_search(queryset, query):
+    """
+    Typo tolerant search over the medicine names.
+
+    Matches with `trigram_similar` (the indexable `%` operator) and ranks by the best
+    similarity across the name fields.
+    """
+    condition = Q()
+    for field in TRIGRAM_SEARCH_FIELDS:
+        condition |= Q(**{f'{field}__trigram_similar': query})
+
+    return queryset.filter(condition).annotate(
+        similarity=Greatest(*[TrigramSimilarity(field, query) for field in TRIGRAM_SEARCH_FIELDS]),
+    ).order_by('-similarity', Lower('brand_name'), 'id')
@@ -1,20 +1,168 @@
 from rest_framework import serializers
-from .models import MedicalDevice, Medicine
+from .catalog import CATALOG_DETAIL_FIELDS, resolve_catalog_item
+from .images import variant_urls
+from .models import ArchivedMedicine, MedicalDevice, Medicine, MedicinePriceSummary
+from .sparse import SparseFieldsMixin
 
 # MEDICAL DEVICE SERIALIZER
-class MedicalDeviceSerializer(serializers.ModelSerializer):
+class MedicalDeviceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # {size: {format: url}} small copies of image for the list pages
+    image_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = MedicalDevice
         fields = '__all__'
 
+    # the values() list fast path (inventory.readers) reads image_variants itself
+    values_method_fields = {'image_variants': 'image_variants'}
+
+    def get_image_variants(self, obj):
+        return self.from_values_image_variants(obj.image_variants)
+
+    def from_values_image_variants(self, variants):
+        return variant_urls(variants, self.context.get('request'))
+
 # MEDICINE SERIALIZER
-class MedicineSerializer(serializers.ModelSerializer):
+class MedicineSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # only present when the list is filtered with ?q= (see MedicineFullTextFilter)
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+    # only present on /alternatives/, 0 same generic, 1 linked by hand, 2 same ATC group
+    match = serializers.IntegerField(read_only=True)
+
+    # [shared catalog fields, read and written through the store's row so the API keeps its shape]
+    chemical_name = serializers.CharField(source='catalog_item.chemical_name', max_length=255)
+    description = serializers.CharField(source='catalog_item.description', allow_null=True, allow_blank=True, required=False)
+    atc_code = serializers.CharField(source='catalog_item.atc_code', max_length=20)
+    cas_number = serializers.CharField(source='catalog_item.cas_number', max_length=20)
+    image = serializers.ImageField(source='catalog_item.image', allow_null=True, required=False)
+    # {size: {format: url}} small copies of image for the list pages
+    image_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Medicine
         fields = '__all__'
+        read_only_fields = ['catalog_item']
 
     def validate(self, data):
         # If stock is being updated, set is_deleted based on stock value
         if 'stock' in data:
             data['is_deleted'] = data['stock'] <= 0
-        return data
\ No newline at end of file
+        return data
+
+    # the values() list fast path (inventory.readers) reads image_variants itself
+    values_method_fields = {'image_variants': 'catalog_item__image_variants'}
+
+    def get_image_variants(self, obj):
+        return self.from_values_image_variants(obj.catalog_item.image_variants)
+
+    def from_values_image_variants(self, variants):
+        return variant_urls(variants, self.context.get('request'))
+
+    def _can_overwrite_catalog(self):
+        # pharmacists only complete shared records, admins can correct them
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        return bool(user and (user.is_staff or user.is_superuser or getattr(user, 'role', None) == 'admin'))
+
+    def _check_not_listed(self, store, catalog_item, instance=None):
+        # one row per drug and store (medicine_store_catalog_item_uniq)
+        listed = Medicine.objects.filter(store=store, catalog_item=catalog_item)
+        if instance is not None:
+            listed = listed.exclude(pk=instance.pk)
+        existing = listed.only('pk').first() if store is not None else None
+        if existing is not None:
+            raise serializers.ValidationError(
+                {'non_field_errors': [f'This store already lists this medicine, update medicine {existing.pk} instead.']}
+            )
+
+    def create(self, validated_data):
+        details = validated_data.pop('catalog_item', {})
+        validated_data['catalog_item'] = resolve_catalog_item(
+            validated_data['brand_name'], validated_data['generic_name'], details,
+            overwrite=self._can_overwrite_catalog(),
+        )
+        self._check_not_listed(validated_data.get('store'), validated_data['catalog_item'])
+        instance = super().create(validated_data)
+        if instance.is_deleted:
+            # deleted_at is set by a database trigger
+            instance.refresh_from_db(fields=['deleted_at'])
+        return instance
+
+    def update(self, instance, validated_data):
+        details = validated_data.pop('catalog_item', {})
+        brand_name = validated_data.get('brand_name', instance.brand_name)
+        generic_name = validated_data.get('generic_name', instance.generic_name)
+        renamed = (brand_name, generic_name) != (instance.brand_name, instance.generic_name)
+        if details or renamed:
+            defaults = None
+            if renamed:
+                # a renamed row moves to (or creates) another record, keep its details
+                current = instance.catalog_item
+                defaults = {field: getattr(current, field) for field in CATALOG_DETAIL_FIELDS}
+            validated_data['catalog_item'] = resolve_catalog_item(
+                brand_name, generic_name, details, overwrite=self._can_overwrite_catalog(), defaults=defaults,
+            )
+        if 'catalog_item' in validated_data or 'store' in validated_data:
+            self._check_not_listed(
+                validated_data.get('store', instance.store), validated_data.get('catalog_item', instance.catalog_item), instance,
+            )
+        was_deleted = instance.is_deleted
+        instance = super().update(instance, validated_data)
+        if instance.is_deleted != was_deleted:
+            # deleted_at is set by a database trigger
+            instance.refresh_from_db(fields=['deleted_at'])
+        return instance
+
+# PRICE COMPARISON SERIALIZER
+class MedicinePriceSummarySerializer(serializers.ModelSerializer):
+    # [the cheapest stores, in price order, resolved by the view in one query]
+    cheapest_stores = serializers.SerializerMethodField()
+
+    class Meta:
+        model = MedicinePriceSummary
+        fields = '__all__'
+
+    def get_cheapest_stores(self, obj):
+        stores = self.context.get('stores', {})
+        return [stores[store_id] for store_id in obj.cheapest_store_ids if store_id in stores]
+
+# ARCHIVED MEDICINE SERIALIZER
+# [read only: an archived row in the shape of a Medicine, for the deleted listings]
+class ArchivedMedicineSerializer(MedicineSerializer):
+    # the links are kept as ids while the row is archived
+    alternative_medicines = serializers.ListField(source='alternative_ids', child=serializers.IntegerField(), read_only=True)
+
+    class Meta:
+        model = ArchivedMedicine
+        exclude = ['alternative_ids']
+        read_only_fields = ['catalog_item']
+
+# BULK IMPORT ROW SERIALIZER
+# [validates one uploaded row with the MedicineSerializer rules, the store is set once per import]
+class MedicineImportSerializer(MedicineSerializer):
+    class Meta:
+        model = Medicine
+        fields = ['brand_name', 'generic_name', 'chemical_name', 'description', 'atc_code', 'cas_number', 'price', 'stock']
+
+# BULK STOCK ADJUSTMENT SERIALIZERS
+class StockAdjustmentSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    delta = serializers.IntegerField(required=False)
+    absolute = serializers.IntegerField(required=False, min_value=0)
+
+    def validate(self, data):
+        if ('delta' in data) == ('absolute' in data):
+            raise serializers.ValidationError('Provide exactly one of delta or absolute.')
+        return data
+
+class BulkStockAdjustmentSerializer(serializers.Serializer):
+    store = serializers.IntegerField()
+    items = StockAdjustmentSerializer(many=True, allow_empty=False, max_length=5000)
+
+    def validate_items(self, items):
+        ids = [item['id'] for item in items]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError('Each medicine id can only appear once.')
+        return items
+
@@ -0,0 +1,89 @@
+# inventory/signals.py
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from medical_stores.models import MedicalStore
+from users.models import Pharmacist
+from .autocomplete import medicine_names, schedule_index_update
+from .cache import bump_generations_on_commit
+from .images import needs_variants, schedule_variants
+from .models import CatalogMedicine, MedicalDevice, Medicine
+
+
+# CACHE INVALIDATION ===========
+@receiver(post_save, sender=Medicine)
+@receiver(post_delete, sender=Medicine)
+@receiver(post_save, sender=MedicalDevice)
+@receiver(post_delete, sender=MedicalDevice)
+def bump_product_store_generation(sender, instance, **kwargs):
+    bump_generations_on_commit([instance.store_id])
+
+
+# a shared catalog record shows up in the listings of every store that carries it
+@receiver(post_save, sender=CatalogMedicine)
+def bump_catalog_stores_generation(sender, instance, **kwargs):
+    bump_generations_on_commit(instance.store_items.values_list('store_id', flat=True).distinct())
+
+
+@receiver(m2m_changed, sender=Medicine.alternative_medicines.through)
+def bump_alternatives_generation(sender, instance, action, pk_set=None, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        # the relation is symmetrical, the other side's rows changed too
+        store_ids = list(Medicine.objects.filter(pk__in=pk_set or []).values_list('store_id', flat=True))
+        bump_generations_on_commit([instance.store_id, *store_ids])
+
+
+@receiver(post_save, sender=MedicalStore)
+@receiver(post_delete, sender=MedicalStore)
+def bump_store_generation(sender, instance, **kwargs):
+    bump_generations_on_commit([instance.id])
+
+
+# approving/rejecting a pharmacist shows/hides their stores' products to clients
+@receiver(post_save, sender=Pharmacist)
+def bump_pharmacist_stores_generation(sender, instance, created, **kwargs):
+    if not created:
+        bump_generations_on_commit(MedicalStore.objects.filter(owner=instance).values_list('id', flat=True))
+
+
+# IMAGE VARIANTS ===========
+@receiver(post_save, sender=CatalogMedicine)
+@receiver(post_save, sender=MedicalDevice)
+def schedule_image_variants(sender, instance, **kwargs):
+    if needs_variants(instance):
+        schedule_variants(instance)
+
+
+# AUTOCOMPLETE ===========
+# a rename or a move to another catalog record lowers the count of the old names
+@receiver(pre_save, sender=Medicine)
+def remember_medicine_names(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._autocomplete_names = medicine_names(Medicine.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_save, sender=CatalogMedicine)
+def remember_catalog_names(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._autocomplete_names = medicine_names(Medicine.objects.filter(catalog_item_id=instance.pk))
+
+
+@receiver(post_save, sender=Medicine)
+@receiver(post_delete, sender=Medicine)
+def update_medicine_autocomplete(sender, instance, **kwargs):
+    names = {instance.brand_name, instance.generic_name, instance.catalog_item.chemical_name}
+    schedule_index_update(names | getattr(instance, '_autocomplete_names', set()))
+
+
+@receiver(post_save, sender=CatalogMedicine)
+def update_catalog_autocomplete(sender, instance, **kwargs):
+    names = getattr(instance, '_autocomplete_names', set())
+    # the names only count once a store carries the record
+    if names or instance.store_items.exists():
+        schedule_index_update(names | {instance.brand_name, instance.generic_name, instance.chemical_name})
+
+
+# approving/rejecting a pharmacist shows/hides their stores' medicines to clients
+@receiver(post_save, sender=Pharmacist)
+def update_pharmacist_autocomplete(sender, instance, created, **kwargs):
+    if not created:
+        schedule_index_update(medicine_names(Medicine.objects.filter(store__owner=instance)))
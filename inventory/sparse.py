@@ -0,0 +1,196 @@
+# inventory/sparse.py
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.db.models.fields.related_descriptors import ManyToManyDescriptor, ReverseManyToOneDescriptor
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField
+
+# ?fields=id,brand_name keeps only those fields, ?omit=medicines drops them,
+# nested serializers take dotted paths: ?fields=id,store_name,medicines.brand_name
+SPARSE_FIELDS_PARAM = 'fields'
+SPARSE_OMIT_PARAM = 'omit'
+
+
+def _parse(value):
+    """'id,medicines.brand_name' -> {'id': {}, 'medicines': {'brand_name': {}}}"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in filter(None, (part.strip() for part in path.split('.'))):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def sparse_params(request):
+    """(fields, omit) trees of a read request, None for a param that is not given."""
+    params = getattr(request, 'query_params', None)
+    # writes validate every field, only the output of reads is trimmed
+    if params is None or request.method not in SAFE_METHODS:
+        return None, None
+    fields, omit = params.get(SPARSE_FIELDS_PARAM), params.get(SPARSE_OMIT_PARAM)
+    return (_parse(fields) if fields else None), (_parse(omit) if omit else None)
+
+
+def _node(tree, path):
+    # the part of a tree about the serializer at `path`, None when it is not restricted
+    for name in path:
+        if not tree or name not in tree:
+            return None
+        tree = tree[name]
+    return tree or None
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin that drops the fields not picked with ?fields= / ?omit= on
+    read requests. Goes before the serializer base class; nested serializers that have
+    it (and the ones built for Meta.depth) take the dotted paths for their level.
+    """
+
+    def _sparse_path(self):
+        path, field = [], self
+        while getattr(field, 'parent', None) is not None:
+            # the child of a many=True ListSerializer is bound with an empty name
+            if field.field_name:
+                path.append(field.field_name)
+            field = field.parent
+        return path[::-1]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected, omitted = sparse_params(self.context.get('request'))
+        if selected is None and omitted is None:
+            return fields
+
+        path = self._sparse_path()
+        selected, omitted = _node(selected, path), _node(omitted, path)
+        for param, tree in ((SPARSE_FIELDS_PARAM, selected), (SPARSE_OMIT_PARAM, omitted)):
+            errors = []
+            for name, children in (tree or {}).items():
+                if name not in fields:
+                    errors.append(f"Unknown field '{'.'.join(path + [name])}'.")
+                elif children and not isinstance(getattr(fields[name], 'child', fields[name]), SparseFieldsMixin):
+                    errors.append(f"Field '{'.'.join(path + [name])}' has no subfields.")
+            if errors:
+                raise ValidationError({param: errors})
+
+        if selected is not None:
+            fields = {name: field for name, field in fields.items() if name in selected}
+        if omitted is not None:
+            # omit=medicines.rank only reaches into medicines, it does not drop it
+            fields = {name: field for name, field in fields.items() if omitted.get(name, True) != {}}
+        return fields
+
+    def build_nested_field(self, field_name, relation_info, nested_depth):
+        field_class, field_kwargs = super().build_nested_field(field_name, relation_info, nested_depth)
+        return type(field_class.__name__, (SparseFieldsMixin, field_class), {}), field_kwargs
+
+
+# QUERYSET ===========
+def _model_lookup(model, source_attrs):
+    # 'catalog_item__chemical_name' for a model path, None for properties and methods
+    for attr in source_attrs:
+        if model is None:
+            return None
+        try:
+            model = model._meta.get_field(attr).related_model
+        except FieldDoesNotExist:
+            return None
+    return '__'.join(source_attrs)
+
+
+def _flatten(select_related, prefix=''):
+    # query.select_related {'store': {'owner': {}}} -> ['store__owner']
+    lookups = []
+    for name, nested in select_related.items():
+        lookups.append(prefix + name)
+        lookups.extend(_flatten(nested, f'{prefix}{name}__'))
+    return lookups
+
+
+def sparse_queryset(queryset, serializer, required=()):
+    """
+    `queryset` loading only what `serializer` still reads: .only() the columns of its
+    fields, and no select_related/prefetch_related for the relations it dropped.
+    `required` are extra fields the view itself reads (permission checks).
+    """
+    annotations = set(queryset.query.annotations)
+    method_lookups = getattr(serializer, 'values_method_fields', {})
+    columns, relations, nested = set(required), set(required), {}
+
+    for field in serializer._readable_fields:
+        if isinstance(field, serializers.SerializerMethodField):
+            lookup = method_lookups.get(field.field_name)
+            if lookup is None:
+                # no telling what the method reads
+                return queryset
+            columns.add(lookup)
+            relations.add(lookup.split('__')[0])
+            continue
+        if not field.source_attrs:
+            # source='*' reads the whole instance
+            return queryset
+        name = field.source_attrs[0]
+        if name in annotations:
+            continue
+        if isinstance(field, (serializers.ListSerializer, ManyRelatedField)):
+            # reverse and many-to-many relations are loaded by their prefetch, no column
+            relations.add(name)
+            if isinstance(field, serializers.ListSerializer):
+                nested[name] = field.child
+            continue
+        lookup = _model_lookup(queryset.model, field.source_attrs)
+        if lookup is None:
+            # extras the serializer skips when they are not annotated (rank, match, ...)
+            if not hasattr(queryset.model, name):
+                continue
+            # a property or method, no telling what it reads
+            return queryset
+        relations.add(name)
+        columns.add(lookup)
+
+    select_related = queryset.query.select_related
+    if isinstance(select_related, dict):
+        kept = [lookup for lookup in _flatten(select_related) if lookup.split('__')[0] in relations]
+        # select_related() without arguments would follow every foreign key
+        queryset = queryset.select_related(None)
+        if kept:
+            queryset = queryset.select_related(*kept)
+
+    prefetches = []
+    for lookup in queryset._prefetch_related_lookups:
+        through = lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup
+        # the serializer reads a Prefetch(to_attr=...) under that name
+        name = (lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup).split('__')[0]
+        if name not in relations:
+            continue
+        if isinstance(lookup, Prefetch) and lookup.queryset is not None and name in nested and '__' not in through:
+            descriptor = getattr(queryset.model, through)
+            # a reverse foreign key is matched back to its parent through the FK column
+            reverse_fk = isinstance(descriptor, ReverseManyToOneDescriptor) and not isinstance(
+                descriptor, ManyToManyDescriptor)
+            keep = [descriptor.field.name] if reverse_fk else []
+            lookup = Prefetch(through, sparse_queryset(lookup.queryset, nested[name], keep), to_attr=lookup.to_attr)
+        prefetches.append(lookup)
+    queryset = queryset.prefetch_related(None).prefetch_related(*prefetches)
+
+    return queryset.only(*sorted(columns)) if columns else queryset
+
+
+class SparseFieldsViewMixin:
+    """
+    Trims the list/retrieve queryset to the fields picked with ?fields= / ?omit=.
+    `sparse_required_fields` are the fields the object permissions read on retrieve.
+    """
+    sparse_required_fields = ()
+
+    def sparse_queryset(self, queryset):
+        if self.action not in ('list', 'retrieve') or sparse_params(self.request) == (None, None):
+            return queryset
+        required = self.sparse_required_fields if self.action == 'retrieve' else ()
+        return sparse_queryset(queryset, self.get_serializer(), required)
+
+    def filter_queryset(self, queryset):
+        return self.sparse_queryset(super().filter_queryset(queryset))
@@ -1,3 +1,1254 @@
-from django.test import TestCase
+import base64
+import csv
+import importlib
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+from unittest import SkipTest, mock, skipUnless
+import redis
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from medical_stores.models import MedicalStore
+from users.models import Pharmacist, User
+from . import reservations
+from .autocomplete import count_names, current_snapshot, suggest, update_index, write_snapshot
+from .archive import archive_deleted_medicines, restore_medicines
+from .cache import ConditionalGetMixin, get_generation, redis_conn
+from .catalog import resolve_catalog_item, resolve_catalog_items
+from .bulk import bulk_adjust_stock, import_medicines, iter_export_chunks, iter_upload_rows
+from .changes import decode_cursor, encode_cursor, read_changes
+from .filters import MedicineFullTextFilter
+from .images import _generate_in_background, build_variants, generate_variants, needs_variants
+from .models import ArchivedMedicine, CatalogMedicine, InventoryChange, MedicalDevice, Medicine, MedicineLetterCount
+from .prices import refresh_price_summary
+from .readers import ValuesListReader
+from .reservations import (
+    HOLD_EXPIRY_KEY, HOLD_KEY, RESERVATION_TTL, available_stock, convert_holds, hold_items, release_items,
+    sweep_expired_holds,
+)
+from .serializers import MedicalDeviceSerializer, MedicineSerializer
+from .views import MedicineViewSet
 
-# Create your tests here.
+
+def create_store(name, license_status='approved'):
+    user = User.objects.create(email=f'{name.lower()}@example.com', name=name, role='pharmacist')
+    return MedicalStore.objects.create(
+        owner=Pharmacist.objects.create(user=user, license_status=license_status),
+        store_name=name, store_type='pharmacy',
+    )
+
+
+def create_medicine(store, brand_name, generic_name='Testamol', **fields):
+    """A store row of a new catalog drug (a store lists each drug once)."""
+    item = CatalogMedicine.objects.create(
+        brand_name=brand_name, generic_name=generic_name, chemical_name=generic_name.lower(),
+        atc_code=fields.pop('atc_code', 'N02BE01'), cas_number='103-90-2', description=fields.pop('description', None),
+    )
+    fields.setdefault('price', 10)
+    fields.setdefault('stock', 5)
+    return Medicine.objects.create(store=store, catalog_item=item, brand_name=brand_name, generic_name=generic_name, **fields)
+
+
+# QUERY PLANS ===========
+@skipUnless(connection.vendor == 'postgresql', "The listing indexes are Postgres partial and expression indexes")
+class ListingQueryPlanTests(TestCase):
+    """
+    The role scoped medicine listings must be answered from their indexes: seed an
+    inventory large enough for the planner to care and fail on a sequential scan of
+    inventory_medicine in the plans of the real MedicineViewSet querysets.
+    """
+    ROWS = 30_000
+    STORES = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        random.seed(7)
+        users = User.objects.bulk_create([
+            User(email=f'plan-check-{i}@example.com', name=f'plan {i}', role='pharmacist') for i in range(cls.STORES)
+        ])
+        # most pharmacists are approved, like production
+        pharmacists = Pharmacist.objects.bulk_create([
+            Pharmacist(user=user, license_status='approved' if i % 10 else 'pending') for i, user in enumerate(users)
+        ])
+        stores = MedicalStore.objects.bulk_create([
+            MedicalStore(owner=pharmacist, store_name=f'Plan check {i}', store_type='pharmacy')
+            for i, pharmacist in enumerate(pharmacists)
+        ])
+        cls.client_user = User.objects.create(email='plan-check-client@example.com', name='client', role='client')
+        cls.pharmacist_user = users[1]
+
+        for start in range(0, cls.ROWS, 5000):
+            items = CatalogMedicine.objects.bulk_create([
+                CatalogMedicine(
+                    brand_name=f'{random.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ")}rand {i}', generic_name=f'generic {i % 5000}',
+                    chemical_name=f'chemical {i % 5000}', atc_code='N02BE01', cas_number='103-90-2',
+                )
+                for i in range(start, min(start + 5000, cls.ROWS))
+            ])
+            Medicine.objects.bulk_create([
+                Medicine(
+                    store=random.choice(stores), catalog_item=item, stock=random.randint(0, 100),
+                    price=random.randint(1, 500), brand_name=item.brand_name, generic_name=item.generic_name,
+                    is_deleted=random.random() < 0.1,
+                )
+                for item in items
+            ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def _queryset(self, user, params=''):
+        request = Request(APIRequestFactory().get(f'/inventory/medicines/{params}'))
+        request.user = user
+        view = MedicineViewSet(request=request, action='list', format_kwarg=None, kwargs={})
+        return view, view.filter_queryset(view.get_queryset())
+
+    def _nodes(self, plan):
+        yield plan
+        for child in plan.get('Plans', []):
+            yield from self._nodes(child)
+
+    def assertUsesIndex(self, queryset):
+        plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+        seq_scans = [
+            node for node in self._nodes(plan)
+            if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == Medicine._meta.db_table
+        ]
+        if seq_scans:
+            self.fail(f"Sequential scan on {Medicine._meta.db_table}:\n{queryset.explain()}")
+
+    def test_listing_pages_use_an_index(self):
+        for role, user in (('client', self.client_user), ('pharmacist', self.pharmacist_user)):
+            # what PageNumberPagination fetches for one page
+            for params in ('', '?ordering=price', '?brand_startswith=M'):
+                with self.subTest(role=role, params=params):
+                    view, queryset = self._queryset(user, params)
+                    self.assertUsesIndex(queryset[:view.paginator.page_size])
+
+    def test_pharmacist_count_uses_an_index(self):
+        # the rows PageNumberPagination has to COUNT(*) for a pharmacist
+        _, queryset = self._queryset(self.pharmacist_user)
+        self.assertUsesIndex(queryset.order_by())
+
+
+# CATALOG ===========
+class CatalogTests(TestCase):
+    """
+    One shared catalog record per (brand, generic): found trimmed and case-insensitively,
+    completed by store writes, and only rewritten by admins.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = create_store('Catalogstore')
+        cls.item = CatalogMedicine.objects.create(
+            brand_name='Catalol', generic_name='Catalamol', chemical_name='catalamol', atc_code='N02BE01', cas_number='103-90-2',
+        )
+
+    def create(self, user, **data):
+        data = {
+            'store': self.store.pk, 'brand_name': ' CATALOL ', 'generic_name': 'catalamol ', 'price': 3, 'stock': 1,
+            'chemical_name': 'catalamol', 'atc_code': 'N02BE01', 'cas_number': '103-90-2', **data,
+        }
+        request = Request(APIRequestFactory().post('/inventory/medicines/'))
+        request.user = user
+        serializer = MedicineSerializer(data=data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_natural_key_is_trimmed_and_case_insensitive(self):
+        self.assertEqual(resolve_catalog_item('  catalol', 'CATALAMOL  ', {}), self.item)
+        created = resolve_catalog_item(' Newcatol ', ' Newcatamol', {'atc_code': 'N02BE02'})
+        self.assertEqual((created.brand_name, created.generic_name), ('Newcatol', 'Newcatamol'))
+        self.assertEqual(resolve_catalog_item('NEWCATOL', 'newcatamol', {}), created)
+        # records from before the names were trimmed on write
+        padded = CatalogMedicine.objects.create(
+            brand_name=' Padcatol ', generic_name='Padcatamol ', chemical_name='padcatamol', atc_code='N02BE01', cas_number='1-2-3',
+        )
+        self.assertEqual(resolve_catalog_item('padcatol', 'PADCATAMOL', {}), padded)
+
+    def test_store_writes_fill_blank_fields(self):
+        resolve_catalog_item('Catalol', 'Catalamol', {'description': 'For pain.', 'atc_code': 'N02BE01'})
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.description, 'For pain.')
+
+    def test_pharmacists_cannot_rewrite_set_fields(self):
+        with self.assertRaises(ValidationError) as raised:
+            resolve_catalog_item('Catalol', 'Catalamol', {'atc_code': 'M01AE01', 'description': 'For pain.'})
+        self.assertEqual(set(raised.exception.detail), {'atc_code'})
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.atc_code, self.item.description), ('N02BE01', None))
+
+        pharmacist = self.store.owner.user
+        with self.assertRaises(ValidationError):
+            self.create(pharmacist, atc_code='M01AE01')
+        self.assertFalse(Medicine.objects.filter(store=self.store).exists())
+        # the same details are no rewrite
+        self.assertEqual(self.create(pharmacist).catalog_item, self.item)
+
+    def test_admins_can_rewrite_set_fields(self):
+        resolve_catalog_item('Catalol', 'Catalamol', {'atc_code': 'M01AE01'}, overwrite=True)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.atc_code, 'M01AE01')
+
+        admin = User.objects.create(email='catalog-admin@example.com', name='admin', role='admin')
+        medicine = self.create(admin, cas_number='50-78-2')
+        self.assertEqual(medicine.catalog_item, self.item)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.cas_number, '50-78-2')
+
+    def test_bulk_resolve_reports_conflicts(self):
+        rows = [
+            {'brand_name': 'catalol ', 'generic_name': 'Catalamol', 'atc_code': 'M01AE01'},
+            {'brand_name': 'Bulkcatol', 'generic_name': 'Catalamol', 'chemical_name': 'catalamol', 'atc_code': 'N02BE01', 'cas_number': '1-2-3'},
+        ]
+        items, conflicts = resolve_catalog_items(rows)
+        self.assertEqual(set(conflicts), {('catalol', 'catalamol')})
+        self.assertEqual(set(conflicts[('catalol', 'catalamol')]), {'atc_code'})
+        self.assertEqual(items[('bulkcatol', 'catalamol')].brand_name, 'Bulkcatol')
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.atc_code, 'N02BE01')
+
+
+@skipUnless(connection.vendor == 'postgresql', "Temporary tables shadow the real ones through the Postgres search_path")
+class CatalogDedupeMigrationTests(TestCase):
+    """
+    The 0013 SQL, run on temporary copies of its two tables as they were at 0012 (they
+    shadow the real tables and are dropped with the test's transaction).
+    """
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                CREATE TEMPORARY TABLE inventory_catalogmedicine (
+                    id serial PRIMARY KEY, brand_name varchar(255), generic_name varchar(255), chemical_name varchar(255),
+                    description text, atc_code varchar(20), cas_number varchar(20), image varchar(100), timestamp timestamptz
+                );
+                CREATE TEMPORARY TABLE inventory_medicine (
+                    id serial PRIMARY KEY, brand_name varchar(255), generic_name varchar(255), chemical_name varchar(255),
+                    description text, atc_code varchar(20), cas_number varchar(20), image varchar(100), timestamp timestamptz,
+                    catalog_item_id integer
+                );
+            """)
+
+    def medicine(self, brand_name, generic_name, description=None, image=None, days_ago=0):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO inventory_medicine (brand_name, generic_name, chemical_name, description, atc_code, cas_number, image, timestamp)"
+                " VALUES (%s, %s, 'x', %s, 'N02BE01', '1-2-3', %s, now() - %s * interval '1 day') RETURNING id",
+                [brand_name, generic_name, description, image, days_ago],
+            )
+            return cursor.fetchone()[0]
+
+    def dedupe(self):
+        migration = importlib.import_module('inventory.migrations.0013_deduplicate_catalog_medicine')
+        with connection.cursor() as cursor:
+            cursor.execute(migration.DEDUPLICATE)
+            cursor.execute("SELECT id, brand_name, generic_name, description, image FROM inventory_catalogmedicine")
+            catalog = {row[0]: row[1:] for row in cursor.fetchall()}
+            cursor.execute("SELECT id, catalog_item_id FROM inventory_medicine")
+            return catalog, dict(cursor.fetchall())
+
+    def test_rows_of_one_drug_share_the_most_complete_record(self):
+        newest = self.medicine('Panadol', 'Paracetamol')
+        described = self.medicine(' PANADOL', 'paracetamol ', description='For pain.', days_ago=2)
+        pictured = self.medicine('panadol', 'Paracetamol', description='Old text.', image='medicine/images/p.png', days_ago=5)
+        other = self.medicine('Brufen', 'Ibuprofen')
+
+        catalog, links = self.dedupe()
+        self.assertEqual(len(catalog), 2)
+        self.assertEqual(len({links[newest], links[described], links[pictured]}), 1)
+        self.assertEqual(catalog[links[newest]], ('panadol', 'Paracetamol', 'Old text.', 'medicine/images/p.png'))
+        self.assertNotEqual(links[other], links[newest])
+        self.assertEqual(catalog[links[other]], ('Brufen', 'Ibuprofen', None, None))
+
+    def test_most_recent_copy_wins_a_tie(self):
+        older = self.medicine('Panadol ', 'Paracetamol', description='Old text.', days_ago=3)
+        newer = self.medicine('panadol', 'PARACETAMOL', description='New text.')
+
+        catalog, links = self.dedupe()
+        self.assertEqual(links[older], links[newer])
+        self.assertEqual(catalog[links[newer]], ('panadol', 'PARACETAMOL', 'New text.', None))
+
+
+# RESERVATIONS ===========
+class ReservationTests(TestCase):
+    """Cart holds in Redis (inventory.reservations), against the Redis of REDIS_URL."""
+    BUYER, OTHER = 'reservation-buyer', 'reservation-other'
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            redis_conn.ping()
+        except redis.RedisError:
+            raise SkipTest("Redis is not reachable at REDIS_URL")
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        store = create_store('Reservations')
+        cls.five = create_medicine(store, 'Holdol', 'Holdamol', stock=5)
+        cls.two = create_medicine(store, 'Holdex', 'Holdamol', stock=2)
+
+    def setUp(self):
+        self.addCleanup(self._drop_holds)
+
+    def _drop_holds(self):
+        for medicine in (self.five, self.two):
+            redis_conn.delete(HOLD_KEY.format(medicine.pk))
+            for holder in (self.BUYER, self.OTHER):
+                redis_conn.zrem(HOLD_EXPIRY_KEY, f'{medicine.pk}:{holder}')
+
+    def free(self, medicine, holder=OTHER):
+        return available_stock({medicine.pk: medicine.stock}, holder)[medicine.pk]
+
+    def test_hold_is_all_or_nothing(self):
+        short = hold_items(self.BUYER, {self.five.pk: 3, self.two.pk: 3})
+        self.assertEqual(short, {self.two.pk: 2})
+        # the medicine that had enough was not held either
+        self.assertEqual(self.free(self.five), 5)
+
+        self.assertEqual(hold_items(self.BUYER, {self.five.pk: 3, self.two.pk: 2}), {})
+        self.assertEqual(self.free(self.five), 2)
+        self.assertEqual(hold_items(self.OTHER, {self.five.pk: 3}), {self.five.pk: 2})
+
+    def test_holder_does_not_count_its_own_holds(self):
+        hold_items(self.BUYER, {self.five.pk: 4})
+        self.assertEqual(self.free(self.five, holder=self.BUYER), 5)
+        # a new hold replaces the previous one, it does not add to it
+        self.assertEqual(hold_items(self.BUYER, {self.five.pk: 5}), {})
+        self.assertEqual(hold_items(self.BUYER, {self.five.pk: 1}), {})
+        self.assertEqual(self.free(self.five), 4)
+
+    def test_release_frees_the_stock(self):
+        hold_items(self.BUYER, {self.five.pk: 5})
+        release_items(self.BUYER, [self.five.pk])
+        self.assertEqual(hold_items(self.OTHER, {self.five.pk: 5}), {})
+
+    def test_holding_zero_releases(self):
+        hold_items(self.BUYER, {self.five.pk: 5})
+        hold_items(self.BUYER, {self.five.pk: 0})
+        self.assertEqual(self.free(self.five), 5)
+
+    def test_expired_holds_are_ignored_and_swept(self):
+        now = reservations._now_ms()
+        with mock.patch.object(reservations, '_now_ms', return_value=now):
+            hold_items(self.BUYER, {self.five.pk: 5})
+        later = now + RESERVATION_TTL * 1000 + 1
+        with mock.patch.object(reservations, '_now_ms', return_value=later):
+            self.assertEqual(self.free(self.five), 5)
+            self.assertEqual(sweep_expired_holds(), 1)
+        self.assertFalse(redis_conn.hexists(HOLD_KEY.format(self.five.pk), self.BUYER))
+        self.assertIsNone(redis_conn.zscore(HOLD_EXPIRY_KEY, f'{self.five.pk}:{self.BUYER}'))
+
+    def test_sweep_works_through_batches(self):
+        now = reservations._now_ms()
+        with mock.patch.object(reservations, '_now_ms', return_value=now):
+            hold_items(self.BUYER, {self.five.pk: 1, self.two.pk: 1})
+            hold_items(self.OTHER, {self.five.pk: 1})
+        with mock.patch.object(reservations, '_now_ms', return_value=now + RESERVATION_TTL * 1000 + 1):
+            self.assertEqual(sweep_expired_holds(batch_size=2), 3)
+        self.assertEqual(redis_conn.hlen(HOLD_KEY.format(self.five.pk)), 0)
+        self.assertEqual(redis_conn.hlen(HOLD_KEY.format(self.two.pk)), 0)
+
+    def test_sweep_keeps_renewed_holds(self):
+        now = reservations._now_ms()
+        with mock.patch.object(reservations, '_now_ms', return_value=now):
+            hold_items(self.BUYER, {self.five.pk: 2})
+        # renewed after the sweeper listed the expired entry, but before it ran
+        with mock.patch.object(reservations, '_now_ms', return_value=now + RESERVATION_TTL * 1000 + 1):
+            hold_items(self.BUYER, {self.five.pk: 2})
+            redis_conn.zadd(HOLD_EXPIRY_KEY, {f'{self.five.pk}:{self.BUYER}': now})
+            sweep_expired_holds()
+        self.assertTrue(redis_conn.hexists(HOLD_KEY.format(self.five.pk), self.BUYER))
+
+    def test_convert_takes_the_stock_and_releases_after_commit(self):
+        hold_items(self.BUYER, {self.five.pk: 2})
+        with self.captureOnCommitCallbacks(execute=True):
+            convert_holds(self.BUYER, {self.five.pk: 2})
+        self.five.refresh_from_db()
+        self.assertEqual(self.five.stock, 3)
+        self.assertFalse(redis_conn.hexists(HOLD_KEY.format(self.five.pk), self.BUYER))
+
+    def test_convert_refuses_stock_held_by_another_cart(self):
+        hold_items(self.OTHER, {self.five.pk: 4})
+        with self.assertRaises(ValidationError):
+            convert_holds(self.BUYER, {self.five.pk: 2})
+        self.five.refresh_from_db()
+        self.assertEqual(self.five.stock, 5)
+
+    def test_convert_is_guarded_and_all_or_nothing(self):
+        # the store lowered the stock between the hold and the checkout UPDATE
+        Medicine.objects.filter(pk=self.two.pk).update(stock=1)
+        with mock.patch.object(reservations, 'hold_items', return_value={}):
+            with self.assertRaises(ValidationError):
+                convert_holds(self.BUYER, {self.five.pk: 2, self.two.pk: 2})
+        self.five.refresh_from_db()
+        self.two.refresh_from_db()
+        # the first medicine's decrement was rolled back with the second's failure
+        self.assertEqual((self.five.stock, self.two.stock), (5, 1))
+
+
+# CHANGE FEED ===========
+class ChangeFeedCursorTests(TestCase):
+    """
+    inventory.changes.read_changes. The rows are written with small txids, so they are
+    older than every running transaction, the test's own included.
+    """
+    STORE = 10 ** 12  # not a real store, keeps the rows apart
+
+    def log(self, txid, object_id, deleted=False, kind='medicine'):
+        return InventoryChange.objects.create(
+            txid=txid, kind=kind, object_id=object_id, store_id=self.STORE, deleted=deleted, changed_at='2026-01-01T00:00Z',
+        )
+
+    def read(self, since=None, limit=2):
+        rows, cursor, has_more = read_changes(InventoryChange.objects.filter(store_id=self.STORE), since, limit)
+        return [(row['kind'], row['object_id'], row['deleted']) for row in rows], cursor, has_more
+
+    def test_pages_follow_the_cursor_in_txid_order(self):
+        # ids are not in txid order: a transaction that started first may commit last
+        self.log(txid=3, object_id=30)
+        self.log(txid=1, object_id=10)
+        self.log(txid=2, object_id=20)
+        self.log(txid=2, object_id=21)
+
+        rows, cursor, has_more = self.read()
+        self.assertEqual(rows, [('medicine', 10, False), ('medicine', 20, False)])
+        self.assertTrue(has_more)
+        rows, cursor, has_more = self.read(cursor)
+        self.assertEqual(rows, [('medicine', 21, False), ('medicine', 30, False)])
+        self.assertFalse(has_more)
+
+        # nothing new: the same cursor comes back
+        self.assertEqual(self.read(cursor), ([], cursor, False))
+        self.log(txid=4, object_id=10, deleted=True)
+        self.assertEqual(self.read(cursor)[0], [('medicine', 10, True)])
+
+    def test_page_keeps_the_last_change_of_each_object(self):
+        self.log(txid=1, object_id=10)
+        self.log(txid=1, object_id=20)
+        self.log(txid=2, object_id=10, deleted=True)
+        self.log(txid=2, object_id=10, kind='device')
+
+        rows, cursor, has_more = self.read(limit=10)
+        # moved to the place of its last change, kinds are separate objects
+        self.assertEqual(rows, [('medicine', 20, False), ('medicine', 10, True), ('device', 10, False)])
+        self.assertEqual(decode_cursor(cursor)[0], 2)
+
+    def test_open_transactions_are_not_read(self):
+        self.log(txid=1, object_id=10)
+        # a txid past the snapshot's xmin: its transaction may still be running
+        self.log(txid=2 ** 62, object_id=20)
+        rows, cursor, has_more = self.read(limit=10)
+        self.assertEqual(rows, [('medicine', 10, False)])
+        self.assertFalse(has_more)
+
+    def test_cursor_round_trip_and_invalid_cursor(self):
+        self.assertEqual(decode_cursor(encode_cursor(7, 42)), (7, 42))
+        for cursor in ('not-a-cursor', encode_cursor('x', 1), 'W10='):
+            with self.subTest(cursor=cursor), self.assertRaises(ValidationError):
+                self.read(cursor)
+
+
+# LISTING CACHE ===========
+class ListingCacheTests(TestCase):
+    """Client listings served from the cache until a write bumps the generation (inventory.cache)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = create_store('Cachestore')
+        cls.medicine = create_medicine(cls.store, 'Cachol')
+        cls.buyer = User.objects.create(email='cache-buyer@example.com', name='buyer', role='client')
+
+    def prices(self, user):
+        self.client.force_login(user)
+        response = self.client.get('/inventory/medicines/', {'store_id': self.store.pk})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row['price'] for row in response.data['results']]
+
+    def test_client_listing_is_cached_until_a_write(self):
+        self.assertEqual(self.prices(self.buyer), ['10.00'])
+        # a write that sends no signal is not seen until the generation moves
+        Medicine.objects.filter(pk=self.medicine.pk).update(price=20)
+        self.assertEqual(self.prices(self.buyer), ['10.00'])
+        self.assertEqual(self.prices(self.store.owner.user), ['20.00'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.medicine.price = 30
+            self.medicine.save()
+        self.assertEqual(self.prices(self.buyer), ['30.00'])
+
+    def test_catalog_edits_invalidate_the_stores_listings(self):
+        self.prices(self.buyer)
+        generation, _ = get_generation(self.store.pk)
+        item = self.medicine.catalog_item
+        with self.captureOnCommitCallbacks(execute=True):
+            item.description = 'New text.'
+            item.save(update_fields=['description'])
+        self.assertEqual(get_generation(self.store.pk)[0], generation + 1)
+        self.client.force_login(self.buyer)
+        response = self.client.get('/inventory/medicines/', {'store_id': self.store.pk})
+        self.assertEqual(response.data['results'][0]['description'], 'New text.')
+
+    def test_generation_moves_after_the_commit(self):
+        generation, _ = get_generation(self.store.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.medicine.save()
+            self.assertEqual(get_generation(self.store.pk)[0], generation)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_generation(self.store.pk)[0], generation + 1)
+
+
+# CONDITIONAL GET ===========
+class ConditionalGetTests(TestCase):
+    """Last-Modified / If-Modified-Since with one-second generation mtimes (inventory.cache.ConditionalGetMixin)."""
+    MTIME = 1_700_000_000
+
+    def _get(self, now, **headers):
+        request = Request(APIRequestFactory().get('/inventory/medicines/', **headers))
+        request.user = mock.Mock(pk=1)
+        with mock.patch('inventory.cache.get_generation', return_value=(3, self.MTIME)), \
+                mock.patch('inventory.cache.time.time', return_value=now + 0.5):
+            return ConditionalGetMixin().conditional_response(request, lambda: Response({'results': []}))
+
+    def test_no_last_modified_while_its_second_is_open(self):
+        self.assertNotIn('Last-Modified', self._get(self.MTIME))
+        self.assertEqual(self._get(self.MTIME + 1)['Last-Modified'], http_date(self.MTIME))
+
+    def test_if_modified_since_of_a_passed_second(self):
+        since = http_date(self.MTIME)
+        self.assertEqual(self._get(self.MTIME + 1, HTTP_IF_MODIFIED_SINCE=since).status_code, 304)
+        self.assertEqual(self._get(self.MTIME + 1, HTTP_IF_MODIFIED_SINCE=http_date(self.MTIME - 1)).status_code, 200)
+
+    def test_if_modified_since_of_the_current_second_is_not_trusted(self):
+        # a later write in this same second would keep the same mtime
+        response = self._get(self.MTIME, HTTP_IF_MODIFIED_SINCE=http_date(self.MTIME))
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_decides_when_both_are_sent(self):
+        etag = self._get(self.MTIME + 1)['ETag']
+        since = http_date(self.MTIME)
+        self.assertEqual(self._get(self.MTIME + 1, HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=since).status_code, 304)
+        self.assertEqual(self._get(self.MTIME + 1, HTTP_IF_NONE_MATCH='"stale"', HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+
+
+# ALTERNATIVES ===========
+class AlternativesTests(TestCase):
+    """/medicines/{id}/alternatives/ (inventory.alternatives.alternatives_for)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        store, cls.other, pending = create_store('Altstore'), create_store('Altother'), create_store('Altpending', 'pending')
+        other = cls.other
+        cls.medicine = create_medicine(store, 'Altol', 'Altamol', atc_code='Z99ZZ01')
+        create_medicine(other, 'Altex', ' ALTAMOL', price=8)
+        create_medicine(other, 'Altrin', 'altamol', price=4)
+        create_medicine(other, 'Linkol', 'Linkamol', atc_code='Y11AA01', price=1)
+        create_medicine(other, 'Groupol', 'Groupamol', atc_code='Z99ZZ02', price=2)
+        # never offered: sold out, deleted, or from a store that is not approved
+        create_medicine(other, 'Altzero', 'Altamol', stock=0)
+        create_medicine(other, 'Altgone', 'Altamol', is_deleted=True)
+        create_medicine(pending, 'Altwait', 'Altamol')
+        cls.linked = Medicine.objects.get(brand_name='Linkol', store=other)
+        cls.medicine.alternative_medicines.add(cls.linked)
+        cls.buyer = User.objects.create(email='alt-buyer@example.com', name='buyer', role='client')
+
+    def alternatives(self, medicine):
+        self.client.force_login(self.buyer)
+        response = self.client.get(f'/inventory/medicines/{medicine.pk}/alternatives/')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [(row['brand_name'], row['match']) for row in response.data['results']]
+
+    def test_same_generic_then_linked_then_atc_group(self):
+        self.assertEqual(
+            self.alternatives(self.medicine), [('Altrin', 0), ('Altex', 0), ('Linkol', 1), ('Groupol', 2)],
+        )
+
+    def test_links_work_both_ways(self):
+        self.assertEqual(self.alternatives(self.linked), [('Altol', 1)])
+
+    def test_incomplete_atc_codes_match_no_group(self):
+        CatalogMedicine.objects.filter(pk=self.medicine.catalog_item_id).update(atc_code='Z99')
+        create_medicine(self.other, 'Shortol', 'Shortamol', atc_code='Z99')
+        self.assertEqual([name for name, _ in self.alternatives(self.medicine)], ['Altrin', 'Altex', 'Linkol'])
+
+
+# PRICE COMPARISON ===========
+@skipUnless(connection.vendor == 'postgresql', "The price summary is a Postgres materialized view")
+class PriceComparisonTests(TestCase):
+    """/medicines/price-comparison/ read from the refreshed MedicinePriceSummary view."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.stores = [create_store(f'Pricestore{number}') for number in range(3)]
+        cheap, middle, dear = cls.stores
+        create_medicine(dear, 'Pricol', 'Pricamol', price=9)
+        create_medicine(middle, 'Pricex', ' PRICAMOL', price=5)
+        # a store's cheapest offer is its price
+        create_medicine(middle, 'Pricin', 'pricamol', price=6)
+        create_medicine(cheap, 'Pricon', 'Pricamol', price=3)
+        # never offered: sold out, deleted, or from a store that is not approved
+        create_medicine(cheap, 'Pricout', 'Pricamol', price=1, stock=0)
+        create_medicine(cheap, 'Pricgone', 'Pricamol', price=1, is_deleted=True)
+        create_medicine(create_store('Pricepending', 'pending'), 'Pricwait', 'Pricamol', price=1)
+        refresh_price_summary()
+        cls.buyer = User.objects.create(email='price-buyer@example.com', name='buyer', role='client')
+
+    def setUp(self):
+        self.client.force_login(self.buyer)
+
+    def test_summary_of_the_approved_offers(self):
+        response = self.client.get('/inventory/medicines/price-comparison/', {'generic': ' Pricamol '})
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.data
+        self.assertEqual((data['min_price'], data['median_price'], data['max_price']), ('3.00', '5.00', '9.00'))
+        self.assertEqual(data['store_count'], 3)
+        self.assertEqual([store['store_name'] for store in data['cheapest_stores']], ['Pricestore0', 'Pricestore1', 'Pricestore2'])
+
+    def test_refresh_picks_up_changes(self):
+        Medicine.objects.filter(brand_name='Pricol').update(price=2)
+        refresh_price_summary()
+        data = self.client.get('/inventory/medicines/price-comparison/', {'generic': 'pricamol'}).data
+        self.assertEqual(data['min_price'], '2.00')
+        self.assertEqual(data['cheapest_stores'][0]['store_name'], 'Pricestore2')
+
+    def test_unknown_or_missing_generic(self):
+        self.assertEqual(self.client.get('/inventory/medicines/price-comparison/', {'generic': 'nosuchamol'}).status_code, 404)
+        self.assertEqual(self.client.get('/inventory/medicines/price-comparison/').status_code, 400)
+
+
+# IMAGE VARIANTS ===========
+class ImageVariantTests(TestCase):
+    """Resized WebP/AVIF copies of catalog images (inventory.images), written to a throwaway MEDIA_ROOT."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.item = create_medicine(create_store('Imagestore'), 'Imagol').catalog_item
+
+    def upload(self, name, size):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'PNG')
+        self.item.image = default_storage.save(f'medicine/images/{name}', ContentFile(buffer.getvalue()))
+        self.item.save(update_fields=['image'])
+        return self.item.image.name
+
+    def variants(self):
+        self.item.refresh_from_db()
+        return self.item.image_variants
+
+    def test_variants_fit_their_box_and_are_not_upscaled(self):
+        source = self.upload('wide.png', (800, 400))
+        generate_variants(CatalogMedicine, self.item.pk)
+        variants = self.variants()
+        self.assertEqual(variants['source'], source)
+        for size, box in (('thumb', (160, 80)), ('medium', (480, 240))):
+            with default_storage.open(variants[size]['webp']) as file:
+                image = Image.open(file)
+                self.assertEqual((image.format, image.size), ('WEBP', box))
+
+        self.upload('small.png', (100, 50))
+        generate_variants(CatalogMedicine, self.item.pk)
+        with default_storage.open(self.variants()['medium']['webp']) as file:
+            self.assertEqual(Image.open(file).size, (100, 50))
+
+    def test_new_upload_replaces_the_old_variants(self):
+        self.upload('first.png', (300, 300))
+        generate_variants(CatalogMedicine, self.item.pk)
+        old = self.variants()['thumb']['webp']
+        self.assertFalse(needs_variants(self.item))
+
+        self.upload('second.png', (300, 300))
+        self.assertTrue(needs_variants(self.item))
+        generate_variants(CatalogMedicine, self.item.pk)
+        self.assertNotEqual(self.variants()['thumb']['webp'], old)
+        self.assertFalse(default_storage.exists(old))
+
+    def test_variants_of_a_replaced_upload_are_dropped(self):
+        self.upload('first.png', (300, 300))
+
+        def replaced_meanwhile(image_name):
+            variants = build_variants(image_name)
+            CatalogMedicine.objects.filter(pk=self.item.pk).update(image='medicine/images/newer.png')
+            return variants
+
+        with mock.patch('inventory.images.build_variants', side_effect=replaced_meanwhile):
+            generate_variants(CatalogMedicine, self.item.pk)
+        self.assertEqual(self.variants(), {})
+
+    def test_uploads_are_resized_after_the_commit(self):
+        with mock.patch('inventory.images._executor') as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.upload('queued.png', (300, 300))
+                executor.submit.assert_not_called()
+        executor.submit.assert_called_once_with(_generate_in_background, CatalogMedicine, self.item.pk)
+
+    def test_serializer_shows_variant_urls(self):
+        self.upload('shown.png', (300, 300))
+        generate_variants(CatalogMedicine, self.item.pk)
+        medicine = Medicine.objects.select_related('catalog_item').get(catalog_item=self.item)
+        urls = MedicineSerializer(medicine).data['image_variants']
+        self.assertEqual(set(urls), {'thumb', 'medium'})
+        self.assertTrue(urls['thumb']['webp'].startswith('/media/medicine/images/variants/shown_thumb'))
+
+
+# ARCHIVE ===========
+class ArchiveTests(TestCase):
+    """inventory.archive: soft-deleted medicines moved to ArchivedMedicine and back."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = create_store('Archive')
+        cls.kept, cls.first, cls.second = [
+            create_medicine(cls.store, name, 'Coldamol', price=price, stock=stock)
+            for name, price, stock in (('Kept', 5, 3), ('First', '12.50', 7), ('Second', 9, 0))
+        ]
+        cls.first.alternative_medicines.add(cls.kept, cls.second)
+        Medicine.objects.filter(pk=cls.first.pk).update(timestamp=cls.first.timestamp - timedelta(days=400))
+        # deleted_at is set by a trigger, the tests archive with older_than=0
+        Medicine.objects.filter(pk__in=[cls.first.pk, cls.second.pk]).update(is_deleted=True)
+        cls.first.refresh_from_db()
+
+    def archive(self):
+        archive_deleted_medicines(older_than=timedelta(0))
+
+    def alternatives(self, medicine):
+        return set(Medicine.objects.get(pk=medicine.pk).alternative_medicines.values_list('pk', flat=True))
+
+    def test_archive_moves_old_deleted_rows_and_their_links(self):
+        self.archive()
+        self.assertFalse(Medicine.objects.filter(pk__in=[self.first.pk, self.second.pk]).exists())
+        archived = ArchivedMedicine.objects.get(pk=self.first.pk)
+        self.assertEqual(sorted(archived.alternative_ids), sorted([self.kept.pk, self.second.pk]))
+        self.assertEqual(archived.timestamp, self.first.timestamp)
+        self.assertEqual(self.alternatives(self.kept), set())
+
+    def test_restore_brings_back_fields_and_live_links(self):
+        self.archive()
+        self.assertEqual(restore_medicines(self.store, [self.first.pk]), [self.first.pk])
+
+        restored = Medicine.objects.get(pk=self.first.pk)
+        for field in ('timestamp', 'is_deleted', 'deleted_at', 'catalog_item_id', 'brand_name', 'generic_name', 'price', 'stock', 'store_id'):
+            self.assertEqual(getattr(restored, field), getattr(self.first, field), field)
+        self.assertFalse(ArchivedMedicine.objects.filter(pk=self.first.pk).exists())
+        # the still archived alternative gets its link back when it is restored in turn
+        self.assertEqual(self.alternatives(restored), {self.kept.pk})
+        restore_medicines(self.store, [self.second.pk])
+        self.assertEqual(self.alternatives(restored), {self.kept.pk, self.second.pk})
+        self.assertEqual(self.alternatives(self.second), {self.first.pk})
+
+    def test_restore_skips_a_drug_listed_again(self):
+        self.archive()
+        again = Medicine.objects.create(
+            store=self.store, catalog_item=ArchivedMedicine.objects.get(pk=self.first.pk).catalog_item,
+            brand_name='First', generic_name='Coldamol', price=13, stock=2,
+        )
+        self.assertEqual(restore_medicines(self.store, [self.first.pk, self.second.pk]), [self.second.pk])
+        self.assertTrue(ArchivedMedicine.objects.filter(pk=self.first.pk).exists())
+        self.assertEqual(Medicine.objects.get(pk=again.pk).stock, 2)
+
+    def test_restore_only_takes_the_stores_own_rows(self):
+        self.archive()
+        self.assertEqual(restore_medicines(create_store('Elsewhere'), [self.first.pk]), [])
+        self.assertTrue(ArchivedMedicine.objects.filter(pk=self.first.pk).exists())
+
+
+# BULK IMPORT ===========
+class BulkImportTests(TestCase):
+    """inventory.bulk: streamed uploads into one store."""
+    HEADER = b'brand_name,generic_name,chemical_name,atc_code,cas_number,price,stock\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = create_store('Importer')
+
+    def run_import(self, content, file_format):
+        return import_medicines(self.store, iter_upload_rows(io.BytesIO(content), file_format))
+
+    def test_unreadable_csv_rows_are_row_errors(self):
+        content = b''.join([
+            b'\xef\xbb\xbfbrand_name,generic_name,chemical_name,atc_code,cas_number,price,stock\n',
+            b'Importol,Importamol,importamol,N02BE01,1-2-3,10,5\n',
+            b'Bad\xff,Importamol,importamol,N02BE01,1-2-3,10,5\n',
+            b'Big,' + b'x' * (csv.field_size_limit() + 1) + b',importamol,N02BE01,1-2-3,10,5\n',
+            b'Importex,Importamol,importamol,N02BE01,1-2-3,11,6\n',
+        ])
+        summary = self.run_import(content, 'csv')
+        self.assertEqual((summary['created'], summary['failed']), (2, 2))
+        self.assertEqual([error['row'] for error in summary['errors']], [2, 3])
+        self.assertEqual(summary['errors'][0]['errors'], {'non_field_errors': ['Row is not valid UTF-8.']})
+        self.assertEqual(
+            sorted(Medicine.objects.filter(store=self.store).values_list('brand_name', flat=True)), ['Importex', 'Importol'],
+        )
+
+    def test_unreadable_ndjson_lines_are_row_errors(self):
+        content = b'\n'.join([
+            b'{"brand_name": "Importol", "generic_name": "Importamol", "chemical_name": "importamol", "atc_code": "N02BE01", '
+            b'"cas_number": "1-2-3", "price": 10, "stock": 5}',
+            b'{"brand_name": "Bad\xff"}',
+            b'[1, 2]',
+        ])
+        summary = self.run_import(content, 'ndjson')
+        self.assertEqual(summary['created'], 1)
+        self.assertEqual(
+            [(error['row'], error['errors']['non_field_errors']) for error in summary['errors']],
+            [(2, ['Row is not valid UTF-8.']), (3, ['Row is not a JSON object.'])],
+        )
+
+    def test_reimport_updates_the_stores_row(self):
+        first = self.run_import(self.HEADER + b'Importol,Importamol,importamol,N02BE01,1-2-3,10,5\n', 'csv')
+        # the same drug again, spelled differently, twice in one file: the later row wins
+        again = self.run_import(
+            self.HEADER + b' importol ,IMPORTAMOL,importamol,N02BE01,1-2-3,12,8\nImportol,Importamol,importamol,N02BE01,1-2-3,14,0\n', 'csv',
+        )
+        self.assertEqual((first['created'], first['updated']), (1, 0))
+        self.assertEqual((again['created'], again['updated'], again['failed']), (0, 1, 0))
+        medicine = Medicine.objects.get(store=self.store)
+        self.assertEqual((medicine.price, medicine.stock, medicine.is_deleted), (14, 0, True))
+
+    def test_store_lists_a_drug_once(self):
+        medicine = create_medicine(self.store, 'Oncol')
+        data = {
+            'store': self.store.pk, 'brand_name': 'oncol ', 'generic_name': 'Testamol', 'chemical_name': 'testamol',
+            'atc_code': 'N02BE01', 'cas_number': '103-90-2', 'price': 3, 'stock': 1,
+        }
+        serializer = MedicineSerializer(data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertRaises(ValidationError) as raised:
+            serializer.save()
+        self.assertIn(str(medicine.pk), str(raised.exception.detail['non_field_errors'][0]))
+        # a rename onto a drug the store already lists is refused as well
+        other = create_medicine(self.store, 'Twicol')
+        serializer = MedicineSerializer(other, data={'brand_name': 'Oncol'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertRaises(ValidationError):
+            serializer.save()
+        self.assertEqual(Medicine.objects.filter(store=self.store).count(), 2)
+
+
+# STOCK ADJUSTMENT ===========
+class BulkStockTests(TestCase):
+    """inventory.bulk.bulk_adjust_stock, the POS sync endpoint's single UPDATE."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = create_store('Counter')
+        cls.three = create_medicine(cls.store, 'Countol', stock=3)
+        cls.ten = create_medicine(cls.store, 'Countex', stock=10)
+
+    def stock(self, medicine):
+        return Medicine.objects.values_list('stock', 'is_deleted').get(pk=medicine.pk)
+
+    def test_deltas_and_absolutes_in_one_batch(self):
+        result = bulk_adjust_stock(self.store, [
+            {'id': self.three.pk, 'delta': -3}, {'id': self.ten.pk, 'absolute': 4}, {'id': 10 ** 12, 'delta': 1},
+        ])
+        self.assertEqual(result['missing'], [10 ** 12])
+        self.assertEqual(self.stock(self.three), (0, True))
+        self.assertEqual(self.stock(self.ten), (4, False))
+
+    def test_oversold_delta_rejects_the_batch(self):
+        with self.assertRaises(ValidationError) as raised:
+            bulk_adjust_stock(self.store, [{'id': self.ten.pk, 'delta': -2}, {'id': self.three.pk, 'delta': -5}])
+        messages = raised.exception.detail['items']
+        self.assertEqual(len(messages), 1)
+        self.assertIn(str(self.three.pk), messages[0])
+        self.assertEqual(self.stock(self.three), (3, False))
+        self.assertEqual(self.stock(self.ten), (10, False))
+
+
+class ExportTests(TestCase):
+    """/medicines/export/: a store's inventory streamed as CSV or NDJSON (inventory.bulk.iter_export_chunks)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = create_store('Exporter')
+        cls.rows = [
+            create_medicine(cls.store, 'Exportol', 'Exportamol', price='4.50', description='Line one,\nline two.'),
+            create_medicine(cls.store, 'Exportex', 'Exportamol', price=6),
+            create_medicine(cls.store, 'Exportgone', 'Exportamol', is_deleted=True),
+        ]
+        create_medicine(create_store('Otherexporter'), 'Exportother', 'Exportamol')
+
+    def export(self, **params):
+        self.client.force_login(self.store.owner.user)
+        return self.client.get('/inventory/medicines/export/', {'store': self.store.pk, **params})
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_has_the_import_columns(self):
+        response = self.export()
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="store-{self.store.pk}-medicines.csv"')
+        rows = list(csv.DictReader(io.StringIO(self.content(response))))
+        self.assertEqual([row['brand_name'] for row in rows], ['Exportol', 'Exportex'])
+        self.assertEqual((rows[0]['price'], rows[0]['description'], rows[0]['is_deleted']), ('4.50', 'Line one,\nline two.', 'False'))
+
+        # a store exported as CSV imports back as the same rows
+        copy = create_store('Copystore')
+        summary = import_medicines(copy, iter_upload_rows(io.BytesIO(self.content(self.export()).encode()), 'csv'))
+        self.assertEqual((summary['created'], summary['failed']), (2, 0))
+        self.assertEqual(
+            sorted(Medicine.objects.filter(store=copy).values_list('brand_name', 'price', 'catalog_item')),
+            sorted(Medicine.objects.filter(pk__in=[self.rows[0].pk, self.rows[1].pk]).values_list('brand_name', 'price', 'catalog_item')),
+        )
+
+    def test_ndjson_with_deleted_rows(self):
+        response = self.export(file_format='jsonl', include_deleted='true')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [medicine.pk for medicine in self.rows])
+        self.assertEqual((rows[0]['price'], rows[2]['is_deleted']), ('4.50', True))
+
+    def test_rows_go_out_a_chunk_at_a_time(self):
+        queryset = Medicine.objects.filter(store=self.store)
+        chunks = list(iter_export_chunks(queryset, {'id': 'id'}, 'csv', chunk_size=2))
+        self.assertEqual(chunks, ['id\r\n', f'{self.rows[0].pk}\r\n{self.rows[1].pk}\r\n', f'{self.rows[2].pk}\r\n'])
+
+    def test_only_the_owner_exports_a_known_format(self):
+        self.assertEqual(self.export(file_format='xlsx').status_code, 400)
+        self.client.force_login(User.objects.get(email='otherexporter@example.com'))
+        self.assertEqual(self.client.get('/inventory/medicines/export/', {'store': self.store.pk}).status_code, 403)
+
+
+# KEYSET PAGINATION ===========
+class KeysetPaginationTests(TestCase):
+    """?pagination=cursor on the medicine listing (inventory.pagination.KeysetPagination)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = create_store('Keyset')
+        for name, price in (('Delta', 4), ('alpha', 9), ('Echo', 1), ('Bravo', 9), ('charlie', 2)):
+            create_medicine(cls.store, name, price=price)
+        create_medicine(cls.store, 'Ibuprofen tabs', 'Ibuprofen', description='Pain relief.', price=3)
+        create_medicine(cls.store, 'Nurofen', 'Ibuprofen', description='Ibuprofen for pain, ibuprofen for fever.', price=5)
+        create_medicine(cls.store, 'Brufen', 'Other', description='Contains ibuprofen.', price=7)
+
+    def setUp(self):
+        self.client.force_login(self.store.owner.user)
+
+    def get(self, params):
+        return self.client.get('/inventory/medicines/', {'store_id': self.store.pk, 'page_size': 2, **params})
+
+    def walk(self, params):
+        names, cursor = [], None
+        while True:
+            response = self.get({**params, 'pagination': 'cursor', **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertNotIn('count', response.data)
+            names += [row['brand_name'] for row in response.data['results']]
+            if not response.data['next']:
+                return names
+            cursor = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+
+    def test_pages_follow_the_sort_key(self):
+        names = self.walk({})
+        self.assertEqual(names, sorted(names, key=str.lower))
+        self.assertEqual(len(names), 8)
+        by_price = self.walk({'ordering': '-price'})
+        prices = dict(Medicine.objects.filter(store=self.store).values_list('brand_name', 'price'))
+        self.assertEqual([prices[name] for name in by_price], sorted(prices.values(), reverse=True))
+        self.assertEqual(by_price[:2], ['Bravo', 'alpha'])  # same price, id descending
+
+    def test_full_text_results_keep_their_rank(self):
+        ranked = [row['brand_name'] for row in self.get({'q': 'ibuprofen', 'page_size': 10}).data['results']]
+        self.assertEqual(len(ranked), 3)
+        self.assertEqual(self.walk({'q': 'ibuprofen'}), ranked)
+        self.assertNotEqual(ranked, sorted(ranked))
+
+    def test_tampered_cursors_are_not_found(self):
+        def encode(value):
+            return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+        for params in (
+            {'cursor': 'not a cursor'}, {'cursor': encode({'a': 1, 'b': 2})}, {'cursor': encode(['x'])},
+            {'cursor': encode(['alpha', 'x'])}, {'cursor': encode(['cheap', 1]), 'ordering': 'price'},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.get({'pagination': 'cursor', **params}).status_code, 404)
+
+
+# FULL-TEXT SEARCH ===========
+class FullTextSearchTests(TestCase):
+    """?q= on the medicine listing (inventory.filters.MedicineFullTextFilter)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = create_store('Fulltext')
+        cls.named = create_medicine(cls.store, 'Halvex Migraine', 'Zolmitestan')
+        cls.described = create_medicine(cls.store, 'Nocturnol', 'Testhydramine', description='Eases migraine at night.')
+        cls.coded = create_medicine(cls.store, 'Inflamex', 'Testprofen', atc_code='M01AE99')
+
+    def setUp(self):
+        self.client.force_login(self.store.owner.user)
+
+    def search(self, terms):
+        response = self.client.get('/inventory/medicines/', {'store_id': self.store.pk, 'q': terms})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data['results']
+
+    def names(self, terms):
+        return [row['brand_name'] for row in self.search(terms)]
+
+    def test_matches_names_codes_and_descriptions(self):
+        self.assertEqual(self.names('zolmitestan'), ['Halvex Migraine'])
+        self.assertEqual(self.names('M01AE99'), ['Inflamex'])
+        self.assertEqual(self.names('night'), ['Nocturnol'])
+        self.assertEqual(self.names('migraine -night'), ['Halvex Migraine'])
+
+    def test_names_rank_above_descriptions(self):
+        # a brand (weight A) match over a description (weight C) one
+        self.assertEqual(self.names('migraine'), ['Halvex Migraine', 'Nocturnol'])
+        rows = self.search('migraine')
+        self.assertGreater(rows[0]['rank'], rows[1]['rank'])
+        self.assertIn('<mark>migraine</mark>', rows[1]['headline'])
+
+    def test_catalog_edits_are_searchable(self):
+        item = self.coded.catalog_item
+        item.description = 'Anti-inflammatory for joint pain.'
+        item.save(update_fields=['description'])
+        self.assertEqual(self.names('inflammatory joint'), ['Inflamex'])
+        self.assertEqual(self.names('testprofen'), ['Inflamex'])
+
+
+# AUTOCOMPLETE ===========
+class AutocompleteTests(TestCase):
+    """Name suggestions from the memory-mapped snapshot (inventory.autocomplete), written to a temporary file."""
+    KEYS = {'autol', 'autex', 'autamol', 'autochem'}
+
+    @classmethod
+    def setUpTestData(cls):
+        store, other = create_store('Autostore'), create_store('Autoother')
+        listed = create_medicine(store, 'Autol', 'Autamol')
+        Medicine.objects.create(store=other, catalog_item=listed.catalog_item, brand_name='Autol', generic_name='Autamol', price=4, stock=1)
+        create_medicine(other, 'Autex', ' autamol')
+        # not counted: deleted, or from a store that is not approved
+        create_medicine(store, 'Autex', 'Autgone', is_deleted=True)
+        create_medicine(create_store('Autopending', 'pending'), 'Autex', 'Autwait')
+        CatalogMedicine.objects.filter(generic_key='autamol').update(chemical_name=' autochem')
+        cls.buyer = User.objects.create(email='auto-buyer@example.com', name='buyer', role='client')
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        override = override_settings(MEDICINE_AUTOCOMPLETE_INDEX=os.path.join(directory, 'names.idx'))
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_names_are_counted_by_live_listing(self):
+        self.assertEqual(count_names(self.KEYS), {
+            'autol': ('Autol', 2), 'autex': ('Autex', 1), 'autamol': ('Autamol', 3), 'autochem': ('autochem', 3),
+        })
+
+    def test_heaviest_names_of_a_prefix_first(self):
+        entries = {f'name{number:03}': (f'Name{number:03}', number % 7) for number in range(300)}
+        write_snapshot({**entries, 'other': ('Other', 100)})
+        snapshot = current_snapshot()
+        expected = sorted(entries.values(), key=lambda entry: (-entry[1], entry[0]))
+        # a short prefix walks the names by weight, a long one ranks its few matches
+        self.assertEqual(snapshot.suggest('name', 10), expected[:10])
+        self.assertEqual(snapshot.suggest('name02', 3), sorted(
+            [entry for entry in entries.values() if entry[0].startswith('Name02')], key=lambda entry: (-entry[1], entry[0]),
+        )[:3])
+        self.assertEqual(snapshot.suggest('nope', 10), [])
+
+    def test_updates_merge_into_the_snapshot(self):
+        write_snapshot({'autol': ('Autol', 9), 'autex': ('Autex', 9), 'autzero': ('Autzero', 4), 'kept': ('Kept', 1)})
+        update_index(self.KEYS | {'autzero'})
+        self.assertEqual(suggest('AUT '), [('Autamol', 3), ('autochem', 3), ('Autol', 2), ('Autex', 1)])
+        self.assertEqual(suggest('kep'), [('Kept', 1)])
+
+    def test_endpoint(self):
+        write_snapshot(count_names(self.KEYS))
+        self.client.force_login(self.buyer)
+        response = self.client.get('/inventory/medicines/autocomplete/', {'q': 'auto', 'limit': 1})
+        self.assertEqual(response.json(), [{'name': 'autochem', 'count': 3}])
+        for params in ({}, {'q': 'aut', 'limit': 'x'}, {'q': 'aut', 'limit': 0}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/inventory/medicines/autocomplete/', params).status_code, 400)
+
+
+# LETTER FACETS ===========
+@skipUnless(connection.vendor == 'postgresql', "The letter counts are kept by Postgres triggers (migration 0016)")
+class LetterFacetTests(TestCase):
+    """/medicines/facets/ read from the trigger maintained MedicineLetterCount rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = create_store('Facetstore')
+        cls.apple = create_medicine(cls.store, 'apple', 'Facetamol')
+        cls.avocado = create_medicine(cls.store, 'Avocado', 'Facetamol', stock=0)
+        cls.digit = create_medicine(cls.store, '3-Day', 'Facetamol')
+
+    def counts(self):
+        return {
+            letter: (total, in_stock)
+            for letter, total, in_stock in MedicineLetterCount.objects.filter(store=self.store, total__gt=0).values_list(
+                'letter', 'total', 'in_stock',
+            )
+        }
+
+    def test_inserts_count_by_first_letter(self):
+        self.assertEqual(self.counts(), {'A': (2, 1), '#': (1, 1)})
+
+    def test_soft_delete_stock_and_rename_move_the_counts(self):
+        self.avocado.stock = 4
+        self.avocado.save()
+        self.assertEqual(self.counts(), {'A': (2, 2), '#': (1, 1)})
+        Medicine.objects.filter(pk=self.apple.pk).update(brand_name='Banana')
+        self.assertEqual(self.counts(), {'A': (1, 1), 'B': (1, 1), '#': (1, 1)})
+        Medicine.objects.filter(pk=self.digit.pk).update(is_deleted=True)
+        self.assertEqual(self.counts(), {'A': (1, 1), 'B': (1, 1)})
+        # price edits do not touch the counts, a hard delete takes the row out
+        Medicine.objects.filter(store=self.store).update(price=1)
+        self.apple.delete()
+        self.assertEqual(self.counts(), {'A': (1, 1)})
+
+    def test_bulk_writes_are_counted(self):
+        bulk_adjust_stock(self.store, [{'id': self.avocado.pk, 'delta': 2}, {'id': self.digit.pk, 'absolute': 0}])
+        # no stock left deletes the row
+        self.assertEqual(self.counts(), {'A': (2, 2)})
+
+    def test_endpoint_sums_the_letter_bar(self):
+        self.client.force_login(self.store.owner.user)
+        data = self.client.get('/inventory/medicines/facets/', {'store_id': self.store.pk}).json()
+        self.assertEqual((data['total'], data['in_stock']), (3, 2))
+        letters = {bucket['letter']: (bucket['total'], bucket['in_stock']) for bucket in data['letters']}
+        self.assertEqual(len(letters), 27)
+        self.assertEqual((letters['A'], letters['#'], letters['Z']), ((2, 1), (1, 1), (0, 0)))
+        self.assertEqual(data['stores'], [{'store_id': self.store.pk, 'total': 3, 'in_stock': 2}])
+
+        # pharmacists only count their own stores
+        self.client.force_login(create_store('Facetother').owner.user)
+        self.assertEqual(self.client.get('/inventory/medicines/facets/', {'store_id': self.store.pk}).json()['total'], 0)
+
+
+# SPARSE FIELDSETS ===========
+class SparseFieldsTests(TestCase):
+    """?fields= / ?omit= on the medicine endpoints (inventory.sparse)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = create_store('Sparsestore')
+        cls.medicine = create_medicine(cls.store, 'Sparsol', description='Only when asked.')
+
+    def setUp(self):
+        self.client.force_login(self.store.owner.user)
+
+    def get(self, path='/inventory/medicines/', **params):
+        return self.client.get(path, {'store_id': self.store.pk, **params})
+
+    def test_fields_keeps_only_the_picked_fields(self):
+        response = self.get(fields='id,brand_name')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['results'], [{'id': self.medicine.pk, 'brand_name': 'Sparsol'}])
+
+    def test_omit_drops_fields(self):
+        row = self.get(omit='description,image_variants').data['results'][0]
+        self.assertNotIn('description', row)
+        self.assertNotIn('image_variants', row)
+        self.assertEqual((row['brand_name'], row['chemical_name']), ('Sparsol', 'testamol'))
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.get(fields='id,nope,brand_name.first')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'fields': ["Unknown field 'nope'.", "Field 'brand_name' has no subfields."]})
+        self.assertEqual(self.get(omit='nope').status_code, 400)
+
+    def test_retrieve_loads_what_it_shows_and_checks_permissions(self):
+        path = f'/inventory/medicines/{self.medicine.pk}/'
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get(path, fields='price').data, {'price': '10.00'})
+        # only the price and the store the permission reads are loaded, not the catalog record
+        row = [query['sql'] for query in queries if 'FROM "inventory_medicine"' in query['sql']][-1]
+        self.assertNotIn('inventory_catalogmedicine', row)
+        self.assertNotIn('"inventory_medicine"."brand_name"', row)
+        self.client.force_login(create_store('Sparseother').owner.user)
+        self.assertEqual(self.get(path, fields='price').status_code, 404)
+
+    def test_writes_are_not_trimmed(self):
+        response = self.client.patch(
+            f'/inventory/medicines/{self.medicine.pk}/?fields=id', {'price': '12.00'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.data['price'], response.data['brand_name']), ('12.00', 'Sparsol'))
+
+
+# VALUES() LIST FAST PATH ===========
+class ValuesListReaderTests(TestCase):
+    """inventory.readers must render the same JSON as the serializers it stands in for."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = create_store('Reader')
+        plain = create_medicine(cls.store, 'Plainol', description=None)
+        pictured = create_medicine(cls.store, 'Pictol', description='Pain relief, with a picture.', price='12.50')
+        CatalogMedicine.objects.filter(pk=pictured.catalog_item_id).update(
+            image='medicine/images/pictol.webp',
+            image_variants={'source': 'medicine/images/pictol.webp', 'thumb': {'webp': 'medicine/images/variants/pictol_thumb.webp'}},
+        )
+        create_medicine(None, 'Strayol', description='Pain relief without a store.')
+        plain.alternative_medicines.add(pictured)
+        MedicalDevice.objects.create(store=cls.store, stock=2, price=40, manufacturer='Maker', model_number='M1', serial_number='S1')
+        MedicalDevice.objects.create(
+            store=None, stock=0, price='5.25', manufacturer='Other', model_number='M2', serial_number='S2',
+            description='Pictured', image='medicaldevice/images/m2.jpg',
+        )
+
+    def request(self, params=''):
+        return Request(APIRequestFactory().get(f'/inventory/medicines/{params}'))
+
+    def assertSameJSON(self, serializer_class, queryset, request):
+        context = {'request': request}
+        expected = JSONRenderer().render(serializer_class(queryset, many=True, context=context).data)
+        reader = ValuesListReader(serializer_class(context=context), queryset)
+        self.assertEqual(JSONRenderer().render(reader.to_representation(reader.values(queryset))).decode(), expected.decode())
+
+    def test_medicines(self):
+        queryset = Medicine.objects.select_related('store', 'catalog_item').filter(brand_name__in=['Plainol', 'Pictol', 'Strayol']).order_by('id')
+        self.assertSameJSON(MedicineSerializer, queryset, self.request())
+        self.assertSameJSON(MedicineSerializer, queryset, self.request('?fields=id,store,image,image_variants,alternative_medicines'))
+        self.assertSameJSON(MedicineSerializer, queryset, self.request('?omit=description,image'))
+
+    def test_ranked_medicines(self):
+        request = self.request('?q=pain')
+        queryset = MedicineFullTextFilter().filter_queryset(
+            request, Medicine.objects.filter(brand_name__in=['Plainol', 'Pictol', 'Strayol']), None,
+        )
+        self.assertEqual(queryset.count(), 2)
+        self.assertSameJSON(MedicineSerializer, queryset, request)
+
+    def test_devices(self):
+        queryset = MedicalDevice.objects.filter(model_number__in=['M1', 'M2']).order_by('id')
+        self.assertSameJSON(MedicalDeviceSerializer, queryset, self.request())
+
+    def test_list_endpoint(self):
+        self.client.force_login(self.store.owner.user)
+        for params in ({}, {'fields': 'id,brand_name,image_variants'}, {'pagination': 'cursor'}):
+            with self.subTest(params=params):
+                fast = self.client.get('/inventory/medicines/', params)
+                with mock.patch.object(MedicineViewSet, 'values_list_enabled', False):
+                    slow = self.client.get('/inventory/medicines/', params)
+                self.assertEqual(fast.status_code, 200)
+                self.assertEqual(fast.content.decode(), slow.content.decode())
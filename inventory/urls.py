@@ -1,9 +1,10 @@
 from rest_framework.routers import DefaultRouter
-from .views import MedicalDeviceViewSet, MedicineViewSet
+from .views import InventoryChangeViewSet, MedicalDeviceViewSet, MedicineViewSet
 
 
 router = DefaultRouter()
 router.register(r'medicines', MedicineViewSet, basename='medicine')
 router.register(r'devices', MedicalDeviceViewSet, basename='device')
+router.register(r'changes', InventoryChangeViewSet, basename='inventory-change')
 
 urlpatterns = router.urls
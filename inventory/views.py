@@ -1,33 +1,127 @@
 from rest_framework import viewsets, filters, generics
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import MedicalDevice, Medicine
-from .serializers import MedicalDeviceSerializer, MedicineSerializer
+from .models import ArchivedMedicine, InventoryChange, MedicalDevice, Medicine, MedicineLetterCount, MedicinePriceSummary
+from .serializers import (
+    ArchivedMedicineSerializer, BulkStockAdjustmentSerializer, MedicalDeviceSerializer, MedicinePriceSummarySerializer,
+    MedicineSerializer,
+)
 from .permissions import IsPharmacistOwnerOrAdmin, IsAdminOrReadOnly
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.pagination import PageNumberPagination
+from .pagination import KeysetPagination
+from .readers import ValuesListMixin
+from .sparse import SparseFieldsViewMixin
+from django.db.models import F
 from django.db.models.functions import Lower
-from .filters import MedicineFilter
+from .filters import MedicineFilter, MedicineFullTextFilter
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import FormParser, MultiPartParser
+from django.http import StreamingHttpResponse
+from medical_stores.models import MedicalStore
+from .cache import CachedClientListingMixin, ConditionalGetMixin
+from .bulk import bulk_adjust_stock, import_medicines, iter_export_chunks, iter_upload_rows
+from .alternatives import alternatives_for
+from .archive import load_rows, restore_medicines, with_archive
+from .changes import CHANGES_PAGE_SIZE, MAX_CHANGES_PAGE_SIZE, load_objects, read_changes
+from .autocomplete import MAX_SUGGESTIONS, suggest
+from .facets import letter_facets
+from .search import DEFAULT_SIMILARITY_THRESHOLD, similarity_threshold, trigram_search
+
+# file extensions accepted as NDJSON by the bulk import and export
+IMPORT_FORMAT_ALIASES = {'jsonl': 'ndjson'}
+EXPORT_CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+
+
+# Store the bulk endpoints read and write; ownership is checked once for the whole batch
+def get_owned_store(user, store_id):
+    try:
+        store_id = int(store_id)
+    except (TypeError, ValueError):
+        raise ValidationError({"store": "store is required and must be an integer."})
+    store = generics.get_object_or_404(MedicalStore.objects.select_related('owner'), pk=store_id)
+    if not (user.is_staff or user.is_superuser or getattr(user, 'role', None) == 'admin'):
+        if store.owner.user_id != user.id:
+            raise PermissionDenied('You can only manage products of your own store.')
+    return store
+
+
+class StoreExportMixin:
+    """
+    GET <list>/export/?store=<id>&file_format=csv|ndjson[&include_deleted=true]
+    streams a whole store's inventory, `export_fields` maps the columns to lookups.
+    """
+    export_fields = None
+    export_name = None
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream all of a store's rows as CSV or NDJSON"""
+        file_format = request.query_params.get('file_format', 'csv').lower()
+        file_format = IMPORT_FORMAT_ALIASES.get(file_format, file_format)
+        if file_format not in EXPORT_CONTENT_TYPES:
+            return Response({"detail": "Unsupported file_format. Use csv or ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+
+        store = get_owned_store(request.user, request.query_params.get('store'))
+        queryset = self.get_serializer_class().Meta.model.objects.filter(store=store)
+        if 'is_deleted' in self.export_fields and request.query_params.get('include_deleted') != 'true':
+            queryset = queryset.filter(is_deleted=False)
+
+        response = StreamingHttpResponse(
+            iter_export_chunks(queryset, self.export_fields, file_format),
+            content_type=EXPORT_CONTENT_TYPES[file_format],
+        )
+        filename = f'store-{store.id}-{self.export_name}.{file_format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
 
 # [SARA]: Custom pagination class with default 12 per page
 class DefaultPagination(PageNumberPagination):
     page_size = 12
     page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    # ?pagination=cursor switches to keyset pages (no COUNT/OFFSET); page numbers stay the default
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        wants_keyset = request.query_params.get('pagination') == 'cursor' or KeysetPagination.cursor_query_param in request.query_params
+        # a UNION (the deleted listings read the archive too) cannot be filtered past a cursor
+        if wants_keyset and not getattr(queryset.query, 'combinator', None):
+            self.keyset = KeysetPagination(self.get_page_size(request))
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
 
 # ============================
 # 🩺 MEDICAL DEVICE VIEWSET
 # ============================
-class MedicalDeviceViewSet(viewsets.ModelViewSet):
+class MedicalDeviceViewSet(ConditionalGetMixin, StoreExportMixin, SparseFieldsViewMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = MedicalDeviceSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly | IsPharmacistOwnerOrAdmin]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
-    search_fields = ['^name', '^brand', '^device_type']  # Use ^ for starts-with filtering
-    ordering_fields = ['name', 'brand', 'price', 'stock']  # Fields allowed for sorting
-    ordering = ['name']  # Default ordering
+    # MedicalDevice has no name/brand/device_type columns, search and sort on the ones it has
+    search_fields = ['^manufacturer', '^model_number', '^serial_number']  # Use ^ for starts-with filtering
+    ordering_fields = ['manufacturer', 'model_number', 'price', 'stock']  # Fields allowed for sorting
+    ordering = [Lower('manufacturer')]  # Default ordering
     pagination_class = DefaultPagination  # [SARA]: Match frontend itemsPerPage
+    # sort keys for ?pagination=cursor, each backed by a (key, id) index
+    keyset_orderings = {'manufacturer': Lower('manufacturer'), 'price': F('price'), 'stock': F('stock')}
+    keyset_default_ordering = 'manufacturer'
     filterset_class = None  # No extra filters yet for devices
+    export_name = 'devices'
+    export_fields = {
+        field: field for field in ['id', 'manufacturer', 'model_number', 'serial_number', 'description', 'price', 'stock']
+    }
+    # IsPharmacistOwnerOrAdmin reads the store of the object
+    sparse_required_fields = ['store']
 
     # [SARA]: Custom queryset based on user role
     def get_queryset(self):
@@ -46,9 +140,6 @@ class MedicalDeviceViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         user = self.request.user
-        # [SENU]:DEBUG
-        print("Creating Medical Device:")
-        print(f"User: {user}")
         # [SARA]: Only allow creating for pharmacist's own store
         if user.role == 'pharmacist':
             store = serializer.validated_data.get('store')
@@ -76,20 +167,45 @@ class MedicalDeviceViewSet(viewsets.ModelViewSet):
 # ====================
 # 💊 MEDICINE VIEWSET
 # ====================
-class MedicineViewSet(viewsets.ModelViewSet):
+# ConditionalGetMixin goes first so a 304 skips the listing cache too
+class MedicineViewSet(
+    ConditionalGetMixin, CachedClientListingMixin, StoreExportMixin, SparseFieldsViewMixin, ValuesListMixin, viewsets.ModelViewSet
+):
     serializer_class = MedicineSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly | IsPharmacistOwnerOrAdmin]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
-    search_fields = ['^brand_name', '^generic_name', '^chemical_name']  # Use ^ for starts-with filtering
+    # MedicineFullTextFilter goes after OrderingFilter so ?q= results stay ranked by relevance
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend, MedicineFullTextFilter]
+    search_fields = ['^brand_name', '^generic_name', '^catalog_item__chemical_name']  # Use ^ for starts-with filtering
     ordering_fields = ['brand_name', 'generic_name', 'price', 'stock']  # Fields allowed for sorting
     ordering = [Lower('brand_name')]  # Default case-insensitive ordering
     pagination_class = DefaultPagination  # [SARA]: Match frontend itemsPerPage
+    # sort keys for ?pagination=cursor, each backed by a (key, id) index
+    keyset_orderings = {
+        'brand_name': Lower('brand_name'),
+        'generic_name': Lower('generic_name'),
+        'price': F('price'),
+        'stock': F('stock'),
+    }
+    keyset_default_ordering = 'brand_name'
     filterset_class = MedicineFilter  # [SARA]: Allow filtering by brand_startswith (for A–Z)
+    # client listings are served from the versioned cache, ?store_id= scopes it to one store
+    listing_cache_namespace = 'medicine'
+    listing_store_param = 'store_id'
+    # same columns as the bulk import takes, plus id and is_deleted
+    export_name = 'medicines'
+    export_fields = {
+        'id': 'id', 'brand_name': 'brand_name', 'generic_name': 'generic_name',
+        'chemical_name': 'catalog_item__chemical_name', 'description': 'catalog_item__description',
+        'atc_code': 'catalog_item__atc_code', 'cas_number': 'catalog_item__cas_number',
+        'price': 'price', 'stock': 'stock', 'is_deleted': 'is_deleted',
+    }
+    # IsPharmacistOwnerOrAdmin reads the store of the object
+    sparse_required_fields = ['store']
 
     def get_queryset(self):
         user = self.request.user
         # [SENU]: Filter out soft-deleted medicines by default
-        queryset = Medicine.objects.select_related('store').filter(is_deleted=False)
+        queryset = Medicine.objects.select_related('store', 'catalog_item').filter(is_deleted=False)
         # [SARA]: Admin can see all, pharmacist sees own, client sees all (read-only)
         if user.is_staff or user.is_superuser or getattr(user, 'role', None) == 'admin':
             return queryset
@@ -106,7 +222,7 @@ class MedicineViewSet(viewsets.ModelViewSet):
         Override to allow accessing soft-deleted medicines for update actions.
         """
         user = self.request.user
-        queryset = Medicine.objects.select_related('store')
+        queryset = Medicine.objects.select_related('store', 'catalog_item')
         # For update actions, allow pharmacists to access soft-deleted medicines in their store
         if self.action == 'update' or self.action == 'partial_update':
             if user.role == 'pharmacist':
@@ -121,20 +237,15 @@ class MedicineViewSet(viewsets.ModelViewSet):
             elif not (user.is_staff or user.is_superuser or getattr(user, 'role', None) == 'admin'):
                 queryset = Medicine.objects.none()
 
-        obj = generics.get_object_or_404(queryset, pk=self.kwargs.get('pk'))
+        obj = generics.get_object_or_404(self.sparse_queryset(queryset), pk=self.kwargs.get('pk'))
         self.check_object_permissions(self.request, obj)
         return obj
 
     def perform_create(self, serializer):
         user = self.request.user
-        # [SENU]:DEBUG
-        print(f"Create Medicine - User: {user}")
-        print(f"Serializer Data: {serializer.validated_data}")
         # [SARA]: Only allow creating for pharmacist's own store
         if user.role == 'pharmacist':
             store = serializer.validated_data.get('store')
-            # [SENU]:DEBUG
-            print(f"Store: {store}")
             if not store or store.owner.user != user:
                 raise PermissionError('You can only add medicines to your own store.')
         serializer.save()
@@ -146,8 +257,6 @@ class MedicineViewSet(viewsets.ModelViewSet):
             store = serializer.validated_data.get('store', getattr(self.get_object(), 'store', None))
             if not store or store.owner.user != user:
                 raise PermissionError('You can only update medicines in your own store.')
-        # [SENU]:DEBUG
-        print(f"Updating Medicine - User: {user}, Data: {serializer.validated_data}")
         serializer.save()
 
     def perform_destroy(self, instance):
@@ -161,75 +270,265 @@ class MedicineViewSet(viewsets.ModelViewSet):
         instance.stock = 0
         instance.save()
 
-    # FOR ADMIN YA SARAAAAAAAAAAAAAAAAAAA
-    # [SENU]: Endpoint to retrieve soft-deleted medicines
-    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
-    def deleted(self, request):
-        """Endpoint to retrieve all soft-deleted medicines"""
-        print("DEBUG: Reached deleted endpoint")  # [SENU]: Debug
-        queryset = Medicine.objects.select_related('store').filter(is_deleted=True)
-        print(f"DEBUG: Queryset count: {queryset.count()}")  # [SENU]: Debug
-        
+    # Search box suggestions from the in-memory name index: /inventory/medicines/autocomplete/?q=pan
+    @action(detail=False, methods=['get'], pagination_class=None, filter_backends=[])
+    def autocomplete(self, request):
+        """Most stocked brand, generic and chemical names starting with q"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"detail": "q parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({"detail": "Invalid limit. It must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= limit <= MAX_SUGGESTIONS:
+            return Response({"detail": f"limit must be between 1 and {MAX_SUGGESTIONS}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response([{'name': name, 'count': count} for name, count in suggest(query, limit)])
+
+    # Counts for the A–Z letter bar, from the trigger maintained MedicineLetterCount rows
+    @action(detail=False, methods=['get'], pagination_class=None, filter_backends=[])
+    def facets(self, request):
+        """Live medicines per first letter of the brand name and per store, and how many are in stock"""
+        user = request.user
+        counts = MedicineLetterCount.objects.all()
+        # same visibility as get_queryset
+        if user.is_staff or user.is_superuser or getattr(user, 'role', None) == 'admin':
+            pass
+        elif user.role == 'pharmacist':
+            counts = counts.filter(store__owner__user=user)
+        elif user.role == 'client':
+            counts = counts.filter(store__owner__license_status='approved')
+        else:
+            counts = counts.none()
+
+        store_id = request.query_params.get('store_id')
+        if store_id:
+            try:
+                counts = counts.filter(store_id=int(store_id))
+            except ValueError:
+                return Response({"detail": "Invalid store_id."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(letter_facets(counts))
+
+    # Fuzzy search backed by the pg_trgm GIN indexes: /inventory/medicines/search/?q=panadl
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Typo tolerant medicine search ranked by name similarity"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"detail": "q parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        threshold = request.query_params.get('threshold', DEFAULT_SIMILARITY_THRESHOLD)
+        try:
+            threshold = float(threshold)
+        except (TypeError, ValueError):
+            return Response({"detail": "Invalid threshold. It must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < threshold <= 1:
+            return Response({"detail": "threshold must be between 0 and 1."}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = DjangoFilterBackend().filter_queryset(request, self.get_queryset(), self)
+        queryset = trigram_search(queryset, query)
+
+        # The threshold only applies inside this transaction, so evaluate the page here
+        with similarity_threshold(threshold):
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+
+            serializer = self.get_serializer(queryset, many=True)
+            return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def alternatives(self, request, pk=None):
+        """In-stock substitutes from approved stores, same generic name first, then cheapest"""
+        medicine = self.get_object()
+        queryset = alternatives_for(medicine)
+
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
-        
+
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], url_path='price-comparison')
+    def price_comparison(self, request):
+        """Min/median/max price and the cheapest approved stores for a generic name"""
+        generic = request.query_params.get('generic', '').strip().lower()
+        if not generic:
+            return Response({"detail": "generic parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        summary = generics.get_object_or_404(MedicinePriceSummary, generic_key=generic)
+        stores = {
+            store['id']: store
+            for store in MedicalStore.objects.filter(id__in=summary.cheapest_store_ids).values(
+                'id', 'store_name', 'store_address', 'phone', 'latitude', 'longitude',
+            )
+        }
+        serializer = MedicinePriceSummarySerializer(summary, context={'request': request, 'stores': stores})
+        return Response(serializer.data)
+
+    # Onboarding a store in one request: POST /inventory/medicines/bulk-import/ (multipart: store, file)
+    @action(detail=False, methods=['post'], url_path='bulk-import', parser_classes=[MultiPartParser, FormParser])
+    def bulk_import(self, request):
+        """Create or update a store's medicines from a streamed CSV or NDJSON upload"""
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({"detail": "file is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_format = (request.data.get('file_format') or upload.name.rsplit('.', 1)[-1]).lower()
+        file_format = IMPORT_FORMAT_ALIASES.get(file_format, file_format)
+        if file_format not in ('csv', 'ndjson'):
+            return Response({"detail": "Unsupported file_format. Use csv or ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+
+        store = get_owned_store(request.user, request.data.get('store'))
+        summary = import_medicines(store, iter_upload_rows(upload, file_format))
+        return Response(summary, status=status.HTTP_200_OK)
+
+    # POS restock sync: POST /inventory/medicines/bulk-stock/ {"store": 1, "items": [{"id": 5, "delta": -2}, {"id": 6, "absolute": 40}]}
+    @action(detail=False, methods=['post'], url_path='bulk-stock')
+    def bulk_stock(self, request):
+        """Adjust the stock of many medicines of one store in a single UPDATE"""
+        serializer = BulkStockAdjustmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        store = get_owned_store(request.user, serializer.validated_data['store'])
+        result = bulk_adjust_stock(store, serializer.validated_data['items'])
+        return Response(result, status=status.HTTP_200_OK)
+
+    # FOR ADMIN YA SARAAAAAAAAAAAAAAAAAAA
+    # [SENU]: Endpoint to retrieve soft-deleted medicines
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def deleted(self, request):
+        """Endpoint to retrieve all soft-deleted medicines"""
+        queryset = with_archive(Medicine.objects.filter(is_deleted=True), ArchivedMedicine.objects.all())
+        return self._deleted_response(queryset)
+
     # FOR THE PHARAMACIST TO GET THE DATA OF THE DELETED MEDICINE FOR HIS STORE
     # [SENU]: New endpoint to retrieve soft-deleted medicines for a specific store
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def deleted_by_store(self, request):
         """Endpoint to retrieve soft-deleted medicines for a specific store"""
         store_id = request.query_params.get('store_id')
-        print(f"DEBUG: Reached deleted_by_store endpoint, store_id: {store_id}")  # [SENU]: Debug
-        queryset = Medicine.objects.select_related('store').filter(is_deleted=True).order_by(Lower('brand_name'))
+        queryset = Medicine.objects.filter(is_deleted=True)
+        archived = ArchivedMedicine.objects.all()
         
         if store_id:
             try:
                 store_id = int(store_id)
-                queryset = queryset.filter(store__id=store_id)
-                print(f"DEBUG: Filtered by store_id={store_id}, count: {queryset.count()}")  # [SENU]: Debug
+                queryset = with_archive(queryset.filter(store__id=store_id), archived.filter(store__id=store_id),
+                                        ordering=('sort_name', 'id'))
             except ValueError:
                 return Response({"detail": "Invalid store_id. It must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
         else:
             return Response({"detail": "store_id parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
         
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self._deleted_response(queryset)
 
     # [NEW ENDPOINT] FOR ARCHIVED AND OUT-OF-STOCK MEDICINES
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def archived_out_of_stock(self, request):
         """Endpoint to retrieve medicines that are both archived (is_deleted=True) AND out of stock (stock=0)"""
         store_id = request.query_params.get('store_id')
-        print(f"DEBUG: Reached archived_out_of_stock endpoint, store_id: {store_id}")  # [SENU]: Debug
         
         # Filter for both conditions
-        queryset = Medicine.objects.select_related('store').filter(
+        queryset = Medicine.objects.filter(
             is_deleted=True,
             stock=0
         )
+        archived = ArchivedMedicine.objects.filter(stock=0)
         
         if store_id:
             try:
                 store_id = int(store_id)
                 queryset = queryset.filter(store__id=store_id)
-                print(f"DEBUG: Filtered by store_id={store_id}, count: {queryset.count()}")  # [SENU]: Debug
+                archived = archived.filter(store__id=store_id)
             except ValueError:
                 return Response({"detail": "Invalid store_id. It must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
         
-        page = self.paginate_queryset(queryset)
+        return self._deleted_response(with_archive(queryset, archived))
+
+    # THE ARCHIVE (COLD TIER) ===========
+    # [soft-deleted rows older than inventory.archive.ARCHIVE_AFTER live in ArchivedMedicine,
+    #  the deleted listings above page over both tables]
+    def _deleted_response(self, rows):
+        context = self.get_serializer_context()
+
+        def serialize(instances):
+            return [
+                (ArchivedMedicineSerializer if isinstance(instance, ArchivedMedicine) else MedicineSerializer)(
+                    instance, context=context).data
+                for instance in load_rows(instances)
+            ]
+
+        page = self.paginate_queryset(rows)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+            return self.get_paginated_response(serialize(page))
+        return Response(serialize(rows))
+
+    # {"store": 3, "ids": [12, 13]} -> the archived medicines are back in the store's inventory, still deleted
+    @action(detail=False, methods=['post'], url_path='restore-archived')
+    def restore_archived(self, request):
+        store = get_owned_store(request.user, request.data.get('store'))
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids:
+            raise ValidationError({"ids": "A non-empty list of medicine ids is required."})
+        try:
+            ids = [int(medicine_id) for medicine_id in ids]
+        except (TypeError, ValueError):
+            raise ValidationError({"ids": "Medicine ids must be integers."})
+        restored = restore_medicines(store, ids)
+        return Response({'restored': restored, 'not_found': sorted(set(ids) - set(restored))}, status=status.HTTP_200_OK)
+
+
+# ============================
+# 🔄 CHANGE FEED
+# ============================
+# [incremental sync for the apps and the POS integration: GET /inventory/changes/?since=<next>
+#  returns the medicines and devices changed since the last call, see inventory.changes]
+class InventoryChangeViewSet(viewsets.GenericViewSet):
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        changes = InventoryChange.objects.all()
+        # same visibility as the medicine and device listings
+        if user.is_staff or user.is_superuser or getattr(user, 'role', None) == 'admin':
+            return changes
+        if user.role == 'pharmacist':
+            return changes.filter(store_id__in=MedicalStore.objects.filter(owner__user=user).values('id'))
+        if user.role == 'client':
+            return changes.filter(store_id__in=MedicalStore.objects.filter(owner__license_status='approved').values('id'))
+        return changes.none()
+
+    def list(self, request):
+        changes = self.get_queryset()
+        store_id = request.query_params.get('store_id')
+        if store_id:
+            try:
+                changes = changes.filter(store_id=int(store_id))
+            except ValueError:
+                return Response({"detail": "Invalid store_id."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', CHANGES_PAGE_SIZE)), 1), MAX_CHANGES_PAGE_SIZE)
+        except ValueError:
+            return Response({"detail": "Invalid limit."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows, cursor, has_more = read_changes(changes, request.query_params.get('since'), limit)
+        objects = load_objects(rows)
+        context = self.get_serializer_context()
+        results = []
+        for row in rows:
+            change = {'kind': row['kind'], 'id': row['object_id'], 'store': row['store_id']}
+            instance = objects.get((row['kind'], row['object_id']))
+            # soft-deleted, or moved to another store since: gone from this store's listing
+            if instance is None or getattr(instance, 'is_deleted', False) or instance.store_id != row['store_id']:
+                change['op'] = 'delete'
+            else:
+                serializer_class = MedicineSerializer if row['kind'] == 'medicine' else MedicalDeviceSerializer
+                change['op'] = 'upsert'
+                change['data'] = serializer_class(instance, context=context).data
+            results.append(change)
+        # keep asking with `next` while has_more, then poll with it
+        return Response({'next': cursor, 'has_more': has_more, 'changes': results})
@@ -3,4 +3,8 @@ from .models import MedicalStore
 
 # Register your models here.
 # [SARA]: Registered MedicalStore model to appear in the admin panel
-admin.site.register(MedicalStore)
+@admin.register(MedicalStore)
+class MedicalStoreAdmin(admin.ModelAdmin):
+    def save_model(self, request, obj, form, change):
+        # only the edited columns, the rating counters move with F() updates meanwhile
+        obj.save(update_fields=form.changed_data if change else None)
@@ -1,15 +1,26 @@
 # medical_stores/filters.py
 # [SARA]: Added owner_id filter for MedicalStore API
 import django_filters
+from django.utils import timezone
+from .hours import open_at
 from .models import MedicalStore
 
 class MedicalStoreFilter(django_filters.FilterSet):
     owner_id = django_filters.NumberFilter(field_name='owner_id')  # Allow filtering by owner_id
+    # stores open now / at a moment (ISO 8601), by their OpeningHours
+    open_now = django_filters.BooleanFilter(method='filter_open_now')
+    open_at = django_filters.IsoDateTimeFilter(method='filter_open_at')
 
     class Meta:
         model = MedicalStore
         fields = ['store_name', 'store_type', 'owner_id']  # Add owner_id to filter fields
 
+    def filter_open_now(self, queryset, name, value):
+        return open_at(queryset, timezone.now()) if value else queryset
+
+    def filter_open_at(self, queryset, name, value):
+        return open_at(queryset, value)
+
 
 
 
@@ -0,0 +1,112 @@
+# medical_stores/geo.py
+import math
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+# Stores are found near a point in two steps: the geohash cells around it narrow the
+# candidates with an index range scan (MedicalStore.geohash, kept on save), then the
+# exact haversine distance is computed in SQL for those only.
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """The geohash of a point, `precision` characters long."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        # bits alternate between longitude and latitude, longitude first
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(latitude, longitude) degrees covered by a geohash cell of `precision` characters."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180 / 2 ** lat_bits, 360 / 2 ** lon_bits
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min lat, max lat, min lon, max lon) around the circle, None for longitude past a pole or 180°."""
+    angle = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angle)
+    min_lat, max_lat = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    cos_lat = math.cos(math.radians(latitude))
+    if max_lat >= 90 or min_lat <= -90 or math.sin(angle) >= cos_lat:
+        return min_lat, max_lat, None, None
+    # the widest longitude span of a circle on the sphere, a little more than angle / cos(lat)
+    dlon = math.degrees(math.asin(math.sin(angle) / cos_lat))
+    if longitude - dlon < -180 or longitude + dlon > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, longitude - dlon, longitude + dlon
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """
+    Geohash prefixes whose cells together contain the circle: the cell of the point and
+    its neighbours, at the finest precision where one cell is at least as large as the
+    radius. Empty when the circle is too large for any (no narrowing then).
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    if min_lon is None:
+        return []
+    dlat, dlon = latitude - min_lat, longitude - min_lon
+    precision = 0
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        cell_lat, cell_lon = cell_size(candidate)
+        if cell_lat >= dlat and cell_lon >= dlon:
+            precision = candidate
+            break
+    if not precision:
+        return []
+    cell_lat, cell_lon = cell_size(precision)
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        for lon_step in (-1, 0, 1):
+            lat = min(max(latitude + lat_step * cell_lat, -90.0), 90.0)
+            lon = (longitude + lon_step * cell_lon + 180) % 360 - 180
+            cells.add(encode(lat, lon, precision))
+    return sorted(cells)
+
+
+def distance_km(latitude, longitude, lat_field='latitude', lon_field='longitude'):
+    """Haversine distance in km from the point to the row's coordinates, as an SQL expression."""
+    lat1, lon1 = Radians(Value(latitude, output_field=FloatField())), Radians(Value(longitude, output_field=FloatField()))
+    lat2, lon2 = Radians(F(lat_field)), Radians(F(lon_field))
+    a = (
+        Power(Sin((lat2 - lat1) / 2), 2)
+        + Cos(lat1) * Cos(lat2) * Power(Sin((lon2 - lon1) / 2), 2)
+    )
+    # rounding can push a just past 1 for antipodal points
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(Least(a, Value(1.0))))
+
+
+def nearby(queryset, latitude, longitude, radius_km):
+    """The stores of `queryset` within `radius_km` of the point, annotated with `distance` (km)."""
+    queryset = queryset.filter(latitude__isnull=False, longitude__isnull=False)
+    cells = covering_cells(latitude, longitude, radius_km)
+    if cells:
+        prefixes = Q()
+        for cell in cells:
+            prefixes |= Q(geohash__startswith=cell)
+        queryset = queryset.filter(prefixes)
+    # the box drops most of the cells' corners before the distance is computed
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    queryset = queryset.filter(latitude__range=(min_lat, max_lat))
+    if min_lon is not None:
+        queryset = queryset.filter(longitude__range=(min_lon, max_lon))
+    return queryset.annotate(distance=distance_km(latitude, longitude)).filter(distance__lte=radius_km)
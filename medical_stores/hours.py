@@ -0,0 +1,66 @@
+# medical_stores/hours.py
+from zoneinfo import ZoneInfo
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.postgresql.psycopg_any import NumericRange
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from inventory.cache import bump_generations_on_commit
+
+# Opening hours are kept as minutes-of-week ranges (OpeningHours.minutes, GiST indexed),
+# so "open at t" is one range containment test in SQL, overnight spans included.
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def store_time_zone():
+    return ZoneInfo(settings.STORE_TIME_ZONE)
+
+
+def week_minutes(weekday, opens, closes):
+    """[start, end) minutes since Monday 00:00 of a span opening on `weekday`."""
+    start = weekday * MINUTES_PER_DAY + opens.hour * 60 + opens.minute
+    length = (closes.hour * 60 + closes.minute) - (opens.hour * 60 + opens.minute)
+    if length <= 0:
+        # past midnight, or all day when it closes when it opens
+        length += MINUTES_PER_DAY
+    return NumericRange(start, start + length)
+
+
+def minute_of_week(moment):
+    """The minute of the week of an aware datetime, in the stores' wall clock."""
+    local = timezone.localtime(moment, store_time_zone())
+    return local.weekday() * MINUTES_PER_DAY + local.hour * 60 + local.minute
+
+
+def open_at(queryset, moment):
+    """The stores of `queryset` open at `moment`."""
+    from .models import OpeningHours
+
+    minute = minute_of_week(moment)
+    # a span that started last Sunday night holds the minute a week later
+    spans = OpeningHours.objects.filter(store=OuterRef('pk')).filter(
+        Q(minutes__contains=minute) | Q(minutes__contains=minute + MINUTES_PER_WEEK)
+    )
+    return queryset.filter(Exists(spans))
+
+
+def daily_hours(start_time, end_time):
+    """[(weekday, opens, closes)] of the same hours every day."""
+    return [(weekday, start_time, end_time) for weekday in range(7)]
+
+
+def set_schedule(store, spans):
+    """Replace the weekly schedule of `store` with [(weekday, opens, closes)]."""
+    from .models import OpeningHours
+
+    with transaction.atomic():
+        store.opening_hours.all().delete()
+        OpeningHours.objects.bulk_create([
+            # bulk_create skips save(), the range is set here
+            OpeningHours(store=store, weekday=weekday, opens=opens, closes=closes,
+                         minutes=week_minutes(weekday, opens, closes))
+            for weekday, opens, closes in spans
+        ])
+        # the store payload carries its schedule
+        bump_generations_on_commit([store.pk])
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:57
+
+from django.db import migrations, models
+
+# a copy of medical_stores.geo.encode as it was when this migration was written, so
+# later changes to the app code cannot change what the migration does
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def fill_geohash(apps, schema_editor):
+    # historical models do not run MedicalStore.save()
+    MedicalStore = apps.get_model('medical_stores', 'MedicalStore')
+    stores = list(MedicalStore.objects.filter(latitude__isnull=False, longitude__isnull=False))
+    for store in stores:
+        store.geohash = encode(store.latitude, store.longitude)
+    MedicalStore.objects.bulk_update(stores, ['geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical_stores', '0008_medicalstore_phone'),
+        ('users', '0016_role_scoped_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicalstore',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='medicalstore',
+            index=models.Index(fields=['geohash'], name='store_geohash_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
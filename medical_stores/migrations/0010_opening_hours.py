@@ -0,0 +1,62 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:01
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.backends.postgresql.psycopg_any import NumericRange
+
+# copies of medical_stores.hours helpers as they were when this migration was written:
+# the app module pulls in inventory.cache (and redis), and may change later
+MINUTES_PER_DAY = 24 * 60
+
+
+def week_minutes(weekday, opens, closes):
+    start = weekday * MINUTES_PER_DAY + opens.hour * 60 + opens.minute
+    length = (closes.hour * 60 + closes.minute) - (opens.hour * 60 + opens.minute)
+    if length <= 0:
+        length += MINUTES_PER_DAY
+    return NumericRange(start, start + length)
+
+
+def daily_hours(start_time, end_time):
+    return [(weekday, start_time, end_time) for weekday in range(7)]
+
+
+def schedule_from_start_end(apps, schema_editor):
+    # the stores that set start_time/end_time open those hours every day
+    MedicalStore = apps.get_model('medical_stores', 'MedicalStore')
+    OpeningHours = apps.get_model('medical_stores', 'OpeningHours')
+    stores = MedicalStore.objects.filter(start_time__isnull=False, end_time__isnull=False)
+    OpeningHours.objects.bulk_create([
+        OpeningHours(store=store, weekday=weekday, opens=opens, closes=closes,
+                     minutes=week_minutes(weekday, opens, closes))
+        for store in stores.iterator()
+        for weekday, opens, closes in daily_hours(store.start_time, store.end_time)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical_stores', '0009_medicalstore_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('opens', models.TimeField()),
+                ('closes', models.TimeField()),
+                ('minutes', django.contrib.postgres.fields.ranges.IntegerRangeField(editable=False)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opening_hours', to='medical_stores.medicalstore')),
+            ],
+            options={
+                'ordering': ['weekday', 'opens'],
+                'indexes': [django.contrib.postgres.indexes.GistIndex(fields=['minutes'], name='opening_hours_minutes_idx')],
+            },
+        ),
+        migrations.RunPython(schedule_from_start_end, migrations.RunPython.noop),
+    ]
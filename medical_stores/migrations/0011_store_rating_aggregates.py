@@ -0,0 +1,78 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:03
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+# the counters of the reviews written so far, kept incrementally from now on
+COUNT_EXISTING_REVIEWS = """
+UPDATE medical_stores_medicalstore s
+SET rating_count = r.count, rating_sum = r.sum,
+    rating_1_count = r.r1, rating_2_count = r.r2, rating_3_count = r.r3,
+    rating_4_count = r.r4, rating_5_count = r.r5
+FROM (
+    SELECT medical_store_id, COUNT(*) AS count, SUM(rating) AS sum,
+           COUNT(*) FILTER (WHERE rating = 1) AS r1, COUNT(*) FILTER (WHERE rating = 2) AS r2,
+           COUNT(*) FILTER (WHERE rating = 3) AS r3, COUNT(*) FILTER (WHERE rating = 4) AS r4,
+           COUNT(*) FILTER (WHERE rating = 5) AS r5
+    FROM reviews_review GROUP BY medical_store_id
+) r
+WHERE r.medical_store_id = s.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical_stores', '0010_opening_hours'),
+        ('users', '0016_role_scoped_listing_indexes'),
+        ('reviews', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicalstore',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='medicalstore',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='medicalstore',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='medicalstore',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='medicalstore',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='medicalstore',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='medicalstore',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='medicalstore',
+            name='rating_average',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(rating_count=0, then=models.Value(0.0)), default=django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('rating_sum', models.FloatField()), '/', models.F('rating_count'))), output_field=models.FloatField()),
+        ),
+        migrations.AddIndex(
+            model_name='medicalstore',
+            index=models.Index(fields=['rating_average'], name='store_rating_average_idx'),
+        ),
+        migrations.RunSQL(COUNT_EXISTING_REVIEWS, migrations.RunSQL.noop),
+    ]
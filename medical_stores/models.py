@@ -1,5 +1,14 @@
+from django.contrib.postgres.fields import IntegerRangeField
+from django.contrib.postgres.indexes import GistIndex
 from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Cast
 from users.models import Pharmacist
+from .geo import encode as geohash_encode
+from .hours import week_minutes
+
+RATING_VALUES = range(1, 6)
+RATING_FIELDS = ['rating_count', 'rating_sum', *(f'rating_{rating}_count' for rating in RATING_VALUES)]
 
 #  MEDICAL STORES MODEL
 class MedicalStore(models.Model):
@@ -45,8 +54,76 @@ class MedicalStore(models.Model):
     # [OKS] add lang and lat for the store
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    # geohash of (latitude, longitude), the index /nearby/ narrows on; set in save()
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
+
+    # rating aggregates of the store's reviews, kept with F() updates by reviews.signals
+    # (rebuild_store_ratings recounts them), so listings and ?ordering=-rating_average
+    # read no reviews; rating_N_count is the histogram of N-star reviews. Store edits
+    # save with update_fields, a full save() would write back the counters it loaded
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+    # 0 without reviews, so they sort last
+    rating_average = models.GeneratedField(
+        expression=Case(
+            When(rating_count=0, then=Value(0.0)),
+            default=Cast('rating_sum', models.FloatField()) / F('rating_count'),
+        ),
+        output_field=models.FloatField(),
+        db_persist=True,
+    )
     # --print---------
 
+    class Meta:
+        indexes = [
+            # prefix (LIKE 'abc%') range scans for the cells around a point
+            models.Index(fields=['geohash'], name='store_geohash_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['rating_average'], name='store_rating_average_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        has_location = self.latitude is not None and self.longitude is not None
+        self.geohash = geohash_encode(self.latitude, self.longitude) if has_location else ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.store_name} ({self.store_type})"
 
+
+# OPENING HOURS================
+# [one row per opening span of a weekday, in STORE_TIME_ZONE wall time. closes at or
+#  before opens runs past midnight (22:00-02:00), opens == closes is open all day]
+class OpeningHours(models.Model):
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'),
+        (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday'),
+    ]
+
+    store = models.ForeignKey(MedicalStore, on_delete=models.CASCADE, related_name='opening_hours')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    opens = models.TimeField()
+    closes = models.TimeField()
+    # [start, end) in minutes since Monday 00:00, set in save(); a Sunday night span
+    # ends past the week (up to 11520), the open_at filter checks the minute a week on too
+    minutes = IntegerRangeField(editable=False)
+
+    class Meta:
+        ordering = ['weekday', 'opens']
+        indexes = [
+            GistIndex(fields=['minutes'], name='opening_hours_minutes_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.minutes = week_minutes(self.weekday, self.opens, self.closes)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.store_id} {self.get_weekday_display()} {self.opens:%H:%M}-{self.closes:%H:%M}"
@@ -0,0 +1,62 @@
+# medical_stores/products.py
+from django.db.models import Prefetch
+from django.db.models.functions import Lower
+from rest_framework.exceptions import ValidationError
+from inventory.models import MedicalDevice, Medicine
+
+# The store payload only embeds products on request: ?include_products=true (or
+# medicines / devices, comma separated), at most ?products_limit= of each per store.
+# Each kind is one prefetch query for the whole page (a sliced Prefetch, ROW_NUMBER()
+# per store), so a store list costs the same however large the inventories are.
+INCLUDE_PRODUCTS_PARAM = 'include_products'
+PRODUCTS_LIMIT_PARAM = 'products_limit'
+DEFAULT_PRODUCTS_LIMIT = 10
+MAX_PRODUCTS_LIMIT = 50
+PRODUCT_KINDS = ('medicines', 'devices')
+
+
+def included_products(request):
+    """The product kinds `request` asks to embed."""
+    params = getattr(request, 'query_params', None)
+    value = (params.get(INCLUDE_PRODUCTS_PARAM) or '').strip().lower() if params is not None else ''
+    if value in ('', 'false', '0'):
+        return set()
+    if value in ('true', '1', 'all'):
+        return set(PRODUCT_KINDS)
+    kinds = {kind.strip() for kind in value.split(',')} - {''}
+    unknown = kinds - set(PRODUCT_KINDS)
+    if unknown:
+        raise ValidationError({INCLUDE_PRODUCTS_PARAM: f"Unknown product kinds: {', '.join(sorted(unknown))}."})
+    return kinds
+
+
+def products_limit(request):
+    value = request.query_params.get(PRODUCTS_LIMIT_PARAM)
+    if value is None:
+        return DEFAULT_PRODUCTS_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValidationError({PRODUCTS_LIMIT_PARAM: "Must be an integer."})
+    if not 1 <= limit <= MAX_PRODUCTS_LIMIT:
+        raise ValidationError({PRODUCTS_LIMIT_PARAM: f"Must be between 1 and {MAX_PRODUCTS_LIMIT}."})
+    return limit
+
+
+def product_prefetches(request, kinds=PRODUCT_KINDS):
+    """The Prefetches of the embedded products `request` asks for, among `kinds`."""
+    included = included_products(request) & set(kinds)
+    if not included:
+        return []
+    limit = products_limit(request)
+    prefetches = []
+    if 'medicines' in included:
+        medicines = (
+            Medicine.objects.filter(is_deleted=False).select_related('catalog_item')
+            .prefetch_related('alternative_medicines').order_by(Lower('brand_name'), 'id')
+        )
+        prefetches.append(Prefetch('medicine_set', medicines[:limit], to_attr='embedded_medicines'))
+    if 'devices' in included:
+        devices = MedicalDevice.objects.order_by(Lower('manufacturer'), 'id')
+        prefetches.append(Prefetch('medicaldevice_set', devices[:limit], to_attr='embedded_devices'))
+    return prefetches
@@ -1,31 +1,53 @@
 from rest_framework import serializers
-from .models import MedicalStore
+from .models import MedicalStore, OpeningHours
 from inventory.serializers import MedicineSerializer, MedicalDeviceSerializer
+from inventory.sparse import SparseFieldsMixin
+from .products import included_products
+
+# OPENING HOURS SERIALIZER
+class OpeningHoursSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OpeningHours
+        fields = ['weekday', 'opens', 'closes']
 
 # MEDICAL STORE SERIALIZER
-class MedicalStoreSerializer(serializers.ModelSerializer):
+class MedicalStoreSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     #[OKS] add medicine to the serializer
-    medicines = MedicineSerializer(many=True, read_only=True, source='medicine_set')
+    # only with ?include_products=, a bounded batch prefetched by the view (see products.py)
+    medicines = MedicineSerializer(many=True, read_only=True, source='embedded_medicines')
+    devices = MedicalDeviceSerializer(many=True, read_only=True, source='embedded_devices')
+    # the weekly schedule, set with /opening-hours/ (or start_time/end_time for every day)
+    opening_hours = OpeningHoursSerializer(many=True, read_only=True)
+    # km from the searched point, only present on /nearby/
+    distance = serializers.FloatField(read_only=True)
+
+    # the embedded product lists left out unless the request includes them
+    optional_product_fields = ('medicines', 'devices')
 
     class Meta:
         model = MedicalStore
         fields = '__all__'
 
-     
-    # [SENU] TO GET MEDCIINES IN CASE YOU NEED IT
-    def get_medicines(self, obj):
-        request = self.context.get('request')
-        matched_medicines = self.context.get('matched_medicines', {})
+    def get_fields(self):
+        fields = super().get_fields()
+        included = included_products(self.context.get('request'))
+        for name in self.optional_product_fields:
+            if name not in included:
+                fields.pop(name, None)
+        return fields
+
+    def update(self, instance, validated_data):
+        # only the edited columns, the rating counters move with F() updates meanwhile
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
 
-        # If store has matched medicines from the view
-        if obj.id in matched_medicines:
-            medicines = matched_medicines[obj.id]
-            return MedicineSerializer(medicines, many=True, context={'request': request}).data
-        return []
-    # [SENU] TO GET MEDICAL DEVICES IN CASE YOU NEED IT
-    def get_medical_devices(self, obj):
-        request = self.context.get('request')
-        if request and request.query_params.get('include_products') == 'true':
-            return MedicalDeviceSerializer(obj.medical_devices.all(), many=True).data
-        return None
-    
\ No newline at end of file
+# STORES WITH A MEDICINE
+# [/with-medicine/: the store with only its in-stock matches, prefetched by the view]
+class StoreMedicineMatchSerializer(MedicalStoreSerializer):
+    medicines = MedicineSerializer(many=True, read_only=True, source='matched_medicines')
+    # the matches are always there, devices stay opt-in
+    optional_product_fields = ('devices',)
+    # lowest price among the matches
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
@@ -1,3 +1,265 @@
-from django.test import TestCase
+from datetime import datetime, time
+from zoneinfo import ZoneInfo
+from django.contrib import admin
+from django.forms.models import model_to_dict
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from inventory.models import CatalogMedicine, MedicalDevice, Medicine
+from users.models import Pharmacist, User
+from .admin import MedicalStoreAdmin
+from .geo import encode
+from .hours import set_schedule
+from .models import MedicalStore
+from .serializers import MedicalStoreSerializer
 
-# Create your tests here.
+
+def create_store(name, license_status='approved', **fields):
+    user = User.objects.create(email=f'{name.lower()}@example.com', name=name, role='pharmacist')
+    return MedicalStore.objects.create(
+        owner=Pharmacist.objects.create(user=user, license_status=license_status),
+        store_name=name, store_type='pharmacy', **fields,
+    )
+
+
+def create_medicine(store, brand_name, generic_name, **fields):
+    item, _ = CatalogMedicine.objects.get_or_create(
+        brand_name=brand_name, generic_name=generic_name,
+        defaults={'chemical_name': generic_name.lower(), 'atc_code': 'N02BE01', 'cas_number': '103-90-2'},
+    )
+    fields.setdefault('price', 10)
+    fields.setdefault('stock', 5)
+    return Medicine.objects.create(store=store, catalog_item=item, brand_name=brand_name, generic_name=generic_name, **fields)
+
+
+# STORE SAVE ===========
+class StoreSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(email='store-save@example.com', name='store save', role='pharmacist')
+        cls.owner = Pharmacist.objects.create(user=user, license_status='approved')
+
+    def setUp(self):
+        self.store = MedicalStore.objects.create(owner=self.owner, store_name='Saved', store_type='pharmacy', latitude=30.0, longitude=31.2)
+
+    def stale_copy(self):
+        # loaded, then a review moves the counters before the edit is saved
+        stale = MedicalStore.objects.get(pk=self.store.pk)
+        MedicalStore.objects.filter(pk=self.store.pk).update(rating_count=2, rating_sum=9, rating_4_count=1, rating_5_count=1)
+        return stale
+
+    def assertRenamedWithCounters(self):
+        self.store.refresh_from_db()
+        self.assertEqual(self.store.store_name, 'Renamed')
+        self.assertEqual((self.store.rating_count, self.store.rating_sum, self.store.rating_average), (2, 9, 4.5))
+
+    def test_api_edit_keeps_the_rating_counters_moved_meanwhile(self):
+        serializer = MedicalStoreSerializer(self.stale_copy(), data={'store_name': 'Renamed'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.assertRenamedWithCounters()
+
+    def test_admin_edit_keeps_the_rating_counters_moved_meanwhile(self):
+        stale = self.stale_copy()
+        request = RequestFactory().post('/')
+        request.user = User(is_staff=True, is_superuser=True)
+        model_admin = MedicalStoreAdmin(MedicalStore, admin.site)
+        form_class = model_admin.get_form(request, stale)
+        data = {**model_to_dict(stale, fields=form_class.base_fields), 'store_name': 'Renamed'}
+        form = form_class({key: value for key, value in data.items() if value is not None}, instance=stale)
+        self.assertTrue(form.is_valid(), form.errors)
+        model_admin.save_model(request, form.save(commit=False), form, change=True)
+        self.assertRenamedWithCounters()
+
+    def test_deferred_fields_are_not_written(self):
+        store = MedicalStore.objects.only('id', 'store_name', 'latitude', 'longitude').get(pk=self.store.pk)
+        MedicalStore.objects.filter(pk=self.store.pk).update(store_type='clinic')
+        store.store_name = 'Renamed'
+        with self.assertNumQueries(1):
+            store.save()
+        self.store.refresh_from_db()
+        self.assertEqual((self.store.store_name, self.store.store_type), ('Renamed', 'clinic'))
+
+    def test_save_of_a_removed_row_inserts_it_again(self):
+        MedicalStore.objects.filter(pk=self.store.pk).delete()
+        self.store.save()
+        self.assertTrue(MedicalStore.objects.filter(pk=self.store.pk).exists())
+
+    def test_geohash_follows_the_location(self):
+        self.store.latitude, self.store.longitude = 31.2, 29.9
+        self.store.save(update_fields=['latitude', 'longitude'])
+        self.store.refresh_from_db()
+        self.assertEqual(self.store.geohash, encode(31.2, 29.9))
+
+
+# STORES WITH A MEDICINE ===========
+class StoresWithMedicineTests(TestCase):
+    """/medical_stores/with-medicine/: stores with the medicine in stock, each with only its matches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        near = create_store('Withnear', latitude=30.0, longitude=31.2)
+        create_medicine(near, 'Withol', 'Withamol', price=5)
+        create_medicine(near, 'Withex', 'Withamol', price=3)
+        create_medicine(near, 'Unrelated', 'Otheramol', price=1)
+        far = create_store('Withfar', latitude=30.5, longitude=31.2)
+        create_medicine(far, 'WITHAMOL', 'Generic', price=2)
+        create_medicine(create_store('Withnowhere'), 'Withol', 'Withamol', price=9)
+        # never listed: sold out, deleted, or a store that is not approved
+        create_medicine(create_store('Withsoldout', latitude=30.0, longitude=31.2), 'Withol', 'Withamol', price=1, stock=0)
+        create_medicine(create_store('Withdeleted'), 'Withol', 'Withamol', price=1, is_deleted=True)
+        create_medicine(create_store('Withpending', 'pending'), 'Withol', 'Withamol', price=1)
+        cls.buyer = User.objects.create(email='with-buyer@example.com', name='buyer', role='client')
+
+    def setUp(self):
+        self.client.force_login(self.buyer)
+
+    def get(self, **params):
+        return self.client.get('/medical_stores/with-medicine/', {'medicine_name': ' withamol ', **params})
+
+    def stores(self, **params):
+        response = self.get(**params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [store['store_name'] for store in response.data['results']]
+
+    def test_only_the_in_stock_matches_are_embedded(self):
+        near = self.get().data['results'][1]
+        self.assertEqual(near['store_name'], 'Withnear')
+        self.assertEqual(near['min_price'], '3.00')
+        self.assertEqual([medicine['brand_name'] for medicine in near['medicines']], ['Withex', 'Withol'])
+        self.assertNotIn('devices', near)
+
+    def test_price_ordering(self):
+        self.assertEqual(self.stores(), ['Withfar', 'Withnear', 'Withnowhere'])
+        self.assertEqual(self.stores(ordering='-price'), ['Withnowhere', 'Withnear', 'Withfar'])
+
+    def test_distance_ordering_puts_stores_without_location_last(self):
+        self.assertEqual(self.stores(ordering='distance', lat=30.0, lon=31.2), ['Withnear', 'Withfar', 'Withnowhere'])
+        self.assertEqual(self.stores(ordering='distance', lat=30.6, lon=31.2), ['Withfar', 'Withnear', 'Withnowhere'])
+
+    def test_bad_requests(self):
+        for params in ({'medicine_name': ''}, {'ordering': 'name'}, {'ordering': 'distance'}, {'ordering': 'distance', 'lat': 'x', 'lon': 1}):
+            with self.subTest(params=params):
+                self.assertEqual(self.get(**params).status_code, 400)
+
+
+# EMBEDDED PRODUCTS ===========
+class StoreProductEmbeddingTests(TestCase):
+    """?include_products= / ?products_limit= on the store payload (medical_stores.products)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.big, cls.small = create_store('Embedbig'), create_store('Embedsmall')
+        for number in range(12, 0, -1):
+            create_medicine(cls.big, f'embed{number:02}', 'Embedamol')
+        create_medicine(cls.big, 'Embed00', 'Embedamol', is_deleted=True)
+        create_medicine(cls.small, 'Embedsolo', 'Embedamol')
+        MedicalDevice.objects.create(store=cls.big, stock=1, price=5, manufacturer='Embedmaker', model_number='E1', serial_number='S1')
+        cls.buyer = User.objects.create(email='embed-buyer@example.com', name='buyer', role='client')
+
+    def setUp(self):
+        self.client.force_login(self.buyer)
+
+    def get(self, search='Embed', **params):
+        return self.client.get('/medical_stores/', {'search': search, **params})
+
+    def stores(self, **params):
+        response = self.get(**params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return {store['store_name']: store for store in response.data['results']}
+
+    def test_products_are_left_out_by_default(self):
+        for store in self.stores().values():
+            self.assertNotIn('medicines', store)
+            self.assertNotIn('devices', store)
+
+    def test_embedded_products_are_bounded_per_store(self):
+        stores = self.stores(include_products='medicines', products_limit=3)
+        self.assertEqual([medicine['brand_name'] for medicine in stores['Embedbig']['medicines']], ['embed01', 'embed02', 'embed03'])
+        self.assertEqual([medicine['brand_name'] for medicine in stores['Embedsmall']['medicines']], ['Embedsolo'])
+        self.assertNotIn('devices', stores['Embedbig'])
+
+        stores = self.stores(include_products='true')
+        self.assertEqual(len(stores['Embedbig']['medicines']), 10)
+        self.assertEqual([device['model_number'] for device in stores['Embedbig']['devices']], ['E1'])
+
+    def test_queries_do_not_grow_with_the_stores(self):
+        counts = []
+        for search in ('Embedbig', 'Embed'):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.get(search, include_products='true').status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_bad_parameters(self):
+        for params in (
+            {'include_products': 'medicines,pills'}, {'include_products': 'true', 'products_limit': 0},
+            {'include_products': 'true', 'products_limit': 51}, {'include_products': 'true', 'products_limit': 'x'},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.get(**params).status_code, 400)
+
+
+# OPENING HOURS ===========
+@override_settings(STORE_TIME_ZONE='Africa/Cairo')
+class OpeningHoursTests(TestCase):
+    """?open_at= / ?open_now= by the minutes-of-week ranges of OpeningHours (medical_stores.hours)."""
+    CAIRO = ZoneInfo('Africa/Cairo')
+
+    @classmethod
+    def setUpTestData(cls):
+        # Friday 22:00 to Saturday 02:00, Sunday night into Monday, all of Wednesday
+        set_schedule(create_store('Hoursnight'), [(4, time(22), time(2))])
+        set_schedule(create_store('Hourssunday'), [(6, time(22), time(3))])
+        set_schedule(create_store('Hoursallday'), [(2, time(0), time(0))])
+        cls.buyer = User.objects.create(email='hours-buyer@example.com', name='buyer', role='client')
+
+    def setUp(self):
+        self.client.force_login(self.buyer)
+
+    def open_at(self, *local):
+        # week of Monday 2026-10-12, in the stores' wall clock
+        moment = datetime(2026, 10, *local, tzinfo=self.CAIRO)
+        response = self.client.get('/medical_stores/', {'search': 'Hours', 'open_at': moment.isoformat()})
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(store['store_name'] for store in response.data['results'])
+
+    def test_spans_past_midnight(self):
+        self.assertEqual(self.open_at(16, 21, 59), [])
+        self.assertEqual(self.open_at(16, 23, 30), ['Hoursnight'])
+        self.assertEqual(self.open_at(17, 1, 59), ['Hoursnight'])
+        self.assertEqual(self.open_at(17, 2, 0), [])
+
+    def test_sunday_night_runs_into_monday(self):
+        self.assertEqual(self.open_at(18, 23, 0), ['Hourssunday'])
+        self.assertEqual(self.open_at(19, 2, 59), ['Hourssunday'])
+        self.assertEqual(self.open_at(12, 2, 59), ['Hourssunday'])
+        self.assertEqual(self.open_at(19, 3, 0), [])
+
+    def test_open_all_day(self):
+        self.assertEqual(self.open_at(14, 0, 0), ['Hoursallday'])
+        self.assertEqual(self.open_at(14, 23, 59), ['Hoursallday'])
+        self.assertEqual(self.open_at(15, 0, 0), [])
+
+    def test_moments_are_read_in_the_store_time_zone(self):
+        # Friday 23:30 in Cairo (UTC+3 until the end of October)
+        response = self.client.get('/medical_stores/', {'search': 'Hours', 'open_at': '2026-10-16T20:30:00Z'})
+        self.assertEqual([store['store_name'] for store in response.data['results']], ['Hoursnight'])
+
+    def test_daily_hours_and_weekly_schedule_edits(self):
+        store = create_store('Hoursdaily')
+        self.client.force_login(store.owner.user)
+        response = self.client.patch(
+            f'/medical_stores/{store.pk}/', {'start_time': '20:00', 'end_time': '01:00'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(store.opening_hours.count(), 7)
+
+        response = self.client.put(
+            f'/medical_stores/{store.pk}/opening-hours/', [{'weekday': 0, 'opens': '09:00', 'closes': '17:00'}],
+            content_type='application/json',
+        )
+        self.assertEqual(response.json(), [{'weekday': 0, 'opens': '09:00:00', 'closes': '17:00:00'}])
+        self.client.force_login(self.buyer)
+        self.assertEqual(self.open_at(12, 10, 0), ['Hoursdaily'])
+        self.assertEqual(self.open_at(13, 0, 30), [])
@@ -1,16 +1,24 @@
 # medical_stores/views.py
 from rest_framework import viewsets
-from .models import MedicalStore
-from .serializers import MedicalStoreSerializer
+from .models import MedicalStore, OpeningHours
+from .serializers import MedicalStoreSerializer, OpeningHoursSerializer, StoreMedicineMatchSerializer
 from .filters import MedicalStoreFilter
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter
+from rest_framework.filters import OrderingFilter, SearchFilter
 #[OKS]  import necessary modules for fetching medical store  with medicine inventory
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from inventory.models import Medicine 
-from django.db.models import Q
+from django.db.models import F, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Lower
 from rest_framework import serializers
+from inventory.cache import ConditionalGetMixin
+from inventory.sparse import SparseFieldsViewMixin
+from inventory.pagination import KeysetPagination
+from .geo import distance_km, nearby
+from .products import product_prefetches
+from .hours import daily_hours, set_schedule
+from rest_framework.exceptions import PermissionDenied
 
 
 
@@ -24,24 +32,45 @@ from rest_framework.response import Response
 # from rest_framework.permissions import IsAuthenticated
 
 
-class MedicalStoreViewSet(viewsets.ModelViewSet):
+# /nearby/ radius in km
+DEFAULT_NEARBY_RADIUS_KM = 5
+MAX_NEARBY_RADIUS_KM = 100
+
+
+class DistancePagination(KeysetPagination):
+    """Keyset pages of a queryset annotated with `distance`, nearest first."""
+
+    def get_ordering(self, request, view):
+        return 'distance', F('distance'), False
+
+
+# the store payload can embed its products, so the global inventory generation covers it
+class MedicalStoreViewSet(ConditionalGetMixin, SparseFieldsViewMixin, viewsets.ModelViewSet):
     #[AMS]:- Only show stores where pharmacist's license is approved
     queryset = MedicalStore.objects.filter(owner__license_status='approved')
     serializer_class = MedicalStoreSerializer
 
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_class = MedicalStoreFilter
     search_fields = ['store_name', 'store_type']
+    # ?ordering=-rating_average reads the counters kept on the store row, no join with the reviews
+    ordering_fields = ['rating_average', 'rating_count', 'store_name']
+    ordering = ['id']
+    # open now is a different list a minute later, whatever the generation
+    conditional_skip_params = ('open_now',)
     medicines = serializers.SerializerMethodField() 
     permission_classes=[IsAuthenticated]
     # [AMS]:- to make admin can see all stores 
     def get_queryset(self):
         user = self.request.user
         queryset = super().get_queryset()  # Starts with approved stores only
+        # products are only embedded on ?include_products=, a bounded batch per store
+        products = [*product_prefetches(self.request), 'opening_hours']
+        queryset = queryset.prefetch_related(*products)
         
         # Admins can see all stores regardless of license status
         if user.is_staff or user.is_superuser or getattr(user, 'role', None) == 'admin':
-            return MedicalStore.objects.all()
+            return MedicalStore.objects.prefetch_related(*products)
             
         # Pharmacists can only see their own stores
         if user.role == 'pharmacist':
@@ -70,11 +99,40 @@ class MedicalStoreViewSet(viewsets.ModelViewSet):
 
             pharmacist.save()
 
+        self._sync_daily_hours(store, serializer)
+
+    def perform_update(self, serializer):
+        store = serializer.save()
+        self._sync_daily_hours(store, serializer)
+
+    def _sync_daily_hours(self, store, serializer):
+        # start_time/end_time are the same hours every day, /opening-hours/ sets per-weekday ones
+        written = {'start_time', 'end_time'} & set(serializer.validated_data)
+        if written and store.start_time and store.end_time:
+            set_schedule(store, daily_hours(store.start_time, store.end_time))
+
+    # GET the weekly schedule, PUT [{"weekday": 4, "opens": "22:00", "closes": "02:00"}, ...] to replace it
+    @action(detail=True, methods=['get', 'put'], url_path='opening-hours')
+    def opening_hours(self, request, pk=None):
+        store = self.get_object()
+        if request.method == 'GET':
+            return Response(OpeningHoursSerializer(store.opening_hours.all(), many=True).data)
+
+        user = request.user
+        is_admin = user.is_staff or user.is_superuser or getattr(user, 'role', None) == 'admin'
+        if not is_admin and store.owner.user_id != user.id:
+            raise PermissionDenied("You can only change the opening hours of your own store.")
+        serializer = OpeningHoursSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        set_schedule(store, [(span['weekday'], span['opens'], span['closes']) for span in serializer.validated_data])
+        # not the prefetched (old) schedule of get_object()
+        return Response(OpeningHoursSerializer(OpeningHours.objects.filter(store=store), many=True).data)
+
     @action(detail=False, methods=['get'], url_path='my-store')
     def my_store(self, request):
         pharmacist = request.user.pharmacist
         try:
-            store = MedicalStore.objects.get(owner=pharmacist)
+            store = MedicalStore.objects.prefetch_related(*product_prefetches(request), 'opening_hours').get(owner=pharmacist)
         except MedicalStore.DoesNotExist:
             return Response({'detail': 'No store found for this pharmacist'}, status=404)
 
@@ -83,28 +141,71 @@ class MedicalStoreViewSet(viewsets.ModelViewSet):
     
 
     #[OKS] method search for pharmacies with a specific medicine
+    # /medical_stores/with-medicine/?medicine_name=panadol[&ordering=price|-price|distance&lat=&lon=]
+    # pages of the stores that have it in stock, each with only its matching medicines
     @action(detail=False, methods=['get'], url_path='with-medicine')
     def stores_with_medicine(self, request, format=None): 
-        medicine_name = request.query_params.get('medicine_name')
+        medicine_name = (request.query_params.get('medicine_name') or '').strip()
 
         if not medicine_name:
             return Response({'error': 'medicine_name parameter is required'}, status=400)
-        #[OKS] ignore pending pharmacist -store
-        queryset = self.get_queryset()
-  
-         #[OKS] not case insensitive search 
-        matched_medicines = Medicine.objects.filter(
-        Q(brand_name__iexact=medicine_name) | Q(generic_name__iexact=medicine_name)
-        ).select_related('store')
-        
-        store_to_medicines = {}
-        for med in matched_medicines:
-            store_id = med.store.id  
-            store_to_medicines.setdefault(store_id, []).append(med)
-        store_ids = list(store_to_medicines.keys())
-        stores = queryset.filter(id__in=store_ids) 
-        serializer = self.get_serializer(
-         stores, many=True, 
-         context={'request': request, 'matched_medicines': store_to_medicines}
+        ordering = request.query_params.get('ordering', 'price')
+        if ordering not in ('price', '-price', 'distance'):
+            return Response({'error': 'ordering must be price, -price or distance'}, status=400)
+
+        #[OKS] case insensitive, on brand or generic name; the lower(name) listing indexes answer it
+        key = medicine_name.lower()
+        matches = Medicine.objects.alias(
+            brand_key=Lower('brand_name'), generic_key=Lower('generic_name'),
+        ).filter(Q(brand_key=key) | Q(generic_key=key), is_deleted=False, stock__gt=0)
+
+        #[OKS] ignore pending pharmacist -store (get_queryset); the matches replace the embedded medicines
+        stores = self.filter_queryset(self.get_queryset()).prefetch_related(None).filter(id__in=matches.values('store_id')).annotate(
+            min_price=Subquery(matches.filter(store=OuterRef('pk')).order_by('price').values('price')[:1]),
+        ).prefetch_related(
+            Prefetch(
+                'medicine_set',
+                matches.select_related('catalog_item').prefetch_related('alternative_medicines').order_by('price', 'id'),
+                to_attr='matched_medicines',
+            ),
+            *product_prefetches(request, kinds=['devices']),
+            'opening_hours',
         )
-        return Response(serializer.data)
+
+        if ordering == 'distance':
+            try:
+                latitude, longitude = float(request.query_params['lat']), float(request.query_params['lon'])
+            except (KeyError, ValueError):
+                return Response({'error': 'ordering=distance needs lat and lon'}, status=400)
+            # stores without a location come last
+            stores = stores.annotate(distance=distance_km(latitude, longitude)).order_by(
+                F('distance').asc(nulls_last=True), 'id')
+        else:
+            stores = stores.order_by(ordering.replace('price', 'min_price'), 'id')
+
+        page = self.paginate_queryset(stores)
+        context = self.get_serializer_context()
+        if page is not None:
+            return self.get_paginated_response(StoreMedicineMatchSerializer(page, many=True, context=context).data)
+        return Response(StoreMedicineMatchSerializer(stores, many=True, context=context).data)
+
+    # Pharmacies near a point, nearest first: /medical_stores/nearby/?lat=30.04&lon=31.23&radius=5 (km)
+    # combines with the store filters (?open_now=true, ?store_type=, ...)
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        try:
+            latitude = float(request.query_params['lat'])
+            longitude = float(request.query_params['lon'])
+            radius = float(request.query_params.get('radius', DEFAULT_NEARBY_RADIUS_KM))
+        except (KeyError, ValueError):
+            return Response({'error': 'lat and lon are required numbers, radius is in km'}, status=400)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return Response({'error': 'lat must be within -90..90 and lon within -180..180'}, status=400)
+        if not 0 < radius <= MAX_NEARBY_RADIUS_KM:
+            return Response({'error': f'radius must be above 0 and at most {MAX_NEARBY_RADIUS_KM} km'}, status=400)
+
+        queryset = nearby(self.filter_queryset(self.get_queryset()), latitude, longitude, radius)
+        paginator = DistancePagination(self.paginator.get_page_size(request) or 12)
+        page = paginator.paginate_queryset(queryset, request, self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
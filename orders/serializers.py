@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import Order, Cart
+from inventory.archive import medicines_by_id
 from inventory.models import Medicine, MedicalDevice
+from inventory.sparse import SparseFieldsMixin
 
 # CART SERIALIZER
 class CartSerializer(serializers.ModelSerializer):
@@ -12,7 +14,7 @@ class CartSerializer(serializers.ModelSerializer):
 # ORDER SERIALIZER
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items_details = serializers.SerializerMethodField()
 
     class Meta:
@@ -20,28 +22,35 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = '__all__'
         depth = 1
 
+    # inventory.sparse keeps the column items_details reads
+    values_method_fields = {'items_details': 'items'}
+
     def get_items_details(self, obj):
         request = self.context.get('request', None)  # [SARA] Get request for absolute URI
+        # one query for the whole order (two with archived medicines), the image lives on
+        # the shared catalog record
+        medicines = medicines_by_id(item.get('item_id') for item in obj.items if item.get('item_id') is not None)
+        medicines = {str(pk): medicine for pk, medicine in medicines.items()}
         results = []
         for item in obj.items:
             item_id = item.get('item_id')
             price = item.get('price')
             quantity = item.get('ordered_quantity')
 
-            try:
-                medicine = Medicine.objects.get(id=item_id)
-                # [SARA] Use absolute URI for image
-                if medicine.image and request is not None:
-                    image_url = request.build_absolute_uri(medicine.image.url)
-                else:
-                    image_url = medicine.image.url if medicine.image else None
-                results.append({
-                    "name": medicine.brand_name,
-                    "price": price,
-                    "image": image_url,
-                    "quantity": quantity
-                })
-            except Medicine.DoesNotExist:
+            medicine = medicines.get(str(item_id))
+            if medicine is None:
                 continue  # Skip if not a Medicine
+            image = medicine.catalog_item.image
+            # [SARA] Use absolute URI for image
+            if image and request is not None:
+                image_url = request.build_absolute_uri(image.url)
+            else:
+                image_url = image.url if image else None
+            results.append({
+                "name": medicine.brand_name,
+                "price": price,
+                "image": image_url,
+                "quantity": quantity
+            })
 
         return results
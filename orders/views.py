@@ -15,6 +15,8 @@ from .serializers import OrderSerializer
 from .permissions import OrderAccessPermission
 from inventory.permissions import IsAdminCRU
 from inventory.models import Medicine
+from inventory.reservations import available_stock, convert_holds
+from inventory.sparse import SparseFieldsViewMixin
 from notifications.utils import send_notification 
 from .filters import OrderFilter
 from rest_framework.pagination import PageNumberPagination
@@ -29,7 +31,7 @@ class OrderPagination(PageNumberPagination):
     max_page_size = 100
 
 # [SARA]: Filtering enabled for OrderViewSet (store, order_status, client)
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     # [SARA]: Use OrderSerializer for all order operations
     serializer_class = OrderSerializer
     # [SARA]: Admins (IsAdminCRU) can CRU, others use OrderAccessPermission
@@ -37,6 +39,8 @@ class OrderViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]  # [SARA]
     filterset_class = OrderFilter  # [SARA]
     pagination_class = OrderPagination  # [SARA]
+    # OrderAccessPermission reads the client and the store of the order
+    sparse_required_fields = ['client', 'store']
 
     # [SARA]: Custom queryset based on user role
     def get_queryset(self):
@@ -44,12 +48,14 @@ class OrderViewSet(viewsets.ModelViewSet):
         queryset = Order.objects.none() 
        
         # [OK - SARA] filtering with authorization 
+        # depth=1 nests the client and the store of every order
+        orders = Order.objects.select_related('client', 'store')
         if user.is_staff or user.is_superuser or getattr(user, 'role', None) == 'admin':
-            queryset = Order.objects.all().order_by('-timestamp')
+            queryset = orders.all().order_by('-timestamp')
         elif user.role == 'pharmacist':
-            queryset = Order.objects.filter(store__owner__user=user).order_by('-timestamp')
+            queryset = orders.filter(store__owner__user=user).order_by('-timestamp')
         elif user.role == 'client':
-            queryset = Order.objects.filter(client__user=user).order_by('-timestamp')
+            queryset = orders.filter(client__user=user).order_by('-timestamp')
             
         return queryset
 
@@ -217,10 +223,12 @@ class OrderViewSet(viewsets.ModelViewSet):
                     raise ValidationError("Each item must have item_id and ordered_quantity")
                 
                 medicine = Medicine.objects.get(id=medicine_id)
-                if medicine.stock < quantity:
+                # the stock other carts hold is not for sale
+                available = available_stock({medicine.id: medicine.stock}, holder=self.request.user.pk)[medicine.id]
+                if available < quantity:
                     raise ValidationError(
                         f"Not enough stock for {medicine.generic_name}. "
-                        f"Available: {medicine.stock}, Requested: {quantity}"
+                        f"Available: {available}, Requested: {quantity}"
                     )
                     
             except Medicine.DoesNotExist:
@@ -228,12 +236,11 @@ class OrderViewSet(viewsets.ModelViewSet):
 
     # [OKS] update medicine "stock"
     def _update_medicine_quantities(self, items):
+        # turns the client's cart holds into the sale, guarded so stock never goes negative
+        quantities = {}
         for item in items:
-            medicine = Medicine.objects.get(id=item['item_id'])
-            quantity = item['ordered_quantity']
-            
-            medicine.stock -= quantity
-            medicine.save()
+            quantities[item['item_id']] = quantities.get(item['item_id'], 0) + item['ordered_quantity']
+        convert_holds(self.request.user.pk, quantities)
 
     def perform_update(self, serializer):
         user = self.request.user
@@ -0,0 +1,14 @@
+# reviews/management/commands/rebuild_store_ratings.py
+from django.core.management.base import BaseCommand
+from reviews.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the rating aggregates of every store from its reviews (after imports, "
+        "queryset.update() of ratings, or as a nightly check)"
+    )
+
+    def handle(self, *args, **options):
+        fixed = rebuild_ratings()
+        self.stdout.write(self.style.SUCCESS(f"{fixed} stores had their rating counters corrected."))
@@ -1,4 +1,5 @@
-from django.db import models
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import models, transaction
 from users.models import User
 from medical_stores.models import MedicalStore
 
@@ -10,12 +11,18 @@ class Review(models.Model):
     # [SENU]: store can have more than one review
     medical_store = models.ForeignKey(MedicalStore, on_delete=models.CASCADE, related_name='reviews')
     review_text = models.TextField()
-    rating = models.PositiveSmallIntegerField()
+    # 1 to 5 stars, counted into the store's rating aggregates
+    rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     timestamp = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         # [SENU]: user can create only one review and update it if needed
         constraints = [models.UniqueConstraint(fields=['user', 'medical_store'], name='unique_user_store_review')]
 
+    def save(self, *args, **kwargs):
+        # the store's rating counters (reviews.signals) change in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.user.name} review on {self.medical_store.store_name}"
@@ -0,0 +1,56 @@
+# reviews/ratings.py
+from collections import defaultdict
+from django.db import connection, transaction
+from django.db.models import F
+from inventory.cache import bump_generations_on_commit
+from medical_stores.models import RATING_FIELDS, RATING_VALUES, MedicalStore
+from .models import Review
+
+
+def apply_ratings(changes):
+    """
+    Move the store counters by [(store id, rating, +1 / -1)] with F() updates, one
+    UPDATE per store. Each is a relative change made under the row lock of the
+    UPDATE, so concurrent reviews of the same store add up instead of overwriting.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for store_id, rating, sign in changes:
+        fields = deltas[store_id]
+        fields['rating_count'] += sign
+        fields['rating_sum'] += sign * rating
+        if rating in RATING_VALUES:
+            fields[f'rating_{rating}_count'] += sign
+    # same order in every transaction, two moving reviews cannot deadlock
+    for store_id in sorted(deltas):
+        updates = {field: F(field) + delta for field, delta in deltas[store_id].items() if delta}
+        if updates:
+            MedicalStore.objects.filter(pk=store_id).update(**updates)
+    # the store payload shows them
+    bump_generations_on_commit(deltas)
+
+
+def rebuild_ratings():
+    """
+    Recount every store's counters from its reviews in one UPDATE, returns how many
+    stores were off. Review writes wait on the table lock meanwhile, none is lost.
+    """
+    counts = ', '.join(f'COUNT(*) FILTER (WHERE rating = {rating}) AS r{rating}' for rating in RATING_VALUES)
+    columns = RATING_FIELDS
+    values = ['COALESCE(r.count, 0)', 'COALESCE(r.sum, 0)', *(f'COALESCE(r.r{rating}, 0)' for rating in RATING_VALUES)]
+    stores, reviews = MedicalStore._meta.db_table, Review._meta.db_table
+    sql = f"""
+        UPDATE {stores} s
+        SET ({', '.join(columns)}) = ({', '.join(values)})
+        FROM {stores} s2 LEFT JOIN (
+            SELECT medical_store_id, COUNT(*) AS count, SUM(rating) AS sum, {counts}
+            FROM {reviews} GROUP BY medical_store_id
+        ) r ON r.medical_store_id = s2.id
+        WHERE s.id = s2.id AND ({', '.join(f's.{column}' for column in columns)}) IS DISTINCT FROM ({', '.join(values)})
+        RETURNING s.id
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {reviews} IN SHARE MODE')
+        cursor.execute(sql)
+        fixed = [store_id for store_id, in cursor.fetchall()]
+        bump_generations_on_commit(fixed)
+    return len(fixed)
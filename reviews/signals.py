@@ -0,0 +1,37 @@
+# reviews/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import Review
+from .ratings import apply_ratings
+
+
+# STORE RATING COUNTERS ===========
+@receiver(pre_save, sender=Review)
+def remember_rating(sender, instance, raw=False, **kwargs):
+    # locked until the save's transaction ends (Review.save), a concurrent edit of the
+    # same review waits and then sees this one's rating
+    instance._previous_rating = None
+    if instance.pk and not raw:
+        instance._previous_rating = (
+            Review.objects.select_for_update().filter(pk=instance.pk)
+            .values_list('medical_store_id', 'rating').first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def count_rating(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_rating', None)
+    current = (instance.medical_store_id, instance.rating)
+    if previous == current:
+        return
+    changes = [(*current, 1)]
+    if previous is not None:
+        changes.append((*previous, -1))
+    apply_ratings(changes)
+
+
+@receiver(post_delete, sender=Review)
+def uncount_rating(sender, instance, **kwargs):
+    apply_ratings([(instance.medical_store_id, instance.rating, -1)])
@@ -1,3 +1,80 @@
 from django.test import TestCase
+from medical_stores.models import MedicalStore
+from users.models import Pharmacist, User
+from .models import Review
+from .ratings import rebuild_ratings
 
-# Create your tests here.
+
+# STORE RATING COUNTERS ===========
+class StoreRatingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.stores = [
+            MedicalStore.objects.create(
+                owner=Pharmacist.objects.create(
+                    user=User.objects.create(email=f'rated-{i}@example.com', name=f'rated {i}', role='pharmacist'),
+                    license_status='approved',
+                ),
+                store_name=f'Rated {i}', store_type='pharmacy',
+            )
+            for i in range(2)
+        ]
+        cls.clients = [
+            User.objects.create(email=f'rating-client-{i}@example.com', name=f'client {i}', role='client') for i in range(3)
+        ]
+
+    def review(self, client, rating, store=None):
+        return Review.objects.create(user=client, medical_store=store or self.stores[0], review_text='...', rating=rating)
+
+    def counters(self, store=None):
+        store = MedicalStore.objects.get(pk=(store or self.stores[0]).pk)
+        histogram = [getattr(store, f'rating_{rating}_count') for rating in range(1, 6)]
+        return store.rating_count, store.rating_sum, histogram, store.rating_average
+
+    def test_create_update_and_delete_move_the_counters(self):
+        first = self.review(self.clients[0], 4)
+        self.review(self.clients[1], 5)
+        self.assertEqual(self.counters(), (2, 9, [0, 0, 0, 1, 1], 4.5))
+
+        first.rating = 2
+        first.save()
+        self.assertEqual(self.counters(), (2, 7, [0, 1, 0, 0, 1], 3.5))
+
+        # saving without a change moves nothing
+        first.review_text = 'edited'
+        first.save()
+        self.assertEqual(self.counters(), (2, 7, [0, 1, 0, 0, 1], 3.5))
+
+        first.delete()
+        self.assertEqual(self.counters(), (1, 5, [0, 0, 0, 0, 1], 5.0))
+
+    def test_review_moved_to_another_store_moves_its_rating(self):
+        review = self.review(self.clients[0], 3)
+        review.medical_store = self.stores[1]
+        review.save()
+        self.assertEqual(self.counters(self.stores[0]), (0, 0, [0, 0, 0, 0, 0], 0.0))
+        self.assertEqual(self.counters(self.stores[1]), (1, 3, [0, 0, 1, 0, 0], 3.0))
+
+    def test_counters_are_moved_by_deltas(self):
+        # another transaction's review, committed after this one read the store
+        MedicalStore.objects.filter(pk=self.stores[0].pk).update(rating_count=10, rating_sum=40, rating_4_count=10)
+        self.review(self.clients[0], 5)
+        self.assertEqual(self.counters(), (11, 45, [0, 0, 0, 10, 1], 45 / 11))
+
+    def test_queryset_delete_uncounts_every_review(self):
+        for client, rating in zip(self.clients, (1, 2, 3)):
+            self.review(client, rating)
+        Review.objects.filter(medical_store=self.stores[0], rating__gte=2).delete()
+        self.assertEqual(self.counters(), (1, 1, [1, 0, 0, 0, 0], 1.0))
+
+    def test_rebuild_recounts_drifted_stores_only(self):
+        self.review(self.clients[0], 4)
+        self.review(self.clients[1], 2, store=self.stores[1])
+        # a bulk write that sends no signals
+        Review.objects.filter(medical_store=self.stores[0]).update(rating=1)
+        MedicalStore.objects.filter(pk=self.stores[1].pk).update(rating_count=7)
+
+        self.assertGreaterEqual(rebuild_ratings(), 2)
+        self.assertEqual(self.counters(self.stores[0]), (1, 1, [1, 0, 0, 0, 0], 1.0))
+        self.assertEqual(self.counters(self.stores[1]), (1, 2, [0, 1, 0, 0, 0], 2.0))
+        self.assertEqual(rebuild_ratings(), 0)
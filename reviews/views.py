@@ -3,5 +3,5 @@ from .models import Review
 from .serializers import ReviewSerializer
 
 class ReviewViewSet(viewsets.ModelViewSet):
-    queryset = Review.objects.all
+    queryset = Review.objects.all()
     serializer_class = ReviewSerializer
\ No newline at end of file
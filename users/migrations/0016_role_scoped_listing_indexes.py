@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_alter_pharmacist_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pharmacist',
+            index=models.Index(fields=['license_status'], name='users_pharm_license_44790b_idx'),
+        ),
+    ]
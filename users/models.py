@@ -133,6 +133,11 @@ class Pharmacist(models.Model):
     # [SENU]: add has store for store form profile page 
     has_store = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # client listings only show stores of approved pharmacists
+            models.Index(fields=['license_status']),
+        ]
 
     def __str__(self):
         return self.user.name